@@ -0,0 +1,72 @@
+"""Project analytics dashboard for admins
+
+Run with: streamlit run admin_analytics.py
+Reads only the project_stats aggregates, never the projects table.
+"""
+import streamlit as st
+from datetime import date, timedelta
+
+from auth import authenticate_user
+from config import ADMIN_USERNAMES
+from project_analytics import STAT_DIMENSIONS, project_counts, project_timeseries, top_users, total_projects
+
+def show_login():
+    st.title("📊 Project Analytics")
+    with st.form("admin_login"):
+        username = st.text_input("Username")
+        password = st.text_input("Password", type="password")
+        if st.form_submit_button("Login"):
+            user = authenticate_user(username, password)
+            if user and user["username"] in ADMIN_USERNAMES:
+                st.session_state.admin = user["username"]
+                st.rerun()
+            else:
+                st.error("Not an admin account (set ADMIN_USERNAMES in .env)")
+
+def show_dashboard():
+    st.title("📊 Project Analytics")
+
+    with st.sidebar:
+        st.caption(f"Signed in as {st.session_state.admin}")
+        days = st.date_input("Days", value=(date.today() - timedelta(days=30), date.today()))
+        user_id = st.number_input("User id (0 = all users)", min_value=0, step=1, value=0) or None
+        dimension = st.selectbox("Breakdown", STAT_DIMENSIONS)
+        period = st.radio("Period", ("day", "month"), horizontal=True)
+        if st.button("Log out"):
+            del st.session_state.admin
+            st.rerun()
+
+    if len(days) != 2:
+        st.info("Pick the last day of the range")
+        return
+    start, end = (day.isoformat() for day in days)
+    st.metric("Projects created", total_projects(user_id, start, end))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader(f"By {dimension}")
+        counts = project_counts(dimension, user_id, start, end, limit=20)
+        if counts:
+            st.bar_chart({"projects": dict(counts)})
+        else:
+            st.info("No projects in this range")
+    with col2:
+        if user_id is None:
+            st.subheader("Most active users")
+            st.table([{"user_id": uid, "projects": count} for uid, count in top_users(start, end)])
+
+    st.subheader(f"{dimension.title()} per {period}")
+    series = project_timeseries(dimension, user_id, start, end, period)
+    if series:
+        values = sorted({value for bucket in series.values() for value in bucket})
+        st.line_chart({value: {period_key: bucket.get(value, 0) for period_key, bucket in series.items()} for value in values})
+
+def main():
+    st.set_page_config(page_title="Project Analytics", page_icon="📊", layout="wide")
+    if st.session_state.get("admin"):
+        show_dashboard()
+    else:
+        show_login()
+
+if __name__ == "__main__":
+    main()
@@ -8,41 +8,93 @@ from auth import (
     verify_token,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
-from database import get_db_connection
-from llm_handler import advanced_llm_response
+from chat_history import save_chat_history
+from config import (
+    JOB_QUEUE_WORKERS, JOB_QUEUE_MAX_RETRIES, JOB_QUEUE_PERSIST, JOB_QUEUE_RETENTION_DAYS,
+    SESSION_HISTORY_PAGE_TURNS, report_config
+)
+from conversation_context import context_store
+from fair_scheduler import RateLimited, chat_scheduler, project_quotas
+from job_queue import JobQueue, SUCCEEDED, FAILED, FINISHED_STATUSES
+from llm_handler import CREATE_PROJECT, advanced_llm_response, route_message
 from project_manager import get_user_projects
+from request_profiler import request_profiler
+from scaffold import archive_bytes, archive_name, load_project
+from session_messages import SessionMessages
+from warmup import start_warmup
 
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-def save_chat_history(user_id, message, response):
-    """Save chat history to database"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO chat_history (user_id, message, response) VALUES (?, ?, ?)",
-        (user_id, message, response)
+@st.cache_resource
+def get_job_queue():
+    """Process-wide job queue shared by all sessions"""
+    job_queue = JobQueue(
+        max_workers=JOB_QUEUE_WORKERS,
+        max_retries=JOB_QUEUE_MAX_RETRIES,
+        persist=JOB_QUEUE_PERSIST,
+        retention=JOB_QUEUE_RETENTION_DAYS * 24 * 3600
     )
-    conn.commit()
-    conn.close()
+    job_queue.recover()
+    return job_queue
 
-def get_chat_history(user_id):
-    """Retrieve chat history for a user"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT message, response, timestamp FROM chat_history WHERE user_id = ? ORDER BY timestamp DESC LIMIT 10",
-        (user_id,)
-    )
-    history = cursor.fetchall()
-    conn.close()
-    return history
+def collect_finished_jobs():
+    """Move results of finished project jobs into the chat. Returns True if any finished."""
+    job_queue = get_job_queue()
+    still_pending = []
+    finished = False
+    
+    for job_id in st.session_state.pending_jobs:
+        job = job_queue.status(job_id)
+        if job is None:
+            continue
+        if job["status"] not in FINISHED_STATUSES:
+            still_pending.append(job_id)
+            continue
+        
+        finished = True
+        chat_id = None
+        if job["status"] == SUCCEEDED:
+            content = job["result"]["response"]
+            chat_id = job["result"].get("chat_id")
+        elif job["status"] == FAILED:
+            content = f"❌ **Project creation failed:** {job['error']}\n\nPlease try again."
+        else:
+            content = "🚫 Project creation cancelled."
+        st.session_state.chat.add_turn(job["args"][0], content, chat_id)
+        job_queue.forget(job_id)
+    
+    st.session_state.pending_jobs = still_pending
+    return finished
+
+@st.fragment(run_every=2)
+def show_job_status():
+    """Sidebar panel for queued project jobs; reruns the page when one finishes"""
+    if not st.session_state.get("pending_jobs"):
+        return
+    
+    job_queue = get_job_queue()
+    if any(
+        (job_queue.status(job_id) or {}).get("status") in FINISHED_STATUSES
+        for job_id in st.session_state.pending_jobs
+    ):
+        st.rerun()
+    
+    st.subheader("⏳ In Progress")
+    for job_id in st.session_state.pending_jobs:
+        job = job_queue.status(job_id)
+        if not job:
+            continue
+        prompt = job["args"][0]
+        st.caption(f"{prompt[:40]}{'...' if len(prompt) > 40 else ''} — {job['status']}")
+        if st.button("Cancel", key=f"cancel_{job_id}"):
+            job_queue.cancel(job_id)
+            st.rerun()
 
 def main():
     st.set_page_config(page_title="LLM Project Creator", page_icon="🤖", layout="wide")
     
+    # Config warnings and background cache warm-up, both once per process
+    report_config()
+    start_warmup()
+    
     # Initialize session state
     if 'token' not in st.session_state:
         st.session_state.token = None
@@ -117,12 +169,49 @@ def show_auth_interface():
                     else:
                         st.error("Username or email already exists")
 
+def show_turn(message, response):
+    """Render one user message and the assistant's reply"""
+    with st.chat_message("user"):
+        st.markdown(message)
+    with st.chat_message("assistant"):
+        st.markdown(response)
+
+def show_scaffold_download(project_id):
+    """Offer a project's scaffold as a zip
+
+    Other projects only get a "Generate" button. The archive is built
+    when it is asked for and kept (one per session) until it has been
+    downloaded, so reruns in between neither rebuild nor re-read it.
+    """
+    prepared = st.session_state.get("scaffold")
+    if prepared and prepared["project_id"] == project_id:
+        if st.download_button(
+            "⬇️ Download scaffold", data=prepared["data"], file_name=prepared["file_name"],
+            mime="application/zip", key=f"scaffold_download_{project_id}"
+        ):
+            st.session_state.pop("scaffold", None)
+    elif st.button("📦 Generate scaffold", key=f"scaffold_{project_id}"):
+        project_data = load_project(st.session_state.user["user_id"], project_id)
+        if project_data is None:
+            st.error("Project not found")
+            return
+        st.session_state.scaffold = {
+            "project_id": project_id,
+            "file_name": archive_name(project_data, "zip"),
+            "data": archive_bytes(project_data, "zip")
+        }
+        st.rerun()
+
 def show_chat_interface():
     """Show chat interface for authenticated users"""
     st.title(f"🤖 AI Project Creator - Welcome {st.session_state.user['sub']}!")
     
+    if "pending_jobs" not in st.session_state:
+        st.session_state.pending_jobs = []
+    
     # Sidebar for user projects
     with st.sidebar:
+        show_job_status()
         st.header("Your Projects")
         projects = get_user_projects(st.session_state.user["user_id"])
         
@@ -130,12 +219,16 @@ def show_chat_interface():
             for project in projects:
                 st.write(f"**{project[1]}** ({project[2].replace('_', ' ')})")
                 st.caption(f"Created: {project[4]}")
+                show_scaffold_download(project[0])
                 st.divider()
         else:
             st.info("You haven't created any projects yet. Try asking me to create one!")
     
     # Logout button
     if st.button("Logout"):
+        context_store.forget(st.session_state.user["user_id"])
+        st.session_state.pop("chat", None)
+        st.session_state.pop("scaffold", None)
         st.session_state.token = None
         st.session_state.user = None
         st.rerun()
@@ -150,40 +243,68 @@ def show_chat_interface():
         - "Develop an automation agent for social media posting"
         """)
     
-    # Initialize chat history
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+    # Recent turns stay in memory; older ones are paged back from the database
+    user_id = st.session_state.user["user_id"]
+    if "chat" not in st.session_state or st.session_state.chat.user_id != user_id:
+        st.session_state.chat = SessionMessages.load(user_id)
+        st.session_state.history_pages = 0
+    chat = st.session_state.chat
     
-    # Load previous chat history
-    if not st.session_state.messages:
-        history = get_chat_history(st.session_state.user["user_id"])
-        for message, response, _ in reversed(history):
-            st.session_state.messages.append({"role": "user", "content": message})
-            st.session_state.messages.append({"role": "assistant", "content": response})
+    # Pick up blueprints from background project jobs
+    collect_finished_jobs()
     
     # Display chat messages
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
+    if chat.has_older:
+        wanted = st.session_state.history_pages * SESSION_HISTORY_PAGE_TURNS
+        older = chat.older(wanted) if wanted else []
+        if len(older) == wanted and st.button("Load earlier messages"):
+            st.session_state.history_pages += 1
+            st.rerun()
+        for turn in older:
+            show_turn(turn.message, turn.response)
+    
+    for turn in chat:
+        show_turn(turn.message, turn.response)
+    
+    for job_id in st.session_state.pending_jobs:
+        job = get_job_queue().status(job_id)
+        if job:
+            show_turn(job["args"][0], "🕒 **Working on your project blueprint...** It will appear here as soon as it's ready.")
     
     # Chat input
     if prompt := st.chat_input("What would you like to create or ask?"):
-        # Add user message to chat history
-        st.session_state.messages.append({"role": "user", "content": prompt})
         with st.chat_message("user"):
             st.markdown(prompt)
         
-        # Get AI response
+        # Right after a deploy, give the warm-up a moment to finish first
+        start_warmup().wait()
+        
+        # Project creation runs in the background; the job saves the chat turn when done.
+        # Follow-ups on the active project are answered inline like any other chat.
+        if route_message(prompt, user_id)[0] == CREATE_PROJECT:
+            if project_quotas.remaining(user_id) == 0:
+                st.warning(f"🚫 You have reached the limit of {project_quotas.limit} projects.")
+                return
+            job_id = get_job_queue().submit("create_project", prompt, user_id, user_id=user_id)
+            st.session_state.pending_jobs.append(job_id)
+            st.rerun()
+        
+        # Get AI response; waits its turn behind other users' requests
         with st.chat_message("assistant"):
             with st.spinner("Thinking..."):
-                response = advanced_llm_response(prompt, st.session_state.user["user_id"])
+                try:
+                    with chat_scheduler.slot(user_id):
+                        response = advanced_llm_response(prompt, user_id)
+                except RateLimited as e:
+                    st.warning(f"⏳ {e}")
+                    return
                 st.markdown(response)
         
-        # Add assistant response to chat history
-        st.session_state.messages.append({"role": "assistant", "content": response})
-        
-        # Save to database
-        save_chat_history(st.session_state.user["user_id"], prompt, response)
+        # Save to database and keep the turn in the session's recent messages
+        chat_id = save_chat_history(user_id, prompt, response)
+        chat.add_turn(prompt, response, chat_id)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Profiles a PROFILE_SAMPLE_RATE fraction of reruns; a no-op when sampling is off
+    with request_profiler.profiled("streamlit_rerun"):
+        main()
\ No newline at end of file
@@ -0,0 +1,140 @@
+"""Async counterparts of the blocking auth and project database functions
+
+Each database file gets one writer thread and ASYNC_DB_READERS reader
+threads, each owning a single sqlite3 connection for its lifetime. Writes
+are serialized on the writer; with WAL enabled (ASYNC_DB_WAL, off by
+default because it permanently switches the database files to WAL),
+readers run in parallel with it and each other. Coroutines await the
+executor's future, so the event loop never blocks on SQLite; starting the
+executors (and the first-use table setup) also runs on a thread. The
+queries are the same *_in functions the sync API calls.
+"""
+import asyncio
+import itertools
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from auth import authenticate_user_in, get_user_by_username_in, register_user_in
+from config import ASYNC_DB_READERS, ASYNC_DB_WAL, DATABASE_NAME
+from database import ensure_db, shard_for_user, shard_paths
+from project_manager import get_user_projects_in, save_shard_projects_in
+
+class ConnectionExecutor:
+    """A single thread that owns one connection and runs calls on it in submission order"""
+
+    def __init__(self, path, name, read_only=False):
+        self.path = path
+        self.read_only = read_only
+        self._conn = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name, initializer=self._connect)
+
+    def _connect(self):
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        if self.read_only:
+            self._conn.execute("PRAGMA query_only = ON")
+
+    def _call(self, func, args):
+        return func(self._conn, *args)
+
+    def submit(self, func, *args):
+        """Run func(connection, *args) on this executor's thread; returns a concurrent Future"""
+        return self._executor.submit(self._call, func, args)
+
+    def close(self):
+        self._executor.submit(lambda: self._conn and self._conn.close())
+        self._executor.shutdown(wait=True)
+
+class DatabaseExecutors:
+    """The writer and reader executors for one database file"""
+
+    def __init__(self, path, readers=ASYNC_DB_READERS, wal=ASYNC_DB_WAL):
+        self.path = path
+        self.writer = ConnectionExecutor(path, f"db-writer-{os.path.basename(path)}")
+        if wal:
+            # WAL is a property of the file: readers no longer wait for the writer (sync callers included)
+            self.writer.submit(lambda conn: conn.execute("PRAGMA journal_mode = WAL").fetchone()).result()
+        self.readers = [
+            ConnectionExecutor(path, f"db-reader-{os.path.basename(path)}-{index}", read_only=True)
+            for index in range(max(1, readers))
+        ] if wal else [self.writer]
+        self._next_reader = itertools.cycle(self.readers)
+        self._lock = threading.Lock()
+
+    def read(self, func, *args):
+        with self._lock:
+            reader = next(self._next_reader)
+        return reader.submit(func, *args)
+
+    def write(self, func, *args):
+        return self.writer.submit(func, *args)
+
+    def close(self):
+        for executor in set(self.readers) | {self.writer}:
+            executor.close()
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+def executors_for(path):
+    """The process-wide executors for a database file, started on first use"""
+    ensure_db()
+    path = os.path.abspath(path)
+    with _executors_lock:
+        executors = _executors.get(path)
+        if executors is None:
+            executors = _executors[path] = DatabaseExecutors(path)
+        return executors
+
+def close_executors():
+    """Stop every executor thread and close its connection"""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.close()
+
+def _user_executors(user_id):
+    return executors_for(shard_paths()[shard_for_user(user_id)])
+
+async def _executors_async(path):
+    """executors_for without blocking the event loop on table setup or executor start-up"""
+    executors = _executors.get(os.path.abspath(path))
+    if executors is None:
+        executors = await asyncio.get_running_loop().run_in_executor(None, executors_for, path)
+    return executors
+
+async def _user_executors_async(user_id):
+    """_user_executors without blocking the event loop"""
+    if _executors:
+        # Some executors exist, so ensure_db has run and routing the user is a lookup
+        return await _executors_async(shard_paths()[shard_for_user(user_id)])
+    return await asyncio.get_running_loop().run_in_executor(None, _user_executors, user_id)
+
+async def authenticate_user_async(username, password):
+    """authenticate_user without blocking the event loop"""
+    executors = await _executors_async(DATABASE_NAME)
+    return await asyncio.wrap_future(executors.read(authenticate_user_in, username, password))
+
+async def register_user_async(username, email, password):
+    """register_user without blocking the event loop"""
+    executors = await _executors_async(DATABASE_NAME)
+    return await asyncio.wrap_future(executors.write(register_user_in, username, email, password))
+
+async def get_user_by_username_async(username):
+    """get_user_by_username without blocking the event loop"""
+    executors = await _executors_async(DATABASE_NAME)
+    return await asyncio.wrap_future(executors.read(get_user_by_username_in, username))
+
+async def save_project_to_db_async(user_id, project_data):
+    """save_project_to_db without blocking the event loop; returns the new project's id"""
+    executors = await _user_executors_async(user_id)
+    project_ids = await asyncio.wrap_future(executors.write(save_shard_projects_in, [(user_id, project_data)]))
+    print(f"💾 Project saved to database: {project_data['project_name']}")
+    return project_ids[0]
+
+async def get_user_projects_async(user_id):
+    """get_user_projects without blocking the event loop"""
+    executors = await _user_executors_async(user_id)
+    return await asyncio.wrap_future(executors.read(get_user_projects_in, user_id))
@@ -73,14 +73,13 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify password against hash"""
     return get_password_hash(plain_password) == hashed_password
 
-def authenticate_user(username: str, password: str):
-    """Authenticate a user"""
-    conn = get_db_connection()
+# The *_in functions take an open connection so the async layer (async_db.py)
+# runs exactly the same queries on its executor threads
+
+def authenticate_user_in(conn, username: str, password: str):
     cursor = conn.cursor()
-    
     cursor.execute("SELECT id, username, hashed_password FROM users WHERE username = ?", (username,))
     user = cursor.fetchone()
-    conn.close()
     
     if not user:
         return False
@@ -91,33 +90,47 @@ def authenticate_user(username: str, password: str):
     
     return {"user_id": user_id, "username": username}
 
-def register_user(username: str, email: str, password: str):
-    """Register a new user"""
+def authenticate_user(username: str, password: str):
+    """Authenticate a user"""
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
+    try:
+        return authenticate_user_in(conn, username, password)
+    finally:
+        conn.close()
+
+def register_user_in(conn, username: str, email: str, password: str):
     try:
         hashed_password = get_password_hash(password)
-        cursor.execute(
-            "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-            (username, email, hashed_password)
-        )
-        conn.commit()
+        with conn:
+            conn.execute(
+                "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
+                (username, email, hashed_password)
+            )
         return True
     except sqlite3.IntegrityError:
         return False
+
+def register_user(username: str, email: str, password: str):
+    """Register a new user"""
+    conn = get_db_connection()
+    try:
+        return register_user_in(conn, username, email, password)
     finally:
         conn.close()
 
-def get_user_by_username(username: str):
-    """Get user by username"""
-    conn = get_db_connection()
+def get_user_by_username_in(conn, username: str):
     cursor = conn.cursor()
-    
     cursor.execute("SELECT id, username, email FROM users WHERE username = ?", (username,))
     user = cursor.fetchone()
-    conn.close()
     
     if user:
         return {"id": user[0], "username": user[1], "email": user[2]}
-    return None
\ No newline at end of file
+    return None
+
+def get_user_by_username(username: str):
+    """Get user by username"""
+    conn = get_db_connection()
+    try:
+        return get_user_by_username_in(conn, username)
+    finally:
+        conn.close()
\ No newline at end of file
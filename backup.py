@@ -0,0 +1,388 @@
+"""Online backups, incremental snapshots and chat history retention for llm_app.db
+
+Backups use the sqlite3 online backup API, copying a few pages per step
+and sleeping in between so the app keeps writing while a backup runs.
+Every copy is integrity-checked before it is published.
+
+Snapshots live in BACKUP_DIR (shard files get a subdirectory each):
+    latest.db               most recent verified copy (the diff base)
+    <name>.db.gz            full snapshot
+    <name>.pages.gz         incremental snapshot: only pages that changed
+    manifest.json           snapshot chain, oldest first
+"""
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import time
+from datetime import datetime, timezone
+
+from config import (
+    DATABASE_NAME, BACKUP_DIR, BACKUP_PAGES_PER_STEP, BACKUP_STEP_SLEEP_SECONDS,
+    BACKUP_KEEP_FULL, BACKUP_FULL_EVERY, CHAT_RETENTION_DAYS, CHAT_ARCHIVE_DIR
+)
+
+MANIFEST = "manifest.json"
+LATEST = "latest.db"
+PAGE_HEADER = struct.Struct(">I")
+
+def online_backup(dest_path, source_path=DATABASE_NAME, pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_STEP_SLEEP_SECONDS):
+    """Copy a live database to dest_path without blocking writers, then verify it
+
+    The copy is written to a temporary file and only moved into place once
+    PRAGMA integrity_check passes, so dest_path is never a torn copy.
+    """
+    tmp_path = f"{dest_path}.tmp"
+    _remove_database_files(tmp_path)
+
+    source = sqlite3.connect(source_path)
+    dest = sqlite3.connect(tmp_path)
+    try:
+        # SQLite restarts the copy by itself if another connection writes mid-backup
+        source.backup(dest, pages=pages, sleep=sleep)
+        # A WAL-mode source yields a WAL-mode copy; switch it back so the
+        # snapshot is one self-contained file with no -wal/-shm sidecars
+        dest.execute("PRAGMA journal_mode = DELETE").fetchone()
+    finally:
+        dest.close()
+        source.close()
+
+    problems = verify_database(tmp_path)
+    if problems:
+        _remove_database_files(tmp_path)
+        raise RuntimeError(f"Backup failed integrity check: {problems[:5]}")
+    os.replace(tmp_path, dest_path)
+    return dest_path
+
+# integrity_check stops after this many messages (the default is 100)
+INTEGRITY_CHECK_MAX_ERRORS = 100000
+
+def _remove_database_files(path):
+    """Delete a database file and any -wal/-shm/-journal files next to it"""
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+def verify_database(path):
+    """Run PRAGMA integrity_check; returns a list of problems (empty when healthy)"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = [row[0] for row in conn.execute(f"PRAGMA integrity_check({INTEGRITY_CHECK_MAX_ERRORS})")]
+        return [] if rows == ["ok"] else rows
+    finally:
+        conn.close()
+
+def _page_size(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        conn.close()
+
+def _load_manifest(backup_dir):
+    path = os.path.join(backup_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {"snapshots": []}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _save_manifest(backup_dir, manifest):
+    path = os.path.join(backup_dir, MANIFEST)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+def _write_page_diff(base_path, new_path, diff_path, page_size):
+    """Write the pages of new_path that differ from base_path; returns (changed, total) pages"""
+    changed = 0
+    total = os.path.getsize(new_path) // page_size
+    with open(new_path, 'rb') as new, open(base_path, 'rb') as base, gzip.open(diff_path, 'wb') as out:
+        out.write((json.dumps({"page_size": page_size, "page_count": total}) + "\n").encode('utf-8'))
+        for page_no in range(total):
+            page = new.read(page_size)
+            if base.read(page_size) != page:
+                out.write(PAGE_HEADER.pack(page_no))
+                out.write(page)
+                changed += 1
+    return changed, total
+
+def _apply_page_diff(target_path, diff_path):
+    with gzip.open(diff_path, 'rb') as diff, open(target_path, 'r+b') as target:
+        header = json.loads(diff.readline())
+        page_size = header["page_size"]
+        while True:
+            prefix = diff.read(PAGE_HEADER.size)
+            if not prefix:
+                break
+            (page_no,) = PAGE_HEADER.unpack(prefix)
+            target.seek(page_no * page_size)
+            target.write(diff.read(page_size))
+        target.truncate(header["page_count"] * page_size)
+
+def create_snapshot(backup_dir=BACKUP_DIR, full=False, source_path=DATABASE_NAME):
+    """Take a verified online backup and record it as a full or incremental snapshot
+
+    An incremental snapshot stores only the pages that differ from the
+    previous snapshot. A full snapshot is taken when asked, when there is
+    no previous copy, or after BACKUP_FULL_EVERY incrementals.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    manifest = _load_manifest(backup_dir)
+    snapshots = manifest["snapshots"]
+    latest_path = os.path.join(backup_dir, LATEST)
+
+    since_full = 0
+    for snapshot in reversed(snapshots):
+        if snapshot["kind"] == "full":
+            break
+        since_full += 1
+    if not snapshots or not os.path.exists(latest_path) or since_full >= BACKUP_FULL_EVERY:
+        full = True
+
+    started = time.perf_counter()
+    name = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    copy_path = online_backup(os.path.join(backup_dir, f"{name}.db"), source_path)
+    page_size = _page_size(copy_path)
+
+    if full:
+        file_name = f"{name}.db.gz"
+        with open(copy_path, 'rb') as src, gzip.open(os.path.join(backup_dir, file_name), 'wb') as out:
+            shutil.copyfileobj(src, out)
+        total = os.path.getsize(copy_path) // page_size
+        changed = total
+    else:
+        file_name = f"{name}.pages.gz"
+        changed, total = _write_page_diff(latest_path, copy_path, os.path.join(backup_dir, file_name), page_size)
+    os.replace(copy_path, latest_path)
+
+    snapshot = {
+        "name": name,
+        "kind": "full" if full else "incremental",
+        "file": file_name,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "page_size": page_size,
+        "pages": total,
+        "changed_pages": changed,
+        "bytes": os.path.getsize(os.path.join(backup_dir, file_name))
+    }
+    snapshots.append(snapshot)
+    _save_manifest(backup_dir, manifest)
+
+    print(f"💾 {snapshot['kind'].title()} snapshot {name}: {changed}/{total} pages, "
+          f"{snapshot['bytes'] / 1024:.1f} KB in {time.perf_counter() - started:.2f}s")
+    return snapshot
+
+def list_snapshots(backup_dir=BACKUP_DIR):
+    """Snapshots in the manifest, oldest first"""
+    return _load_manifest(backup_dir)["snapshots"]
+
+def restore_snapshot(name, dest_path, backup_dir=BACKUP_DIR, overwrite=False):
+    """Rebuild the database as of snapshot `name` (the newest if None) at dest_path
+
+    Starts from the nearest full snapshot and applies the incrementals after
+    it in order. The result is integrity-checked before it is moved into place.
+    """
+    snapshots = list_snapshots(backup_dir)
+    if not snapshots:
+        raise ValueError(f"No snapshots in {backup_dir}")
+    names = [snapshot["name"] for snapshot in snapshots]
+    if name is None:
+        name = names[-1]
+    if name not in names:
+        raise ValueError(f"Unknown snapshot '{name}'")
+    if os.path.exists(dest_path) and not overwrite:
+        raise ValueError(f"{dest_path} already exists; pass overwrite=True to replace it")
+
+    target = names.index(name)
+    start = max(i for i in range(target + 1) if snapshots[i]["kind"] == "full")
+
+    tmp_path = f"{dest_path}.tmp"
+    with gzip.open(os.path.join(backup_dir, snapshots[start]["file"]), 'rb') as src, open(tmp_path, 'wb') as out:
+        shutil.copyfileobj(src, out)
+    for snapshot in snapshots[start + 1:target + 1]:
+        _apply_page_diff(tmp_path, os.path.join(backup_dir, snapshot["file"]))
+
+    problems = verify_database(tmp_path)
+    if problems:
+        os.remove(tmp_path)
+        raise RuntimeError(f"Restored snapshot failed integrity check: {problems[:5]}")
+    os.replace(tmp_path, dest_path)
+    print(f"♻️ Restored snapshot {name} ({target - start} incrementals applied) to {dest_path}")
+    return dest_path
+
+def prune_snapshots(backup_dir=BACKUP_DIR, keep_full=BACKUP_KEEP_FULL):
+    """Delete snapshot chains older than the newest `keep_full` full snapshots"""
+    manifest = _load_manifest(backup_dir)
+    snapshots = manifest["snapshots"]
+    fulls = [i for i, snapshot in enumerate(snapshots) if snapshot["kind"] == "full"]
+    if len(fulls) <= keep_full:
+        return 0
+
+    cutoff = fulls[-keep_full]
+    for snapshot in snapshots[:cutoff]:
+        path = os.path.join(backup_dir, snapshot["file"])
+        if os.path.exists(path):
+            os.remove(path)
+    manifest["snapshots"] = snapshots[cutoff:]
+    _save_manifest(backup_dir, manifest)
+    print(f"🧹 Pruned {cutoff} old snapshots")
+    return cutoff
+
+def _append_partition(path, records):
+    # Each append is a separate gzip member; readers see one continuous stream
+    with open(path, 'ab') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as out:
+            for record in records:
+                out.write((json.dumps(record) + "\n").encode('utf-8'))
+        raw.flush()
+        os.fsync(raw.fileno())
+
+def _recover_archive(conn):
+    """Undo the archive appends of a batch whose rows were never deleted (the run was killed in between)
+
+    Before appending, each batch records the partition sizes in
+    chat_archive_pending; the rows are deleted in the same transaction
+    that clears them. Truncating back to those sizes drops the partly or
+    fully written batch, and the rows still in chat_history are archived
+    again from scratch.
+    """
+    with conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS chat_archive_pending (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            )
+        ''')
+        pending = conn.execute("SELECT path, size FROM chat_archive_pending").fetchall()
+        for path, size in pending:
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+                    os.fsync(f.fileno())
+        conn.execute("DELETE FROM chat_archive_pending")
+    if pending:
+        print(f"↩️ Rolled back an unfinished archive batch ({len(pending)} partitions)")
+
+def _archive_shard(conn, days, archive_dir, batch_size):
+    from response_store import fetch_responses
+
+    cursor = conn.cursor()
+    archived = 0
+    last_id = 0
+    while True:
+        cursor.execute(
+            '''SELECT id, user_id, message, response, response_hash, timestamp FROM chat_history
+               WHERE id > ? AND timestamp < datetime('now', ?) ORDER BY id LIMIT ?''',
+            (last_id, f"-{int(days)} days", batch_size)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+
+        texts = fetch_responses(cursor, [row[4] for row in rows if row[4] is not None])
+        partitions = {}
+        for row_id, user_id, message, response, digest, timestamp in rows:
+            partitions.setdefault(timestamp[:7], []).append({
+                "id": row_id,
+                "user_id": user_id,
+                "message": message,
+                "response": texts[digest] if digest is not None else response,
+                "timestamp": timestamp
+            })
+        paths = {month: os.path.abspath(os.path.join(archive_dir, f"chat_history-{month}.jsonl.gz")) for month in partitions}
+        with conn:
+            cursor.executemany(
+                "INSERT INTO chat_archive_pending (path, size) VALUES (?, ?)",
+                [(path, os.path.getsize(path) if os.path.exists(path) else 0) for path in paths.values()]
+            )
+        for month, records in partitions.items():
+            _append_partition(paths[month], records)
+
+        with conn:
+            cursor.executemany("DELETE FROM chat_history WHERE id = ?", [(row[0],) for row in rows])
+            cursor.execute("DELETE FROM chat_archive_pending")
+        archived += len(rows)
+        last_id = rows[-1][0]
+
+    if archived:
+        with conn:
+            cursor.execute(
+                '''DELETE FROM responses WHERE hash NOT IN
+                   (SELECT response_hash FROM chat_history WHERE response_hash IS NOT NULL)'''
+            )
+    return archived
+
+def archive_chat_history(days=CHAT_RETENTION_DAYS, archive_dir=CHAT_ARCHIVE_DIR, batch_size=5000):
+    """Move chat_history rows older than `days` into monthly gzip JSONL partitions
+
+    Rows are written to archive_dir/chat_history-YYYY-MM.jsonl.gz (the same
+    records `export` produces, so they can be re-imported) and deleted from
+    each shard one batch per transaction. A batch that was appended but
+    not deleted (the run was killed) is truncated off its partitions at the
+    start of the next run, so no row is archived twice. Responses no longer
+    referenced by any row are removed at the end.
+    """
+    from database import get_db_connection, iter_shards
+
+    if days <= 0:
+        print("ℹ️ Chat retention disabled (CHAT_RETENTION_DAYS=0)")
+        return 0
+
+    os.makedirs(archive_dir, exist_ok=True)
+    connections = [get_db_connection(shard=shard) for shard in iter_shards()]
+    archived = 0
+    try:
+        # Shards share the monthly partitions: roll back every shard's unfinished batch before appending
+        for conn in connections:
+            _recover_archive(conn)
+        for conn in connections:
+            archived += _archive_shard(conn, days, archive_dir, batch_size)
+    finally:
+        for conn in connections:
+            conn.close()
+
+    print(f"📦 Archived {archived} chat history rows older than {days} days to {archive_dir}")
+    return archived
+
+def database_paths():
+    """Every database file to back up: the global database, then any shard files"""
+    from database import shard_paths
+
+    paths = shard_paths()
+    return [DATABASE_NAME] + (paths if paths != [DATABASE_NAME] else [])
+
+def snapshot_dir(backup_dir, path):
+    """Snapshot directory for a database file; shards get a subdirectory each"""
+    if path == DATABASE_NAME:
+        return backup_dir
+    return os.path.join(backup_dir, os.path.splitext(os.path.basename(path))[0])
+
+def snapshot_all(backup_dir=BACKUP_DIR, full=False):
+    """create_snapshot and prune_snapshots for the global database and every shard"""
+    snapshots = []
+    for path in database_paths():
+        directory = snapshot_dir(backup_dir, path)
+        snapshots.append(create_snapshot(directory, full=full, source_path=path))
+        prune_snapshots(directory)
+    return snapshots
+
+def run_backup_schedule(interval_seconds, backup_dir=BACKUP_DIR, retention_days=CHAT_RETENTION_DAYS,
+                        archive_dir=CHAT_ARCHIVE_DIR, iterations=None):
+    """Snapshot, prune and apply chat retention every `interval_seconds`
+
+    Retention runs only after a successful snapshot, so archived rows are
+    always in a backup too. Runs forever unless `iterations` is given.
+    """
+    count = 0
+    while iterations is None or count < iterations:
+        try:
+            snapshot_all(backup_dir)
+            archive_chat_history(retention_days, archive_dir)
+        except Exception as e:
+            print(f"❌ Scheduled backup failed: {e}")
+        count += 1
+        if iterations is None or count < iterations:
+            time.sleep(interval_seconds)
@@ -0,0 +1,125 @@
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from project_manager import plan_projects, save_projects_to_db
+
+DEFAULT_CHUNK_SIZE = 200
+DEFAULT_DB_BATCH_SIZE = 1000
+
+def iter_prompts(path, default_user_id=None):
+    """Stream (user_id, prompt) pairs from a prompts file one line at a time
+
+    Each line is either a JSON object with a "prompt" key (and an optional
+    "user_id"), a JSON string, or plain text. Blank lines are skipped.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+
+            user_id = default_user_id
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = line
+
+            if isinstance(record, dict):
+                prompt = record.get('prompt')
+                user_id = record.get('user_id', default_user_id)
+            elif isinstance(record, str):
+                prompt = record
+            else:
+                prompt = line
+
+            if prompt:
+                yield user_id, prompt
+
+def iter_chunks(items, size):
+    """Group an iterator into lists of at most `size` items without reading ahead"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def plan_prompts(chunk):
+    """Build project plans for a chunk of (user_id, prompt) pairs (runs in a worker process)"""
+    plans = plan_projects([prompt for _, prompt in chunk])
+    return [(user_id, plan.project_data) for (user_id, _), plan in zip(chunk, plans)]
+
+def iter_plans(prompts, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Plan prompts across a process pool, yielding results in input order
+
+    At most two chunks per worker are in flight at any time, so memory use
+    stays flat no matter how large the input is.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = 2 * workers
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+
+        for chunk in iter_chunks(prompts, chunk_size):
+            pending.append(executor.submit(plan_prompts, chunk))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
+
+def run_batch(input_path, output_path=None, to_db=False, user_id=None, workers=None,
+              chunk_size=DEFAULT_CHUNK_SIZE, db_batch_size=DEFAULT_DB_BATCH_SIZE, report_every=10000):
+    """Generate project plans for every prompt in a file
+
+    Plans are written as JSONL to `output_path` and/or inserted into the
+    projects table in batches of `db_batch_size`. Returns a stats dict.
+    """
+    if not output_path and not to_db:
+        raise ValueError("Nothing to do: pass an output path and/or enable database writes")
+
+    start = time.perf_counter()
+    count = 0
+    saved = 0
+    db_batch = []
+    out = open(output_path, 'w', encoding='utf-8') if output_path else None
+
+    try:
+        for row_user_id, project_data in iter_plans(iter_prompts(input_path, user_id), workers, chunk_size):
+            count += 1
+
+            if out:
+                out.write(json.dumps({"user_id": row_user_id, **project_data}) + "\n")
+
+            if to_db:
+                db_batch.append((row_user_id, project_data))
+                if len(db_batch) >= db_batch_size:
+                    saved += save_projects_to_db(db_batch)
+                    db_batch = []
+
+            if report_every and count % report_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"⏱️ {count} prompts planned ({count / elapsed:.0f} prompts/s)")
+
+        if db_batch:
+            saved += save_projects_to_db(db_batch)
+    finally:
+        if out:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "prompts": count,
+        "saved": saved,
+        "seconds": round(elapsed, 3),
+        "prompts_per_second": round(count / elapsed, 1) if elapsed > 0 else 0.0
+    }
+    print(f"✅ Batch complete: {count} prompts in {stats['seconds']}s "
+          f"({stats['prompts_per_second']} prompts/s), {saved} saved to database")
+    return stats
@@ -0,0 +1,677 @@
+"""Micro-benchmarks for the chat pipeline
+
+Run with: python -m project_creator bench <name>
+"""
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+SAMPLE_PROMPTS = [
+    "Create a web application for task management",
+    "Build a data analysis agent for sales data",
+    "I need a chatbot for customer support",
+    "Develop an automation agent for social media posting",
+    "Make a simple mobile app for fitness tracking",
+    "Create an advanced enterprise dashboard for website analytics",
+    "Build me a portfolio website with a blog",
+    "Design a recipe sharing platform with user profiles and ratings"
+]
+
+def _time_per_call(func, prompts, repeat):
+    """Best-of-3 mean microseconds per call of func over the prompts"""
+    runs = []
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for prompt in prompts:
+                func(prompt)
+        runs.append((time.perf_counter() - start) / (repeat * len(prompts)))
+    return min(runs) * 1e6
+
+# The domain keyword scan analyze_project_requirements used to run on top of detect_project_type
+_LEGACY_DOMAINS = {
+    'web': ['web', 'website', 'frontend', 'backend', 'portfolio', 'e-commerce', 'blog'],
+    'data': ['data', 'analysis', 'analytics', 'chart', 'graph', 'dashboard', 'report'],
+    'chat': ['chat', 'bot', 'conversation', 'assistant', 'support', 'customer service'],
+    'automation': ['automation', 'auto', 'script', 'task', 'schedule', 'reminder'],
+    'mobile': ['mobile', 'app', 'ios', 'android', 'phone', 'tablet'],
+    'game': ['game', 'gaming', '2d', '3d', 'player', 'level']
+}
+
+def _legacy_plan(prompt):
+    from project_manager import detect_project_type, plan_project
+
+    prompt_lower = prompt.lower()
+    [domain for domain, keywords in _LEGACY_DOMAINS.items() if any(k in prompt_lower for k in keywords)]
+    detect_project_type(prompt)
+    return plan_project(prompt)
+
+def bench_planning(repeat=200):
+    """Unified planning pipeline vs. the old double classification"""
+    from project_manager import plan_project
+
+    legacy = _time_per_call(_legacy_plan, SAMPLE_PROMPTS, repeat)
+    unified = _time_per_call(plan_project, SAMPLE_PROMPTS, repeat)
+    print(f"two classifiers + plan : {legacy:8.1f} µs/prompt")
+    print(f"unified plan_project   : {unified:8.1f} µs/prompt")
+    print(f"saved per message      : {legacy - unified:8.1f} µs ({(1 - unified / legacy) * 100:.0f}%)")
+    return {"legacy_us": legacy, "unified_us": unified}
+
+def _synthetic_turns(turns, users, seed=7):
+    """Yield (user_id, message, response) turns: canned replies, blueprints and follow-ups"""
+    from llm_handler import (
+        generate_comprehensive_response, generate_follow_up_response, FOLLOW_UP_TOPICS
+    )
+    from project_manager import plan_project
+
+    rng = random.Random(seed)
+    canned = [
+        "👋 **Hi there!** I'm excited to help you bring your project ideas to life!",
+        "🤖 **I'm functioning optimally and ready to architect your next project!** " * 8,
+        "💡 **PROJECT CREATION MODE ACTIVATED!** I can help you design and plan various types of projects. " * 10,
+        "🎯 **I SPECIALIZE IN PROJECT CREATION & ARCHITECTURE** Simply describe what you want to build. " * 8
+    ]
+    topics = list(FOLLOW_UP_TOPICS)
+    subjects = ["recipes", "fitness", "invoices", "sales", "tickets", "books", "travel", "music", "pets", "weather"]
+
+    for i in range(turns):
+        user_id = rng.randrange(users)
+        kind = rng.random()
+        if kind < 0.45:
+            yield user_id, "hi", rng.choice(canned)
+        else:
+            prompt = f"{rng.choice(SAMPLE_PROMPTS)} for {rng.choice(subjects)} #{i}"
+            plan = plan_project(prompt)
+            if kind < 0.85:
+                yield user_id, prompt, generate_comprehensive_response(plan.project_data, plan.analysis, prompt)
+            else:
+                yield user_id, "elaborate", generate_follow_up_response(plan.project_data, rng.choice(topics))
+
+def bench_chat_storage(turns=1_000_000, users=1000, reads=2000):
+    """Database size and history read latency: verbatim responses vs. hashed + compressed"""
+    from chat_history import resolve_history_rows
+    from response_store import store_response
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        compact_path = os.path.join(tmp, "compact.db")
+        legacy = sqlite3.connect(legacy_path)
+        compact = sqlite3.connect(compact_path)
+        legacy.execute("CREATE TABLE chat_history (id INTEGER PRIMARY KEY, user_id INTEGER, message TEXT, response TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)")
+        compact.execute("CREATE TABLE chat_history (id INTEGER PRIMARY KEY, user_id INTEGER, message TEXT, response TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, response_hash BLOB)")
+        compact.execute("CREATE TABLE responses (hash BLOB PRIMARY KEY, codec INTEGER NOT NULL, body BLOB NOT NULL) WITHOUT ROWID")
+        for conn in (legacy, compact):
+            conn.execute("CREATE INDEX idx_chat_history_user ON chat_history (user_id, id)")
+
+        compact_cursor = compact.cursor()
+        with legacy, compact:
+            for user_id, message, response in _synthetic_turns(turns, users):
+                legacy.execute("INSERT INTO chat_history (user_id, message, response) VALUES (?, ?, ?)", (user_id, message, response))
+                digest = store_response(compact_cursor, response)
+                compact_cursor.execute("INSERT INTO chat_history (user_id, message, response, response_hash) VALUES (?, ?, '', ?)", (user_id, message, digest))
+        for conn in (legacy, compact):
+            conn.execute("VACUUM")
+
+        rng = random.Random(11)
+        sample_users = [rng.randrange(users) for _ in range(reads)]
+
+        def read_legacy(user_id):
+            legacy.execute("SELECT message, response, timestamp FROM chat_history WHERE user_id = ? ORDER BY id DESC LIMIT 10", (user_id,)).fetchall()
+
+        def read_compact(user_id):
+            cursor = compact.cursor()
+            cursor.execute("SELECT message, response, response_hash, timestamp FROM chat_history WHERE user_id = ? ORDER BY id DESC LIMIT 10", (user_id,))
+            resolve_history_rows(cursor, cursor.fetchall())
+
+        results = {}
+        for name, reader, path in (("verbatim", read_legacy, legacy_path), ("compact", read_compact, compact_path)):
+            latencies = []
+            for user_id in sample_users:
+                start = time.perf_counter()
+                reader(user_id)
+                latencies.append((time.perf_counter() - start) * 1e6)
+            latencies.sort()
+            results[name] = {
+                "size_mb": os.path.getsize(path) / 1e6,
+                "p50_us": statistics.median(latencies),
+                "p99_us": latencies[int(len(latencies) * 0.99) - 1]
+            }
+        legacy.close()
+        compact.close()
+
+    print(f"{turns} turns, {users} users, last-10 reads x{reads}")
+    for name, r in results.items():
+        print(f"{name:9s}: {r['size_mb']:8.1f} MB   read p50 {r['p50_us']:7.1f} µs   p99 {r['p99_us']:7.1f} µs")
+    return results
+
+def _synthetic_prompts(count, seed=3):
+    rng = random.Random(seed)
+    verbs = ["Create", "Build", "Make", "Develop", "I need", "Design"]
+    things = [
+        "a website for my bakery", "an online store for handmade jewelry", "a blog with comments",
+        "a sales dashboard with charts", "a csv report generator", "an analytics tool for survey data",
+        "a customer support chatbot", "an AI assistant for FAQ answers", "a bot for slack conversations",
+        "a script to automate invoice emails", "a scheduled task runner", "a workflow automation for HR",
+        "an android app for habit tracking", "an ios app for recipes", "a mobile app for gym members",
+        "a tool for my team", "something cool", "a platform for tutors"
+    ]
+    extras = ["", " with user login", " using react", " with daily reports", " that runs every night", " for phones"]
+    return [f"{rng.choice(verbs)} {rng.choice(things)}{rng.choice(extras)}" for _ in range(count)]
+
+def bench_classifier(count=5000):
+    """Regex detect_project_type vs. batched TF-IDF scoring: speed and agreement"""
+    from project_manager import detect_project_type_regex
+    from tfidf_classifier import np, train_classifier, training_documents
+
+    if np is None:
+        print("numpy is not installed; skipping")
+        return None
+
+    prompts = _synthetic_prompts(count)
+    model = train_classifier(training_documents(include_history=False))
+
+    start = time.perf_counter()
+    regex_labels = [detect_project_type_regex(prompt) for prompt in prompts]
+    regex_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tfidf_labels = model.predict(prompts)
+    tfidf_seconds = time.perf_counter() - start
+
+    agreement = sum(a == b for a, b in zip(regex_labels, tfidf_labels)) / count
+    print(f"{count} prompts, {len(model.vocabulary)} terms")
+    print(f"regex  : {regex_seconds * 1e3:8.1f} ms ({regex_seconds / count * 1e6:6.1f} µs/prompt)")
+    print(f"tf-idf : {tfidf_seconds * 1e3:8.1f} ms ({tfidf_seconds / count * 1e6:6.1f} µs/prompt, one batch)")
+    print(f"agreement with regex: {agreement * 100:.1f}%")
+    return {"regex_s": regex_seconds, "tfidf_s": tfidf_seconds, "agreement": agreement}
+
+def bench_session_memory(sessions=300, turns_per_session=100, budget_mb=16):
+    """Memory held by chat sessions: unbounded message lists vs. bounded SessionMessages"""
+    import tracemalloc
+    from session_messages import SessionMemoryRegistry, SessionMessages
+
+    turns = list(_synthetic_turns(sessions * turns_per_session, sessions))
+    results = {}
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    unbounded = {user_id: [] for user_id in range(sessions)}
+    for user_id, message, response in turns:
+        # What st.session_state.messages held: two dicts and a private copy of each string
+        unbounded[user_id].append({"role": "user", "content": "".join(message)})
+        unbounded[user_id].append({"role": "assistant", "content": "".join(response)})
+    results["unbounded"] = (tracemalloc.get_traced_memory()[0] - baseline) / 1e6
+    del unbounded
+
+    baseline = tracemalloc.get_traced_memory()[0]
+    registry = SessionMemoryRegistry(budget_bytes=budget_mb * 1024 * 1024)
+    bounded = {user_id: SessionMessages(user_id, registry=registry) for user_id in range(sessions)}
+    for chat_id, (user_id, message, response) in enumerate(turns, 1):
+        bounded[user_id].add_turn("".join(message), "".join(response), chat_id)
+    results["bounded"] = (tracemalloc.get_traced_memory()[0] - baseline) / 1e6
+    tracemalloc.stop()
+
+    report = registry.report()
+    largest = report["sessions"][0]["bytes"] if report["sessions"] else 0
+    print(f"{sessions} sessions x {turns_per_session} turns, budget {budget_mb} MB")
+    print(f"unbounded message lists : {results['unbounded']:8.1f} MB")
+    print(f"SessionMessages         : {results['bounded']:8.1f} MB "
+          f"(reported {report['bytes'] / 1e6:.1f} MB, largest session {largest / 1e3:.1f} KB)")
+    return results
+
+def _legacy_classify(prompt):
+    """Whole-message classification as it worked before windowing: several lowercase copies and full rescans"""
+    import re
+    from project_manager import PROJECT_TYPE_PATTERNS, PROJECT_TYPE_KEYWORDS, COMPLEXITY_INDICATORS
+
+    message_lower = prompt.lower()
+    any(keyword in message_lower for keyword in ['create', 'build', 'make', 'develop', 'design', 'start', 'begin'])
+    prompt_lower = prompt.lower()
+    scores = {}
+    for project_type, patterns in PROJECT_TYPE_PATTERNS.items():
+        score = sum(len(re.findall(pattern, prompt_lower)) * 2 for pattern in patterns)
+        score += sum(3 for keyword in PROJECT_TYPE_KEYWORDS[project_type] if keyword in prompt_lower)
+        scores[project_type] = score
+    best_type, best_score = max(scores.items(), key=lambda x: x[1])
+    complexity_lower = prompt.lower()
+    [level for level, words in COMPLEXITY_INDICATORS.items() if any(word in complexity_lower for word in words)]
+    len(prompt.split())
+    return best_type if best_score > 2 else 'custom'
+
+def _adversarial_prompts(size):
+    filler = "The quick brown fox jumps over the lazy dog. "
+    return {
+        "pasted requirements doc": (" ".join(SAMPLE_PROMPTS) + " ") * (size // 400),
+        "no keywords (streams to cap)": "zzzz " * (size // 5),
+        "near-miss prefixes": "autoauto scrip chatt " * (size // 21),
+        "single huge token": "a" * size,
+        "keyword only at the end": filler * (size // len(filler)) + "build a website"
+    }
+
+def bench_adversarial(size=5_000_000):
+    """Whole-message classification vs. windowed/streamed classification on huge inputs"""
+    from llm_handler import is_project_creation_request
+    from project_manager import classify_prompt
+
+    def windowed(prompt):
+        is_project_creation_request(prompt)
+        return classify_prompt(prompt)['domains'][0]
+
+    print(f"{size / 1e6:.0f} MB inputs")
+    results = {}
+    for name, prompt in _adversarial_prompts(size).items():
+        timings = {}
+        for label, func in (("whole", _legacy_classify), ("windowed", windowed)):
+            start = time.perf_counter()
+            project_type = func(prompt)
+            timings[label] = (time.perf_counter() - start, project_type)
+        results[name] = timings
+        print(f"{name:30s} whole {timings['whole'][0] * 1e3:8.1f} ms ({timings['whole'][1]:16s})"
+              f"  windowed {timings['windowed'][0] * 1e3:8.1f} ms ({timings['windowed'][1]})")
+    return results
+
+def _sharded_writer(paths, worker, writes, users):
+    """Save `writes` chat turns for random users, one transaction per turn, routed to their shard"""
+    from database import shard_for_user
+
+    rng = random.Random(worker)
+    conns = [sqlite3.connect(path, timeout=60) for path in paths]
+    start = time.perf_counter()
+    for i in range(writes):
+        user_id = rng.randrange(users)
+        with conns[shard_for_user(user_id, len(paths))] as conn:
+            conn.execute(
+                "INSERT INTO chat_history (user_id, message, response) VALUES (?, ?, ?)",
+                (user_id, f"message {i}", f"response {i} " * 20)
+            )
+    elapsed = time.perf_counter() - start
+    for conn in conns:
+        conn.close()
+    return elapsed
+
+def bench_sharded_writes(writers=8, writes=2000, users=1000, shards=4):
+    """Concurrent chat_history writers: one database file vs. per-user shard files"""
+    from concurrent.futures import ProcessPoolExecutor
+    from database import init_shard
+
+    results = {}
+    for count in (1, shards):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, f"shard{index}.db") for index in range(count)]
+            for path in paths:
+                init_shard(path)
+            start = time.perf_counter()
+            with ProcessPoolExecutor(writers) as pool:
+                list(pool.map(_sharded_writer, [paths] * writers, range(writers), [writes] * writers, [users] * writers))
+            elapsed = time.perf_counter() - start
+        results[count] = writers * writes / elapsed
+        print(f"{count} shard(s): {writers} writers x {writes} turns in {elapsed:6.2f} s ({results[count]:8.0f} turns/s)")
+    return results
+
+class _FifoScheduler:
+    """What the app did before: first come, first served, only the concurrency bound"""
+
+    def __init__(self, max_concurrent, clock):
+        from collections import deque
+
+        self.max_concurrent = max_concurrent
+        self.clock = clock
+        self.active = 0
+        self.queue = deque()
+
+    def submit(self, user_id):
+        from fair_scheduler import Ticket
+
+        ticket = Ticket(user_id, 1, 0, self.clock())
+        self.queue.append(ticket)
+        return ticket
+
+    def dispatch(self):
+        granted = []
+        while self.queue and self.active < self.max_concurrent:
+            ticket = self.queue.popleft()
+            ticket.granted = True
+            ticket.granted_at = self.clock()
+            self.active += 1
+            granted.append(ticket)
+        return granted
+
+    def release(self, ticket):
+        self.active -= 1
+
+def _simulate_chat_load(scheduler, clock, duration, service_seconds, flood_interval, normal_users, normal_interval):
+    """Drive a scheduler on a simulated clock: user 0 floods, the others send a message every normal_interval"""
+    from fair_scheduler import RateLimited
+
+    step = 0.01
+    next_send = {0: 0.0}
+    next_send.update({user_id: user_id * normal_interval / (normal_users + 1) for user_id in range(1, normal_users + 1)})
+    waits = {user_id: [] for user_id in next_send}
+    sent = {user_id: 0 for user_id in next_send}
+    rejected = {user_id: 0 for user_id in next_send}
+    running = []
+    for tick in range(int(duration / step)):
+        clock[0] = now = tick * step
+        for user_id, due in next_send.items():
+            if now >= due:
+                sent[user_id] += 1
+                try:
+                    scheduler.submit(user_id)
+                except RateLimited:
+                    rejected[user_id] += 1
+                next_send[user_id] = due + (flood_interval if user_id == 0 else normal_interval)
+        for ticket in [t for t in running if now >= t.granted_at + service_seconds]:
+            running.remove(ticket)
+            scheduler.release(ticket)
+        for ticket in scheduler.dispatch():
+            waits[ticket.user_id].append(now - ticket.submitted_at)
+            running.append(ticket)
+    return waits, sent, rejected
+
+def bench_fair_scheduling(duration=300, service_seconds=0.5, flood_interval=0.05, normal_users=9, normal_interval=5):
+    """One scripted client flooding the chat: FIFO with bounded concurrency vs. the fair scheduler (simulated clock)"""
+    from fair_scheduler import FairScheduler
+
+    clock = [0.0]
+    setups = {
+        "fifo": _FifoScheduler(max_concurrent=2, clock=lambda: clock[0]),
+        "fair": FairScheduler(max_concurrent=2, rate=0.5, burst=5, max_queued=5, clock=lambda: clock[0])
+    }
+
+    print(f"{duration}s simulated, {service_seconds}s per request, 2 slots; user 0 sends every {flood_interval}s, "
+          f"{normal_users} users every {normal_interval}s")
+    results = {}
+    for name, scheduler in setups.items():
+        waits, sent, rejected = _simulate_chat_load(scheduler, clock, duration, service_seconds,
+                                              flood_interval, normal_users, normal_interval)
+        normal = sorted(wait for user_id in range(1, normal_users + 1) for wait in waits[user_id])
+        served = sum(len(waits[user_id]) for user_id in range(1, normal_users + 1))
+        normal_sent = sum(sent[user_id] for user_id in range(1, normal_users + 1))
+        results[name] = {
+            "normal_p50_s": statistics.median(normal) if normal else None,
+            "normal_p99_s": normal[int(len(normal) * 0.99) - 1] if normal else None,
+            "normal_served": served,
+            "flood_served": len(waits[0]),
+            "flood_rejected": rejected[0]
+        }
+        r = results[name]
+        p50 = f"{r['normal_p50_s']:7.2f}" if normal else "    n/a"
+        p99 = f"{r['normal_p99_s']:7.2f}" if normal else "    n/a"
+        print(f"{name}: normal users served {served}/{normal_sent}, wait p50 {p50} s p99 {p99} s; "
+              f"flooder served {r['flood_served']}/{sent[0]}, rejected {r['flood_rejected']}")
+    return results
+
+def bench_profiler(calls=2000):
+    """Cost of the request profiler: off, sampling 5% and 100% of planning + rendering calls"""
+    from llm_handler import generate_comprehensive_response
+    from project_manager import plan_project
+    from request_profiler import RequestProfiler, format_top
+
+    def turn(prompt):
+        plan = plan_project(prompt)
+        return generate_comprehensive_response(plan.project_data, plan.analysis, prompt)
+
+    prompts = SAMPLE_PROMPTS * (calls // len(SAMPLE_PROMPTS))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, rate in (("off", 0.0), ("5%", 0.05), ("100%", 1.0)):
+            profiler = RequestProfiler(sample_rate=rate, output_dir=tmp, flush_every=0)
+            func = profiler.sampled("turn")(turn)
+            results[name] = _time_per_call(func, prompts, 1)
+            print(f"{name:5s}: {results[name]:8.1f} µs/call")
+        print(format_top(profiler.stacks("turn"), 8, "hottest functions at 100%:"))
+    return results
+
+_FIRST_REQUEST_SCRIPT = """
+import sys, time
+warm = sys.argv[1] == 'warm'
+start = time.perf_counter()
+import llm_handler, chat_history, project_manager
+if warm:
+    from warmup import Warmup
+    Warmup().run()
+ready = time.perf_counter() - start
+
+def request(prompt):
+    started = time.perf_counter()
+    llm_handler.is_project_creation_request(prompt)
+    llm_handler.render_blueprint(prompt)
+    chat_history.get_chat_page(1, 20)
+    project_manager.get_user_projects(1)
+    return (time.perf_counter() - started) * 1000
+
+first = request(sys.argv[2])
+steady = sorted(request(sys.argv[2]) for _ in range(200))[100]
+print(f"{ready * 1000:.1f} {first:.3f} {steady:.3f}")
+"""
+
+def bench_warmup(history_turns=20000):
+    """First-request latency of a fresh process, with and without the startup warm-up"""
+    import subprocess
+    import sys
+
+    popular = SAMPLE_PROMPTS[0]
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [package_dir, os.environ.get("PYTHONPATH")])))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        seed = (
+            "import chat_history, random\n"
+            "rng = random.Random(5)\n"
+            f"prompts = {SAMPLE_PROMPTS!r}\n"
+            f"for i in range({history_turns}):\n"
+            "    chat_history.save_chat_history(rng.randrange(100), rng.choice(prompts), 'reply')\n"
+        )
+        subprocess.run([sys.executable, "-c", seed], cwd=tmp, env=env, check=True, capture_output=True)
+        for mode in ("cold", "warm"):
+            output = subprocess.run(
+                [sys.executable, "-c", _FIRST_REQUEST_SCRIPT, mode, popular],
+                cwd=tmp, env=env, check=True, capture_output=True, text=True
+            ).stdout.strip().splitlines()[-1]
+            startup_ms, first_ms, steady_ms = map(float, output.split())
+            results[mode] = {"startup_ms": startup_ms, "first_ms": first_ms, "steady_ms": steady_ms}
+            print(f"{mode}: startup {startup_ms:7.1f} ms   first request {first_ms:7.3f} ms   steady state {steady_ms:7.3f} ms")
+    return results
+
+def bench_analytics(sizes=(10_000, 100_000), users=500):
+    """Technology counts for a dashboard: scanning projects vs. reading the project_stats aggregates"""
+    import json
+    from collections import Counter
+    from database import init_shard
+    from project_analytics import GLOBAL_USER
+    from project_manager import _insert_projects, plan_projects
+
+    plans = plan_projects(_synthetic_prompts(2000))
+    rng = random.Random(17)
+    results = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "analytics.db")
+            init_shard(path)
+            conn = sqlite3.connect(path)
+            with conn:
+                cursor = conn.cursor()
+                projects = [(rng.randrange(1, users), rng.choice(plans).project_data) for _ in range(size)]
+                for start in range(0, size, 5000):
+                    _insert_projects(cursor, projects[start:start + 5000])
+                # What a dashboard over the legacy JSON column would have decoded
+                cursor.executemany("UPDATE projects SET technologies = ? WHERE id = ?",
+                                   [(json.dumps(data["recommended_tech"]), i) for i, (_, data) in enumerate(projects, 1)])
+
+            def scan():
+                counts = Counter()
+                for (technologies,) in conn.execute("SELECT technologies FROM projects"):
+                    counts.update(json.loads(technologies))
+                return counts
+
+            def aggregates():
+                return dict(conn.execute(
+                    "SELECT value, SUM(count) FROM project_stats WHERE user_id = ? AND dimension = 'technology' GROUP BY value",
+                    (GLOBAL_USER,)
+                ).fetchall())
+
+            timings = {}
+            for name, func in (("scan", scan), ("aggregates", aggregates)):
+                start = time.perf_counter()
+                func()
+                timings[name] = (time.perf_counter() - start) * 1e3
+            assert dict(scan()) == aggregates()
+            conn.close()
+        results[size] = timings
+        print(f"{size:8d} projects: scan + JSON decode {timings['scan']:8.2f} ms   aggregates {timings['aggregates']:6.2f} ms")
+    return results
+
+def bench_event_loop(operations=2000, concurrency=50, write_ratio=0.2, users=200):
+    """Event loop lag under mixed project reads/writes: sync calls in coroutines vs. async_db"""
+    import asyncio
+    import database
+    from async_db import close_executors, get_user_projects_async, save_project_to_db_async
+    from project_manager import get_user_projects, plan_projects, save_project_to_db
+
+    plans = [plan.project_data for plan in plan_projects(SAMPLE_PROMPTS)]
+
+    async def run(mode):
+        rng = random.Random(23)
+        lags = []
+        stop = asyncio.Event()
+
+        async def ticker():
+            # How late a 1 ms timer fires is how long other coroutines were stuck behind database calls
+            loop = asyncio.get_running_loop()
+            while not stop.is_set():
+                expected = loop.time() + 0.001
+                await asyncio.sleep(0.001)
+                lags.append((loop.time() - expected) * 1e3)
+
+        async def client(count):
+            for _ in range(count):
+                user_id = rng.randrange(1, users)
+                if rng.random() < write_ratio:
+                    if mode == "sync":
+                        save_project_to_db(user_id, rng.choice(plans))
+                    else:
+                        await save_project_to_db_async(user_id, rng.choice(plans))
+                elif mode == "sync":
+                    get_user_projects(user_id)
+                else:
+                    await get_user_projects_async(user_id)
+                await asyncio.sleep(0)
+
+        tick = asyncio.ensure_future(ticker())
+        start = time.perf_counter()
+        await asyncio.gather(*(client(operations // concurrency) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await tick
+        lags.sort()
+        return {
+            "ops_per_s": operations / elapsed,
+            "lag_p50_ms": statistics.median(lags),
+            "lag_p99_ms": lags[int(len(lags) * 0.99) - 1],
+            "lag_max_ms": lags[-1],
+            "ticks": len(lags)
+        }
+
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            database.init_db()
+            for mode in ("sync", "async"):
+                results[mode] = asyncio.run(run(mode))
+            close_executors()
+        finally:
+            os.chdir(cwd)
+            database.init_db()
+
+    print(f"{operations} operations ({write_ratio:.0%} project saves), {concurrency} concurrent clients")
+    for mode, r in results.items():
+        print(f"{mode:5s}: {r['ops_per_s']:7.0f} ops/s   timer lag p50 {r['lag_p50_ms']:6.2f} ms  "
+              f"p99 {r['lag_p99_ms']:7.2f} ms  max {r['lag_max_ms']:7.2f} ms  ({r['ticks']} ticks)")
+    return results
+
+def bench_scaffold(projects=200, components=5000, workers=4):
+    """Scaffold generation: template cache, streamed vs. materialized archives, serial vs. parallel batches"""
+    import io
+    import tracemalloc
+    import zipfile
+    from project_manager import plan_projects
+    from scaffold import TemplateCache, iter_archive, iter_scaffold_files, scaffold_many
+
+    plans = [plan.project_data for plan in plan_projects(_synthetic_prompts(projects))]
+
+    def per_scaffold_ms(make_cache):
+        start = time.perf_counter()
+        for project_data in plans:
+            for _ in iter_scaffold_files(project_data, make_cache()):
+                pass
+        return (time.perf_counter() - start) * 1e3 / len(plans)
+
+    warm = TemplateCache()
+    cold_ms = per_scaffold_ms(TemplateCache)
+    warm_ms = per_scaffold_ms(lambda: warm)
+    print(f"render per scaffold    : cold templates {cold_ms:6.3f} ms   cached {warm_ms:6.3f} ms")
+
+    # One very large scaffold: a component directory per entry
+    large = dict(plans[0], components=[f"Service {index}" for index in range(components)])
+
+    def materialized(path):
+        files = dict(iter_scaffold_files(large))
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, data in files.items():
+                archive.writestr(name, data)
+        with open(path, "wb") as f:
+            f.write(buffer.getvalue())
+
+    def streamed(fmt):
+        def write(path):
+            with open(path, "wb") as f:
+                for chunk in iter_archive(large, fmt):
+                    f.write(chunk)
+        return write
+
+    results = {"cold_ms": cold_ms, "warm_ms": warm_ms}
+    with tempfile.TemporaryDirectory() as tmp:
+        variants = (("materialized zip", materialized), ("streamed zip", streamed("zip")), ("streamed tar.gz", streamed("tar.gz")))
+        for name, func in variants:
+            path = os.path.join(tmp, name.replace(" ", "."))
+            tracemalloc.start()
+            start = time.perf_counter()
+            func(path)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results[name] = {"seconds": elapsed, "peak_bytes": peak}
+            print(f"{name:16s}: {components} components, {os.path.getsize(path) / 1024:7.0f} KB "
+                  f"in {elapsed:5.2f}s, peak {peak / 1024 / 1024:6.2f} MB")
+
+        for count in (1, workers):
+            output = os.path.join(tmp, f"batch-{count}")
+            start = time.perf_counter()
+            for _ in scaffold_many(((f"{index}-project", data) for index, data in enumerate(plans)),
+                                   output, fmt="tar.gz", workers=count):
+                pass
+            elapsed = time.perf_counter() - start
+            results[f"workers_{count}"] = elapsed
+            print(f"batch {len(plans)} tar.gz, {count} worker(s): {len(plans) / elapsed:7.0f} scaffolds/s")
+    return results
+
+BENCHMARKS = {
+    "planning": bench_planning,
+    "chat_storage": bench_chat_storage,
+    "classifier": bench_classifier,
+    "session_memory": bench_session_memory,
+    "adversarial": bench_adversarial,
+    "sharded_writes": bench_sharded_writes,
+    "fair_scheduling": bench_fair_scheduling,
+    "profiler": bench_profiler,
+    "warmup": bench_warmup,
+    "analytics": bench_analytics,
+    "event_loop": bench_event_loop,
+    "scaffold": bench_scaffold
+}
@@ -0,0 +1,97 @@
+from database import get_db_connection, get_user_db_connection, iter_shards
+from conversation_context import context_store
+from response_store import store_response, fetch_responses
+
+def save_chat_history(user_id, message, response):
+    """Save chat history to database
+
+    The response body is stored once, compressed, in the responses table and
+    referenced by hash, so repeated replies cost only a 16-byte reference.
+    Returns the chat_history row id.
+    """
+    conn = get_user_db_connection(user_id)
+    cursor = conn.cursor()
+    digest = store_response(cursor, response)
+    cursor.execute(
+        "INSERT INTO chat_history (user_id, message, response, response_hash) VALUES (?, ?, '', ?)",
+        (user_id, message, digest)
+    )
+    chat_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+    context_store.record_turn(user_id, message)
+    return chat_id
+
+def resolve_history_rows(cursor, rows):
+    """Replace (message, response, response_hash, timestamp) rows with (message, response_text, timestamp)"""
+    texts = fetch_responses(cursor, [digest for _, _, digest, _ in rows if digest is not None])
+    return [
+        (message, texts[digest] if digest is not None else response, timestamp)
+        for message, response, digest, timestamp in rows
+    ]
+
+def get_chat_history(user_id, limit=10):
+    """Retrieve chat history for a user"""
+    conn = get_user_db_connection(user_id)
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT message, response, response_hash, timestamp FROM chat_history WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+        (user_id, limit)
+    )
+    history = resolve_history_rows(cursor, cursor.fetchall())
+    conn.close()
+    return history
+
+def get_chat_page(user_id, limit, before_id=None):
+    """(id, message, response) turns for a user, oldest first, ending just before `before_id`"""
+    conn = get_user_db_connection(user_id)
+    cursor = conn.cursor()
+    if before_id is None:
+        cursor.execute(
+            "SELECT id, message, response, response_hash FROM chat_history WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+            (user_id, limit)
+        )
+    else:
+        cursor.execute(
+            "SELECT id, message, response, response_hash FROM chat_history WHERE user_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+            (user_id, before_id, limit)
+        )
+    rows = cursor.fetchall()
+    resolved = resolve_history_rows(cursor, [(message, response, digest, row_id) for row_id, message, response, digest in rows])
+    conn.close()
+    return [(row_id, message, response) for message, response, row_id in reversed(resolved)]
+
+def compact_chat_history(batch_size=5000):
+    """Move legacy inline responses into the deduplicated responses table
+
+    Works through rows in id order, shard by shard, one transaction per
+    batch, so it can run against a live database and be interrupted safely.
+    """
+    compacted = 0
+    for shard in iter_shards():
+        conn = get_db_connection(shard=shard)
+        cursor = conn.cursor()
+        last_id = 0
+        try:
+            while True:
+                cursor.execute(
+                    "SELECT id, response FROM chat_history WHERE id > ? AND response_hash IS NULL ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                
+                with conn:
+                    updates = [(store_response(cursor, response), row_id) for row_id, response in rows]
+                    cursor.executemany(
+                        "UPDATE chat_history SET response = '', response_hash = ? WHERE id = ?",
+                        updates
+                    )
+                compacted += len(rows)
+                last_id = rows[-1][0]
+        finally:
+            conn.close()
+    
+    print(f"🗜️ Compacted {compacted} chat history responses")
+    return compacted
@@ -1,14 +1,28 @@
 import os
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+def _find_dotenv():
+    """The nearest .env from this file's directory upwards, as load_dotenv() searches"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        path = os.path.join(directory, ".env")
+        if os.path.isfile(path):
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+# Load environment variables; python-dotenv is only imported when there is a .env to read
+_dotenv_path = _find_dotenv()
+if _dotenv_path:
+    from dotenv import load_dotenv
+    load_dotenv(_dotenv_path)
 
 # JWT Configuration
 SECRET_KEY = os.getenv("SECRET_KEY")
-if not SECRET_KEY:
+USING_FALLBACK_SECRET_KEY = not SECRET_KEY
+if USING_FALLBACK_SECRET_KEY:
     SECRET_KEY = "your_random_secret_key"
-    print("⚠️ Using fallback SECRET_KEY - set SECRET_KEY in .env for production")
 
 # App Configuration
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
@@ -21,20 +35,109 @@ def is_valid_api_key(api_key):
     return api_key.startswith('sk-') and len(api_key) > 20
 
 # Validate the key
-if OPENAI_API_KEY and is_valid_api_key(OPENAI_API_KEY):
-    print("✅ Valid OpenAI API key detected")
-    OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
-else:
-    print("❌ No valid OpenAI API key found")
-    print("💡 Set OPENAI_API_KEY in your .env file")
+if not (OPENAI_API_KEY and is_valid_api_key(OPENAI_API_KEY)):
     OPENAI_API_KEY = None  # Explicitly set to None
-    OPENAI_MODEL = None
 
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
 
 # Database Configuration
 DATABASE_NAME = "llm_app.db"
 
-print(f"🔧 Config loaded: OPENAI_API_KEY exists: {bool(OPENAI_API_KEY)}")
+# Per-user tables are split across DB_SHARDS files by user_id hash (1 = everything in DATABASE_NAME).
+# Applies to new databases; change an existing one with: python -m project_creator reshard N
+DB_SHARDS = int(os.getenv("DB_SHARDS", 1))
+DB_SHARD_PATTERN = os.getenv("DB_SHARD_PATTERN", "llm_app.shard{index}-of-{count}.db")
+
+# Online backups (python -m project_creator backup) and chat history retention
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", 256))
+BACKUP_STEP_SLEEP_SECONDS = float(os.getenv("BACKUP_STEP_SLEEP_SECONDS", 0.05))
+BACKUP_FULL_EVERY = int(os.getenv("BACKUP_FULL_EVERY", 24))
+BACKUP_KEEP_FULL = int(os.getenv("BACKUP_KEEP_FULL", 4))
+CHAT_RETENTION_DAYS = int(os.getenv("CHAT_RETENTION_DAYS", 0))
+CHAT_ARCHIVE_DIR = os.getenv("CHAT_ARCHIVE_DIR", "archives")
+
+# Conversation context memory (shared across users, evicted least-recently-used)
+CONTEXT_MEMORY_BUDGET_BYTES = int(os.getenv("CONTEXT_MEMORY_BUDGET_BYTES", 2 * 1024 * 1024))
+CONTEXT_SUMMARY_TURNS = int(os.getenv("CONTEXT_SUMMARY_TURNS", 6))
+
+# Per-session chat messages kept in memory; older turns are paged back from chat_history
+SESSION_MESSAGE_TURNS = int(os.getenv("SESSION_MESSAGE_TURNS", 20))
+SESSION_HISTORY_PAGE_TURNS = int(os.getenv("SESSION_HISTORY_PAGE_TURNS", 10))
+SESSION_MEMORY_BUDGET_BYTES = int(os.getenv("SESSION_MEMORY_BUDGET_BYTES", 64 * 1024 * 1024))
+
+# Prompt classification reads the first CLASSIFY_WINDOW_CHARS characters; inconclusive
+# long prompts are streamed window by window up to CLASSIFY_STREAM_MAX_CHARS
+CLASSIFY_WINDOW_CHARS = int(os.getenv("CLASSIFY_WINDOW_CHARS", 4096))
+CLASSIFY_STREAM_MAX_CHARS = int(os.getenv("CLASSIFY_STREAM_MAX_CHARS", 1024 * 1024))
+
+# Project type classifier: "regex" (default) or "tfidf" (needs numpy and a trained model file)
+PROJECT_CLASSIFIER = os.getenv("PROJECT_CLASSIFIER", "regex").lower()
+PROJECT_CLASSIFIER_PATH = os.getenv("PROJECT_CLASSIFIER_PATH", "project_classifier.npz")
+
+# Background job queue for project creation
+JOB_QUEUE_WORKERS = int(os.getenv("JOB_QUEUE_WORKERS", 2))
+JOB_QUEUE_MAX_RETRIES = int(os.getenv("JOB_QUEUE_MAX_RETRIES", 2))
+JOB_QUEUE_PERSIST = os.getenv("JOB_QUEUE_PERSIST", "false").lower() in ("1", "true", "yes")
+# Finished jobs left in the persisted jobs table are deleted after this many days
+JOB_QUEUE_RETENTION_DAYS = float(os.getenv("JOB_QUEUE_RETENTION_DAYS", 7))
+
+# Async data access (async_db.py): reader threads per database file, and whether to switch files to WAL.
+# WAL lets the reader threads run alongside the writer, but it is opt-in: the journal mode is stored
+# in the database file, so enabling it switches llm_app.db (and the shards) to WAL for every client
+ASYNC_DB_READERS = int(os.getenv("ASYNC_DB_READERS", 4))
+ASYNC_DB_WAL = os.getenv("ASYNC_DB_WAL", "false").lower() in ("1", "true", "yes")
+
+# Fair scheduling of chat requests: per-user token buckets (SCHEDULER_USER_RATE requests/second,
+# bursts of SCHEDULER_USER_BURST) and at most SCHEDULER_MAX_CONCURRENT requests running at once
+SCHEDULER_MAX_CONCURRENT = int(os.getenv("SCHEDULER_MAX_CONCURRENT", 4))
+SCHEDULER_USER_RATE = float(os.getenv("SCHEDULER_USER_RATE", 0.5))
+SCHEDULER_USER_BURST = float(os.getenv("SCHEDULER_USER_BURST", 5))
+SCHEDULER_MAX_QUEUED_PER_USER = int(os.getenv("SCHEDULER_MAX_QUEUED_PER_USER", 5))
+SCHEDULER_MAX_WAIT_SECONDS = float(os.getenv("SCHEDULER_MAX_WAIT_SECONDS", 30))
+
+# Projects a user may create (0 = unlimited); cached counts are re-read from the database this often
+PROJECT_QUOTA_PER_USER = int(os.getenv("PROJECT_QUOTA_PER_USER", 100))
+PROJECT_QUOTA_REFRESH_SECONDS = float(os.getenv("PROJECT_QUOTA_REFRESH_SECONDS", 300))
+
+# Sampling profiler for live requests: fraction of chat turns / reruns to profile (0 = off)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+PROFILE_FLUSH_EVERY = int(os.getenv("PROFILE_FLUSH_EVERY", 20))
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", 30))
+
+# Startup warm-up (warmup.py): compile classifiers, read hot tables and indexes, and pre-render
+# the WARMUP_PRERENDER_PROMPTS most frequent project prompts among the last WARMUP_SCAN_ROWS turns
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+WARMUP_PRERENDER_PROMPTS = int(os.getenv("WARMUP_PRERENDER_PROMPTS", 50))
+WARMUP_SCAN_ROWS = int(os.getenv("WARMUP_SCAN_ROWS", 50000))
+WARMUP_MAX_WAIT_SECONDS = float(os.getenv("WARMUP_MAX_WAIT_SECONDS", 2))
+BLUEPRINT_CACHE_SIZE = int(os.getenv("BLUEPRINT_CACHE_SIZE", 256))
+
+# Usernames allowed to open the analytics admin page (streamlit run admin_analytics.py), comma separated
+ADMIN_USERNAMES = [name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()]
+
+# Project scaffolds (scaffold.py): per-type templates and batch workers
+SCAFFOLD_TEMPLATE_DIR = os.getenv("SCAFFOLD_TEMPLATE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "scaffold_templates"))
+SCAFFOLD_WORKERS = int(os.getenv("SCAFFOLD_WORKERS", 4))
+
+# Cold-import budget for the classifier modules, checked by: python -m project_creator check-import-time
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", 40))
 
+_config_reported = False
 
+def report_config():
+    """Print the configuration warnings once per process (entry points call this, importing config stays silent)"""
+    global _config_reported
+    if _config_reported:
+        return
+    _config_reported = True
+    if USING_FALLBACK_SECRET_KEY:
+        print("⚠️ Using fallback SECRET_KEY - set SECRET_KEY in .env for production")
+    if OPENAI_API_KEY:
+        print("✅ Valid OpenAI API key detected")
+    else:
+        print("❌ No valid OpenAI API key found")
+        print("💡 Set OPENAI_API_KEY in your .env file")
+    print(f"🔧 Config loaded: OPENAI_API_KEY exists: {bool(OPENAI_API_KEY)}")
@@ -0,0 +1,167 @@
+import sys
+import threading
+from collections import OrderedDict, deque
+
+from config import CONTEXT_MEMORY_BUDGET_BYTES, CONTEXT_SUMMARY_TURNS
+from database import get_user_db_connection
+from project_attributes import resolve_project_lists
+
+SUMMARY_SNIPPET_CHARS = 120
+
+class ConversationContext:
+    """The active project blueprint and a rolling summary of recent turns for one user"""
+    __slots__ = ("user_id", "project", "summary", "size")
+
+    def __init__(self, user_id, project=None, summary=()):
+        self.user_id = user_id
+        self.project = project
+        self.summary = deque(summary, maxlen=CONTEXT_SUMMARY_TURNS)
+        self.size = 0
+        self.resize()
+
+    def resize(self):
+        """Recompute the approximate memory held by this context"""
+        size = sys.getsizeof(self) + sum(sys.getsizeof(line) for line in self.summary)
+        if self.project:
+            for value in self.project.values():
+                if isinstance(value, list):
+                    size += sum(sys.getsizeof(item) for item in value)
+                size += sys.getsizeof(value)
+        self.size = size
+        return size
+
+def _snippet(message):
+    message = " ".join(message.split())
+    if len(message) > SUMMARY_SNIPPET_CHARS:
+        message = message[:SUMMARY_SNIPPET_CHARS - 3] + "..."
+    return message
+
+def _load_latest_project(cursor, user_id):
+    cursor.execute(
+        '''SELECT id, name, type, description, features, complexity, technologies, components
+           FROM projects WHERE user_id = ? ORDER BY id DESC LIMIT 1''',
+        (user_id,)
+    )
+    row = cursor.fetchone()
+    if not row:
+        return None
+
+    lists = resolve_project_lists(
+        cursor, [row], 0, {"key_features": 4, "recommended_tech": 6, "components": 7}
+    )[0]
+    return {
+        "project_name": row[1],
+        "project_type": row[2],
+        "description": row[3],
+        "estimated_complexity": row[5],
+        **lists
+    }
+
+def _load_recent_messages(cursor, user_id):
+    cursor.execute(
+        "SELECT message FROM chat_history WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+        (user_id, CONTEXT_SUMMARY_TURNS)
+    )
+    return [_snippet(message) for (message,) in reversed(cursor.fetchall())]
+
+class ConversationContextStore:
+    """In-memory per-user conversation contexts bounded by a byte budget
+
+    A user's context is loaded from projects/chat_history the first time it
+    is needed and kept up to date in memory afterwards, so follow-up turns
+    don't query the database. When the budget is exceeded the least
+    recently used users are evicted and will be reloaded on their next turn.
+    """
+
+    def __init__(self, budget_bytes=CONTEXT_MEMORY_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self._contexts = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def _load(self, user_id):
+        conn = get_user_db_connection(user_id)
+        try:
+            cursor = conn.cursor()
+            project = _load_latest_project(cursor, user_id)
+            summary = _load_recent_messages(cursor, user_id)
+        finally:
+            conn.close()
+        return ConversationContext(user_id, project, summary)
+
+    def _store(self, context):
+        previous = self._contexts.pop(context.user_id, None)
+        if previous is not None:
+            self._total_bytes -= previous.size
+        self._contexts[context.user_id] = context
+        self._total_bytes += context.size
+        self._evict()
+
+    def _evict(self):
+        # Always keep the most recent user, even if it alone exceeds the budget
+        while self._total_bytes > self.budget_bytes and len(self._contexts) > 1:
+            _, evicted = self._contexts.popitem(last=False)
+            self._total_bytes -= evicted.size
+
+    def _update(self, user_id, change, load_missing=True):
+        with self._lock:
+            context = self._contexts.get(user_id)
+        if context is None:
+            if not load_missing:
+                return None
+            context = self._load(user_id)
+
+        with self._lock:
+            context = self._contexts.get(user_id, context)
+            old_size = context.size
+            change(context)
+            context.resize()
+            if user_id in self._contexts:
+                self._contexts.move_to_end(user_id)
+                self._total_bytes += context.size - old_size
+                self._evict()
+            else:
+                self._store(context)
+        return context
+
+    def get(self, user_id):
+        """Get a user's context, loading it from the database on a cache miss"""
+        if user_id is None:
+            return None
+        return self._update(user_id, lambda context: None)
+
+    def remember_project(self, user_id, project_data):
+        """Make a newly created project the user's active project"""
+        if user_id is None:
+            return
+        project = {key: value for key, value in project_data.items() if key != "original_prompt"}
+        self._update(user_id, lambda context: setattr(context, "project", project))
+
+    def record_turn(self, user_id, message):
+        """Append a saved user message to the rolling summary
+
+        Users without a cached context are skipped; their summary is read
+        from chat_history (including this message) when next needed.
+        """
+        if user_id is None:
+            return
+        self._update(user_id, lambda context: context.summary.append(_snippet(message)), load_missing=False)
+
+    def forget(self, user_id):
+        """Drop a user's context (e.g. on logout)"""
+        with self._lock:
+            context = self._contexts.pop(user_id, None)
+            if context is not None:
+                self._total_bytes -= context.size
+
+    def stats(self):
+        """Number of cached users and bytes held"""
+        with self._lock:
+            return {
+                "users": len(self._contexts),
+                "bytes": self._total_bytes,
+                "budget_bytes": self.budget_bytes
+            }
+
+# Process-wide store shared by all Streamlit sessions
+context_store = ConversationContextStore()
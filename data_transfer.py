@@ -0,0 +1,374 @@
+import csv
+import gzip
+import hashlib
+import json
+import os
+
+from database import get_db_connection, iter_shards, shard_for_user
+from response_store import store_response, fetch_responses
+from project_analytics import rebuild_project_stats
+from project_attributes import ATTRIBUTE_KINDS, resolve_project_lists, migrate_json_attributes
+
+# Exportable tables, their columns, and which columns hold JSON-encoded lists
+TABLES = {
+    'projects': {
+        "columns": ["id", "user_id", "name", "type", "description", "features",
+                    "complexity", "technologies", "components", "created_at"],
+        "json_columns": ["features", "technologies", "components"],
+        # Lists live in the interned lookup tables unless the row predates them
+        "attribute_lists": True
+    },
+    'chat_history': {
+        "columns": ["id", "user_id", "message", "response", "timestamp"],
+        "json_columns": [],
+        # Responses live in the responses table, referenced by response_hash
+        "hashed_response": True
+    }
+}
+
+FORMATS = ('jsonl', 'csv', 'columnar')
+
+DEFAULT_FETCH_SIZE = 5000
+DEFAULT_IMPORT_BATCH_SIZE = 50000
+
+# Import checkpoints identify their file by a hash of (up to) this many leading bytes
+FINGERPRINT_BYTES = 64 * 1024
+
+def _table_spec(table):
+    if table not in TABLES:
+        raise ValueError(f"Unknown table '{table}'. Choose from: {', '.join(TABLES)}")
+    return TABLES[table]
+
+def _decode_json(value):
+    if value is None:
+        return []
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return value
+
+def _checkpoint_path(output_path):
+    return f"{output_path}.checkpoint"
+
+def _load_checkpoint(output_path, table, fmt):
+    path = _checkpoint_path(output_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("table") != table or checkpoint.get("format") != fmt:
+        raise ValueError(f"Checkpoint {path} belongs to a different export; remove it to start over")
+    return checkpoint
+
+def _save_checkpoint(output_path, checkpoint):
+    path = _checkpoint_path(output_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+def iter_row_batches(table, after_id=0, fetch_size=DEFAULT_FETCH_SIZE, shard=0):
+    """Stream one shard of a table in id order as lists of dict rows using keyset pagination
+
+    JSON list columns are decoded. Each batch is a separate query
+    (`WHERE id > last_id`), so no long-lived read transaction is held and
+    an interrupted export can pick up after the last id it wrote.
+    """
+    spec = _table_spec(table)
+    columns = spec["columns"]
+    hashed = spec.get("hashed_response", False)
+    selected = columns + ["response_hash"] if hashed else columns
+    query = f"SELECT {', '.join(selected)} FROM {table} WHERE id > ? ORDER BY id LIMIT ?"
+
+    conn = get_db_connection(shard=shard)
+    try:
+        last_id = after_id
+        while True:
+            cursor = conn.execute(query, (last_id, fetch_size))
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+
+            if hashed:
+                texts = fetch_responses(cursor, [row[-1] for row in rows if row[-1] is not None])
+            if spec.get("attribute_lists"):
+                json_indexes = {
+                    kind_spec["plan_key"]: columns.index(kind_spec["json_column"])
+                    for kind_spec in ATTRIBUTE_KINDS.values()
+                }
+                attribute_lists = resolve_project_lists(cursor, rows, columns.index("id"), json_indexes)
+
+            batch = []
+            for position, row in enumerate(rows):
+                record = dict(zip(columns, row))
+                if spec.get("attribute_lists"):
+                    for kind_spec in ATTRIBUTE_KINDS.values():
+                        record[kind_spec["json_column"]] = attribute_lists[position][kind_spec["plan_key"]]
+                else:
+                    for column in spec["json_columns"]:
+                        record[column] = _decode_json(record[column])
+                if hashed and row[-1] is not None:
+                    record["response"] = texts[row[-1]]
+                batch.append(record)
+
+            last_id = batch[-1]["id"]
+            yield batch
+    finally:
+        conn.close()
+
+def _write_batch(f, writer, fmt, columns, batch):
+    if fmt == 'jsonl':
+        for record in batch:
+            f.write(json.dumps(record) + "\n")
+    elif fmt == 'csv':
+        for record in batch:
+            writer.writerow([
+                json.dumps(value) if isinstance(value, list) else value
+                for value in (record[column] for column in columns)
+            ])
+    else:
+        # One row group per line: {"rows": n, "columns": {name: [values, ...]}}
+        group = {column: [record[column] for record in batch] for column in columns}
+        f.write(json.dumps({"rows": len(batch), "columns": group}) + "\n")
+
+def export_table(table, output_path, fmt='jsonl', fetch_size=DEFAULT_FETCH_SIZE, resume=True):
+    """Export a table to JSONL, CSV or columnar row-group files
+
+    Shards are exported one after another. Progress (including the file
+    size) is checkpointed after every batch, so re-running the same export
+    drops any partly written batch and continues from the last written
+    shard and id instead of starting over. Ids are only unique within a
+    shard, so an export of several shards can repeat them.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'. Choose from: {', '.join(FORMATS)}")
+    columns = _table_spec(table)["columns"]
+
+    checkpoint = _load_checkpoint(output_path, table, fmt) if resume else None
+    if checkpoint:
+        checkpoint.setdefault("shard", 0)
+        print(f"↩️ Resuming {table} export at shard {checkpoint['shard']} after id {checkpoint['last_id']}")
+    else:
+        checkpoint = {"table": table, "format": fmt, "shard": 0, "last_id": 0, "rows": 0, "complete": False}
+
+    if checkpoint.get("complete"):
+        print(f"✅ {table} export already complete ({checkpoint['rows']} rows)")
+        return checkpoint
+
+    mode = 'a' if checkpoint["rows"] else 'w'
+    if mode == 'a' and "size" in checkpoint:
+        # Drop anything written after the last checkpoint, or those rows would be written twice
+        with open(output_path, 'r+b') as f:
+            f.truncate(checkpoint["size"])
+    with open(output_path, mode, encoding='utf-8', newline='') as f:
+        writer = csv.writer(f) if fmt == 'csv' else None
+        if writer and mode == 'w':
+            writer.writerow(columns)
+
+        for shard in iter_shards():
+            if shard < checkpoint["shard"]:
+                continue
+            if shard > checkpoint["shard"]:
+                checkpoint["shard"] = shard
+                checkpoint["last_id"] = 0
+
+            for batch in iter_row_batches(table, checkpoint["last_id"], fetch_size, shard):
+                _write_batch(f, writer, fmt, columns, batch)
+                f.flush()
+
+                checkpoint["last_id"] = batch[-1]["id"]
+                checkpoint["rows"] += len(batch)
+                checkpoint["size"] = os.fstat(f.fileno()).st_size
+                _save_checkpoint(output_path, checkpoint)
+
+    checkpoint["complete"] = True
+    _save_checkpoint(output_path, checkpoint)
+    print(f"📤 Exported {checkpoint['rows']} {table} rows to {output_path}")
+    return checkpoint
+
+def iter_file_records(input_path, fmt):
+    """Stream dict records back out of an exported file (optionally gzip-compressed, e.g. chat archives)"""
+    opener = gzip.open if input_path.endswith('.gz') else open
+    with opener(input_path, 'rt', encoding='utf-8', newline='') as f:
+        if fmt == 'jsonl':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        elif fmt == 'csv':
+            for record in csv.DictReader(f):
+                yield record
+        elif fmt == 'columnar':
+            for line in f:
+                if not line.strip():
+                    continue
+                group = json.loads(line)
+                columns = group["columns"]
+                names = list(columns)
+                for values in zip(*(columns[name] for name in names)):
+                    yield dict(zip(names, values))
+        else:
+            raise ValueError(f"Unknown format '{fmt}'. Choose from: {', '.join(FORMATS)}")
+
+def _encode_value(column, value, json_columns):
+    if value == '':
+        value = None
+    if column in json_columns and value is not None and not isinstance(value, str):
+        return json.dumps(value)
+    return value
+
+def _check_free_ids(conn, table, shard, ids):
+    taken = set()
+    seen = set()
+    for row_id in ids:
+        if row_id in seen:
+            taken.add(row_id)
+        seen.add(row_id)
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        taken.update(row[0] for row in conn.execute(
+            f"SELECT id FROM {table} WHERE id IN ({', '.join('?' for _ in chunk)})", chunk
+        ))
+    if taken:
+        shown = ", ".join(str(row_id) for row_id in sorted(taken)[:10])
+        raise ValueError(
+            f"Cannot keep ids: {len(taken)} {table} ids are already taken on shard {shard} "
+            f"or repeated in the file (e.g. {shown}); import without keep_ids to assign new ids"
+        )
+
+def _fingerprint(path, size):
+    """Hash of the first min(size, FINGERPRINT_BYTES) bytes of a file"""
+    with open(path, 'rb') as f:
+        return hashlib.blake2b(f.read(min(size, FINGERPRINT_BYTES)), digest_size=16).hexdigest()
+
+def _import_progress(conn, source, table, resume, fingerprints):
+    """Records of `source` already imported into this shard (its import checkpoint)
+
+    The checkpoint holds the file's size and fingerprint when it was
+    written. It still applies if the file has only grown since (e.g. a chat
+    archive partition that was appended to): the file is at least that
+    large and its leading bytes hash the same.
+    """
+    with conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS import_progress (
+                source TEXT PRIMARY KEY,
+                target TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                records INTEGER NOT NULL,
+                fingerprint TEXT
+            )
+        ''')
+        # Tables created before fingerprints existed
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(import_progress)")]
+        if 'fingerprint' not in columns:
+            conn.execute("ALTER TABLE import_progress ADD COLUMN fingerprint TEXT")
+        if not resume:
+            conn.execute("DELETE FROM import_progress WHERE source = ?", (source,))
+            return 0
+    row = conn.execute(
+        "SELECT target, size, fingerprint, records FROM import_progress WHERE source = ?", (source,)
+    ).fetchone()
+    if row is None:
+        return 0
+    target, size, fingerprint, records = row
+    current_size = os.path.getsize(source)
+    if fingerprint is None:
+        same_file = current_size == size
+    elif current_size < size:
+        same_file = False
+    else:
+        if size not in fingerprints:
+            fingerprints[size] = _fingerprint(source, size)
+        same_file = fingerprints[size] == fingerprint
+    if target != table or not same_file:
+        raise ValueError(f"Import checkpoint for {source} belongs to a different import; restart it to start over")
+    return records
+
+def import_table(table, input_path, fmt='jsonl', batch_size=DEFAULT_IMPORT_BATCH_SIZE, keep_ids=False, resume=True):
+    """Bulk-load an exported file into a table
+
+    Rows are routed to their user's shard and inserted with executemany,
+    one transaction per shard per `batch_size` rows. Each of those
+    transactions also records how far into the file the shard has got, so
+    re-running an interrupted (or finished) import skips the rows already
+    loaded, even if records were appended to the file since. With keep_ids the original ids are preserved; an id that is
+    already taken on its shard (or repeated in the file, as exports of
+    several shards can do) raises ValueError before its batch is written.
+    """
+    spec = _table_spec(table)
+    columns = spec["columns"] if keep_ids else [c for c in spec["columns"] if c != "id"]
+    json_columns = set(spec["json_columns"])
+    hashed = spec.get("hashed_response", False)
+
+    inserted = columns + ["response_hash"] if hashed else columns
+    placeholders = ", ".join("?" for _ in inserted)
+    query = f"INSERT INTO {table} ({', '.join(inserted)}) VALUES ({placeholders})"
+    response_index = columns.index("response") if hashed else None
+    user_index = columns.index("user_id")
+    id_index = columns.index("id") if keep_ids else None
+    source = os.path.abspath(input_path)
+    size = os.path.getsize(input_path)
+    fingerprints = {size: _fingerprint(input_path, size)}
+
+    connections = {}
+    total = 0
+
+    def flush(batch, records):
+        by_shard = {}
+        for shard, row in batch:
+            by_shard.setdefault(shard, []).append(row)
+
+        for shard, shard_rows in by_shard.items():
+            conn = connections[shard]
+            if keep_ids:
+                _check_free_ids(conn, table, shard, [int(row[id_index]) for row in shard_rows])
+            with conn:
+                if hashed:
+                    cursor = conn.cursor()
+                    rows = []
+                    for row in shard_rows:
+                        digest = store_response(cursor, row[response_index] or '')
+                        row[response_index] = ''
+                        rows.append(tuple(row) + (digest,))
+                    shard_rows = rows
+                conn.executemany(query, shard_rows)
+                # The checkpoint commits with the rows: every record of this shard up to `records` is loaded
+                conn.execute(
+                    '''INSERT OR REPLACE INTO import_progress (source, target, size, fingerprint, records)
+                       VALUES (?, ?, ?, ?, ?)''',
+                    (source, table, size, fingerprints[size], records)
+                )
+        return len(batch)
+
+    try:
+        done = {}
+        for shard in iter_shards():
+            connections[shard] = get_db_connection(shard=shard)
+            done[shard] = _import_progress(connections[shard], source, table, resume, fingerprints)
+        if any(done.values()):
+            print(f"↩️ Resuming import of {input_path} from its checkpoint")
+
+        batch = []
+        records = 0
+        for records, record in enumerate(iter_file_records(input_path, fmt), 1):
+            row = [_encode_value(c, record.get(c), json_columns) for c in columns]
+            shard = shard_for_user(row[user_index])
+            if records <= done[shard]:
+                continue
+            batch.append((shard, row))
+            if len(batch) >= batch_size:
+                total += flush(batch, records)
+                batch = []
+
+        if batch:
+            total += flush(batch, records)
+    finally:
+        for conn in connections.values():
+            conn.close()
+
+    if spec.get("attribute_lists"):
+        migrate_json_attributes()
+        rebuild_project_stats()
+
+    print(f"📥 Imported {total} rows into {table} from {input_path}")
+    return total
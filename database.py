@@ -1,22 +1,17 @@
+import hashlib
 import sqlite3
-from config import DATABASE_NAME
+import threading
+from config import DATABASE_NAME, DB_SHARDS, DB_SHARD_PATTERN
 
-def init_db():
-    """Initialize the database with necessary tables"""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    
-    # Users table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            hashed_password TEXT NOT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
+# Tables holding per-user data. With more than one shard these live in the
+# shard files; users (and jobs) always stay in the global database.
+USER_TABLES = [
+    'chat_history', 'responses', 'projects',
+    'features', 'project_features', 'technologies', 'project_technologies',
+    'components', 'project_components', 'project_stats'
+]
+
+def _create_user_tables(cursor):
     # Chat history table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS chat_history (
@@ -25,10 +20,26 @@ def init_db():
             message TEXT NOT NULL,
             response TEXT NOT NULL,
             timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            response_hash BLOB,
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
     ''')
     
+    # Databases created before response_hash existed
+    chat_columns = [row[1] for row in cursor.execute("PRAGMA table_info(chat_history)")]
+    if 'response_hash' not in chat_columns:
+        cursor.execute("ALTER TABLE chat_history ADD COLUMN response_hash BLOB")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_user ON chat_history (user_id, id)")
+    
+    # Deduplicated, compressed response bodies referenced by chat_history.response_hash
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS responses (
+            hash BLOB PRIMARY KEY,
+            codec INTEGER NOT NULL,
+            body BLOB NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    
     # Projects table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS projects (
@@ -45,13 +56,168 @@ def init_db():
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
     ''')
+
+    # Interned project features/technologies/components and their ordered join tables
+    for table, join_table, fk in (
+        ('features', 'project_features', 'feature_id'),
+        ('technologies', 'project_technologies', 'technology_id'),
+        ('components', 'project_components', 'component_id')
+    ):
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY,
+                name TEXT UNIQUE NOT NULL
+            )
+        ''')
+        # Columns are declared in primary key order: SQLite 3.40's integrity_check
+        # reports false "NULL value" errors for WITHOUT ROWID tables otherwise
+        join_table_sql = f'''
+            CREATE TABLE IF NOT EXISTS {join_table} (
+                project_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                {fk} INTEGER NOT NULL,
+                PRIMARY KEY (project_id, position),
+                FOREIGN KEY (project_id) REFERENCES projects (id),
+                FOREIGN KEY ({fk}) REFERENCES {table} (id)
+            ) WITHOUT ROWID
+        '''
+        cursor.execute(join_table_sql)
+        
+        # Databases created with the attribute id before position
+        join_columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({join_table})")]
+        if join_columns != ['project_id', 'position', fk]:
+            cursor.execute(f"ALTER TABLE {join_table} RENAME TO {join_table}_old")
+            cursor.execute(join_table_sql)
+            cursor.execute(f'''INSERT INTO {join_table} (project_id, position, {fk})
+                              SELECT project_id, position, {fk} FROM {join_table}_old''')
+            cursor.execute(f"DROP TABLE {join_table}_old")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{join_table}_{fk} ON {join_table} ({fk}, project_id)")
+    
+    # Incremental project counters for analytics (project_analytics.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS project_stats (
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (user_id, day, dimension, value)
+        ) WITHOUT ROWID
+    ''')
+
+def init_db():
+    """Initialize the database with necessary tables"""
+    global shard_count, _initialized
+    conn = sqlite3.connect(DATABASE_NAME)
+    cursor = conn.cursor()
+    
+    # Users table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            hashed_password TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
     
+    # Storage layout; the recorded shard count wins over DB_SHARDS once data exists
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS db_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    ''')
+    row = cursor.execute("SELECT value FROM db_meta WHERE key = 'shard_count'").fetchone()
+    if row is None:
+        cursor.execute("INSERT INTO db_meta (key, value) VALUES ('shard_count', ?)", (str(DB_SHARDS),))
+        shard_count = DB_SHARDS
+    else:
+        shard_count = int(row[0])
+        if shard_count != DB_SHARDS:
+            print(f"⚠️ Database uses {shard_count} shards but DB_SHARDS={DB_SHARDS}; "
+                  f"run 'python -m project_creator reshard {DB_SHARDS}' to change it")
+
+    # Per-user tables always exist in the global database too, for single-file layouts
+    _create_user_tables(cursor)
+
+    conn.commit()
+    conn.close()
+
+    if shard_count > 1:
+        for path in shard_paths(shard_count):
+            init_shard(path)
+    _initialized = True
+
+def ensure_db():
+    """Run init_db once per process, on first database use"""
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                init_db()
+
+def init_shard(path):
+    """Create the per-user tables in a shard file"""
+    conn = sqlite3.connect(path)
+    _create_user_tables(conn.cursor())
     conn.commit()
     conn.close()
 
-def get_db_connection():
-    """Get a database connection"""
+def shard_paths(count=None):
+    """Database files holding per-user tables; a single shard is the global database itself"""
+    if count is None:
+        ensure_db()
+    count = count or shard_count
+    if count == 1:
+        return [DATABASE_NAME]
+    return [DB_SHARD_PATTERN.format(index=index, count=count) for index in range(count)]
+
+def shard_for_user(user_id, count=None):
+    """Stable shard index for a user (anonymous users go to shard 0)"""
+    if count is None:
+        ensure_db()
+    count = count or shard_count
+    if user_id is None or count == 1:
+        return 0
+    digest = hashlib.blake2b(str(user_id).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % count
+
+def get_db_connection(shard=None):
+    """Get a database connection
+
+    Without arguments this is the global database (users, jobs), which with
+    a single shard also holds all per-user tables. Pass a shard index for
+    admin work on one shard.
+    """
+    ensure_db()
+    if shard is not None:
+        return sqlite3.connect(shard_paths()[shard])
     return sqlite3.connect(DATABASE_NAME)
 
-# Initialize database when module is imported
-init_db()
\ No newline at end of file
+def get_user_db_connection(user_id):
+    """Connection to the shard holding a user's chat_history, projects and lookups"""
+    return get_db_connection(shard=shard_for_user(user_id))
+
+def iter_shards():
+    """Shard indexes, for admin work that has to visit every shard"""
+    ensure_db()
+    return range(shard_count)
+
+def query_all_shards(query, params=()):
+    """Run a read query on every shard and concatenate the rows"""
+    rows = []
+    for shard in iter_shards():
+        conn = get_db_connection(shard=shard)
+        try:
+            rows.extend(conn.execute(query, params).fetchall())
+        finally:
+            conn.close()
+    return rows
+
+# Recorded shard count, read from db_meta by init_db
+shard_count = DB_SHARDS
+
+# Tables are created on first use (ensure_db), not when the module is imported
+_initialized = False
+_init_lock = threading.Lock()
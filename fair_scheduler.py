@@ -0,0 +1,353 @@
+import heapq
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from config import (
+    SCHEDULER_MAX_CONCURRENT, SCHEDULER_USER_RATE, SCHEDULER_USER_BURST,
+    SCHEDULER_MAX_QUEUED_PER_USER, SCHEDULER_MAX_WAIT_SECONDS,
+    PROJECT_QUOTA_PER_USER, PROJECT_QUOTA_REFRESH_SECONDS
+)
+from database import get_user_db_connection
+
+class RateLimited(RuntimeError):
+    """A user has too many requests waiting, or waited too long for a slot"""
+
+class ProjectQuotaExceeded(RuntimeError):
+    """A user already has as many projects as the quota allows"""
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, with bursts of up to `burst`"""
+    __slots__ = ("rate", "burst", "tokens", "updated_at")
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = now
+
+    def refill(self, now):
+        if now > self.updated_at:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+    def try_take(self, now, cost=1):
+        self.refill(now)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True
+        return False
+
+    def wait_time(self, now, cost=1):
+        """Seconds until `cost` tokens are available"""
+        self.refill(now)
+        if self.tokens >= cost:
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (cost - self.tokens) / self.rate
+
+class Ticket:
+    """One request waiting for, or holding, a scheduler slot"""
+    __slots__ = ("user_id", "cost", "finish_tag", "submitted_at", "granted_at", "granted", "finished")
+
+    def __init__(self, user_id, cost, finish_tag, submitted_at):
+        self.user_id = user_id
+        self.cost = cost
+        self.finish_tag = finish_tag
+        self.submitted_at = submitted_at
+        self.granted_at = None
+        self.granted = False
+        self.finished = False
+
+class _UserState:
+    __slots__ = ("bucket", "weight", "queue", "last_finish", "active")
+
+    def __init__(self, bucket, weight):
+        self.bucket = bucket
+        self.weight = weight
+        self.queue = deque()
+        self.last_finish = 0.0
+        self.active = 0
+
+class FairScheduler:
+    """Admission control for the chat pipeline: per-user rate limits, fair ordering, bounded concurrency
+
+    Each request takes a ticket. A ticket is granted a slot once its user's
+    token bucket has a token and fewer than `max_concurrent` slots are in
+    use. When several users are waiting, slots go to the ticket with the
+    smallest virtual finish tag (self-clocked weighted fair queueing), so a
+    user firing hundreds of messages only delays their own queue. Submits
+    beyond `max_queued` waiting tickets per user raise RateLimited.
+
+    `submit`/`dispatch`/`release` never block and read time from `clock`,
+    so a simulated clock drives the scheduler deterministically. `slot()`
+    is the blocking wrapper used by the app.
+    """
+
+    def __init__(self, max_concurrent=SCHEDULER_MAX_CONCURRENT, rate=SCHEDULER_USER_RATE,
+                 burst=SCHEDULER_USER_BURST, max_queued=SCHEDULER_MAX_QUEUED_PER_USER,
+                 max_wait=SCHEDULER_MAX_WAIT_SECONDS, clock=time.monotonic):
+        self.max_concurrent = max_concurrent
+        self.rate = rate
+        self.burst = burst
+        self.max_queued = max_queued
+        self.max_wait = max_wait
+        self.clock = clock
+
+        self._users = {}
+        self._weights = {}
+        self._virtual_time = 0.0
+        self._active = 0
+        self._condition = threading.Condition()
+
+    def set_weight(self, user_id, weight):
+        """Give a user a larger (or smaller) share of slots when users compete"""
+        with self._condition:
+            self._weights[user_id] = weight
+            if user_id in self._users:
+                self._users[user_id].weight = weight
+
+    def _user(self, user_id, now):
+        state = self._users.get(user_id)
+        if state is None:
+            state = _UserState(TokenBucket(self.rate, self.burst, now), self._weights.get(user_id, 1.0))
+            self._users[user_id] = state
+        return state
+
+    def submit(self, user_id, cost=1):
+        """Queue a request for a slot; raises RateLimited if the user already has `max_queued` waiting"""
+        with self._condition:
+            now = self.clock()
+            state = self._user(user_id, now)
+            if len(state.queue) >= self.max_queued:
+                raise RateLimited("Too many requests in progress; wait for your earlier messages to finish")
+
+            start = max(self._virtual_time, state.last_finish)
+            state.last_finish = start + cost / state.weight
+            ticket = Ticket(user_id, cost, state.last_finish, now)
+            state.queue.append(ticket)
+            return ticket
+
+    def dispatch(self):
+        """Grant slots to eligible tickets in fair order; returns the newly granted tickets"""
+        with self._condition:
+            granted = self._dispatch_locked(self.clock())
+            if granted:
+                self._condition.notify_all()
+            return granted
+
+    def _dispatch_locked(self, now):
+        heads = [
+            (state.queue[0].finish_tag, user_id)
+            for user_id, state in self._users.items() if state.queue
+        ]
+        heapq.heapify(heads)
+
+        granted = []
+        while heads and self._active < self.max_concurrent:
+            _, user_id = heapq.heappop(heads)
+            state = self._users[user_id]
+            ticket = state.queue[0]
+            if not state.bucket.try_take(now, ticket.cost):
+                continue  # Rate limited; other users may still go ahead
+
+            state.queue.popleft()
+            ticket.granted = True
+            ticket.granted_at = now
+            state.active += 1
+            self._active += 1
+            self._virtual_time = max(self._virtual_time, ticket.finish_tag - ticket.cost / state.weight)
+            granted.append(ticket)
+            if state.queue:
+                heapq.heappush(heads, (state.queue[0].finish_tag, user_id))
+        return granted
+
+    def next_wakeup(self):
+        """Seconds until a rate-limited ticket could be granted (None if nothing is waiting on a bucket)"""
+        with self._condition:
+            return self._next_wakeup_locked(self.clock())
+
+    def _next_wakeup_locked(self, now):
+        waits = [
+            state.bucket.wait_time(now, state.queue[0].cost)
+            for state in self._users.values() if state.queue
+        ]
+        return min(waits) if waits else None
+
+    def release(self, ticket):
+        """Free a granted slot, or withdraw a ticket that is still waiting"""
+        with self._condition:
+            if ticket.finished:
+                return
+            ticket.finished = True
+            state = self._users[ticket.user_id]
+            if ticket.granted:
+                self._active -= 1
+                state.active -= 1
+            else:
+                state.queue.remove(ticket)
+            self._forget_idle_locked(ticket.user_id, self.clock())
+            # Waiting slot() callers dispatch for themselves once woken
+            self._condition.notify_all()
+
+    def _forget_idle_locked(self, user_id, now):
+        # A user with nothing queued or running and a full bucket has no state worth keeping
+        state = self._users.get(user_id)
+        if state is not None and not state.queue and not state.active:
+            state.bucket.refill(now)
+            if state.bucket.tokens >= state.bucket.burst and state.last_finish <= self._virtual_time:
+                del self._users[user_id]
+
+    @contextmanager
+    def slot(self, user_id, cost=1, timeout=None):
+        """Block until the user may run a request, hold the slot for the `with` block
+
+        Raises RateLimited if the user has too many requests waiting or no
+        slot was granted within `timeout` (SCHEDULER_MAX_WAIT_SECONDS).
+        """
+        timeout = self.max_wait if timeout is None else timeout
+        ticket = self.submit(user_id, cost)
+        deadline = self.clock() + timeout
+        with self._condition:
+            while True:
+                now = self.clock()
+                self._dispatch_locked(now)
+                if ticket.granted:
+                    break
+                if now >= deadline:
+                    self.release(ticket)
+                    raise RateLimited(f"Server is busy; no slot within {timeout:g}s")
+                wait = self._next_wakeup_locked(now)
+                self._condition.wait(min(deadline - now, wait if wait else deadline - now))
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self):
+        """Slots in use and tickets waiting per user"""
+        with self._condition:
+            return {
+                "active": self._active,
+                "max_concurrent": self.max_concurrent,
+                "waiting": {user_id: len(state.queue) for user_id, state in self._users.items() if state.queue}
+            }
+
+def count_user_projects(user_id):
+    """Number of projects saved for a user"""
+    conn = get_user_db_connection(user_id)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM projects WHERE user_id = ?", (user_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+class ProjectQuotaCache:
+    """Per-user project quota backed by `projects` counts, cached in memory
+
+    A user's count is read from the database on first use and re-read every
+    `refresh_seconds`, so projects added by imports or batch runs are picked
+    up without a query per request. Creations in progress are reserved, so
+    concurrent requests from one user cannot overshoot the limit.
+    """
+
+    def __init__(self, limit=PROJECT_QUOTA_PER_USER, refresh_seconds=PROJECT_QUOTA_REFRESH_SECONDS,
+                 clock=time.monotonic, count_projects=count_user_projects):
+        self.limit = limit
+        self.refresh_seconds = refresh_seconds
+        self.clock = clock
+        self.count_projects = count_projects
+        self._lock = threading.Lock()
+        # user_id -> [saved projects, reserved, loaded_at, saves since loaded]
+        self._counts = {}
+
+    def _entry(self, user_id):
+        """The user's cached entry, (re)loaded if stale; call with self._lock held
+
+        The lock is released while the count is read, so one user's query
+        does not hold up every other user. The result is only installed if
+        the entry did not change meanwhile; otherwise the check starts over.
+        """
+        while True:
+            now = self.clock()
+            entry = self._counts.get(user_id)
+            if entry is not None and now - entry[2] < self.refresh_seconds:
+                return entry
+            saves = entry[3] if entry else 0
+            
+            self._lock.release()
+            try:
+                saved = self.count_projects(user_id)
+            finally:
+                self._lock.acquire()
+            
+            current = self._counts.get(user_id)
+            if current is not entry or (current is not None and current[3] != saves):
+                continue  # Loaded or saved to by another thread while counting
+            reserved = entry[1] if entry else 0
+            entry = self._counts[user_id] = [saved, reserved, now, 0]
+            return entry
+
+    def remaining(self, user_id):
+        """Projects the user may still create (None when unlimited)"""
+        if not self.limit or user_id is None:
+            return None
+        with self._lock:
+            saved, reserved = self._entry(user_id)[:2]
+            return max(0, self.limit - saved - reserved)
+
+    def reserve(self, user_id):
+        """Claim one project for a creation in progress; raises ProjectQuotaExceeded at the limit"""
+        if not self.limit or user_id is None:
+            return
+        with self._lock:
+            entry = self._entry(user_id)
+            if entry[0] + entry[1] >= self.limit:
+                raise ProjectQuotaExceeded(f"You have reached the limit of {self.limit} projects")
+            entry[1] += 1
+
+    def commit(self, user_id):
+        """The reserved project was saved"""
+        self._finish(user_id, saved=True)
+
+    def release(self, user_id):
+        """The reserved project was not saved"""
+        self._finish(user_id, saved=False)
+
+    def _finish(self, user_id, saved):
+        if not self.limit or user_id is None:
+            return
+        with self._lock:
+            entry = self._counts.get(user_id)
+            if entry is None:
+                return
+            entry[1] = max(0, entry[1] - 1)
+            if saved:
+                entry[0] += 1
+                entry[3] += 1
+
+    @contextmanager
+    def reservation(self, user_id):
+        """Reserve a project for the `with` block; committed on success, released on error"""
+        self.reserve(user_id)
+        try:
+            yield
+        except BaseException:
+            self.release(user_id)
+            raise
+        self.commit(user_id)
+
+    def invalidate(self, user_id=None):
+        """Drop cached counts (all users by default) so they are re-read from the database"""
+        with self._lock:
+            if user_id is None:
+                self._counts = {key: entry for key, entry in self._counts.items() if entry[1]}
+                for entry in self._counts.values():
+                    entry[2] = float("-inf")
+            elif user_id in self._counts:
+                self._counts[user_id][2] = float("-inf")
+
+# Process-wide instances shared by all sessions and job workers
+chat_scheduler = FairScheduler()
+project_quotas = ProjectQuotaCache()
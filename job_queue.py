@@ -0,0 +1,387 @@
+import heapq
+import itertools
+import json
+import queue
+import threading
+import time
+
+from task_registry import CHECKPOINTED_TASKS, TASKS, register_task
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+class Job:
+    """A single unit of work tracked by the queue"""
+    __slots__ = ("id", "task", "args", "user_id", "status", "result", "error",
+                 "attempts", "max_retries", "created_at", "finished_at", "cancel_requested", "checkpoint")
+
+    def __init__(self, job_id, task, args, user_id, max_retries, created_at):
+        self.id = job_id
+        self.task = task
+        self.args = args
+        self.user_id = user_id
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.attempts = 0
+        self.max_retries = max_retries
+        self.created_at = created_at
+        self.finished_at = None
+        self.cancel_requested = False
+        self.checkpoint = {}
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "task": self.task,
+            "args": list(self.args),
+            "user_id": self.user_id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "attempts": self.attempts,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+
+class Checkpoint:
+    """Progress of a checkpointed task, kept with its job across retries and restarts
+
+    A task records each step that must not run twice (e.g. the id of a row
+    it saved) and checks for it before doing that step again.
+    """
+
+    def __init__(self, job_queue, job):
+        self._queue = job_queue
+        self._job = job
+
+    def get(self, key, default=None):
+        with self._queue._lock:
+            return self._job.checkpoint.get(key, default)
+
+    def record(self, **values):
+        """Store values in the job (and its persisted row) before the task goes on"""
+        with self._queue._lock:
+            self._job.checkpoint.update(values)
+        self._queue._save(self._job)
+
+class JobQueue:
+    """In-process job queue with bounded concurrency, retries and cancellation
+
+    `max_workers` threads run jobs in the background. With max_workers=0 no
+    threads are started and jobs only run when `run_pending()` is called,
+    which makes ordering and timing fully deterministic. Failed attempts
+    are re-queued once their backoff (`retry_delay` times the attempt
+    number) is due, without holding a worker meanwhile. Pass persist=True
+    to mirror job state into a `jobs` table so unfinished work can be
+    resumed with `recover()` after a restart; finished rows are deleted by
+    `forget()`, or by `recover()` once older than `retention` seconds.
+    """
+
+    def __init__(self, max_workers=2, max_retries=2, retry_delay=0.5, persist=False,
+                 retention=7 * 24 * 3600, clock=time.time, sleep=time.sleep):
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.persist = persist
+        self.retention = retention
+        self.clock = clock
+        self.sleep = sleep
+
+        self._jobs = {}
+        self._pending = queue.Queue()
+        self._delayed = []  # Heap of (due time, sequence, job id) for retries waiting out their backoff
+        self._retry_sequence = itertools.count()  # Retries due at the same time run in the order they failed
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stopping = False
+
+        if persist:
+            self._ensure_table()
+
+    # Persistence (database is imported here: only persistent queues touch it)
+
+    @staticmethod
+    def _connect():
+        from database import get_db_connection
+
+        return get_db_connection()
+
+    def _ensure_table(self):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS jobs (
+                        id TEXT PRIMARY KEY,
+                        task TEXT NOT NULL,
+                        args TEXT NOT NULL,
+                        user_id INTEGER,
+                        status TEXT NOT NULL,
+                        result TEXT,
+                        error TEXT,
+                        attempts INTEGER DEFAULT 0,
+                        max_retries INTEGER DEFAULT 0,
+                        created_at REAL,
+                        finished_at REAL,
+                        checkpoint TEXT
+                    )
+                ''')
+                
+                # Tables created before checkpoints existed
+                columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+                if 'checkpoint' not in columns:
+                    conn.execute("ALTER TABLE jobs ADD COLUMN checkpoint TEXT")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)")
+        finally:
+            conn.close()
+
+    def _save(self, job):
+        if not self.persist:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    '''INSERT OR REPLACE INTO jobs
+                       (id, task, args, user_id, status, result, error, attempts, max_retries, created_at, finished_at,
+                        checkpoint)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                    (job.id, job.task, json.dumps(job.args), job.user_id, job.status,
+                     json.dumps(job.result), job.error, job.attempts, job.max_retries,
+                     job.created_at, job.finished_at, json.dumps(job.checkpoint))
+                )
+        finally:
+            conn.close()
+
+    def _delete(self, job_id):
+        if not self.persist:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        finally:
+            conn.close()
+
+    def prune(self):
+        """Delete persisted jobs that finished more than `retention` seconds ago. Returns the number deleted."""
+        if not self.persist:
+            return 0
+        conn = self._connect()
+        try:
+            with conn:
+                return conn.execute(
+                    f"DELETE FROM jobs WHERE status IN ({', '.join('?' for _ in FINISHED_STATUSES)}) AND finished_at < ?",
+                    (*FINISHED_STATUSES, self.clock() - self.retention)
+                ).rowcount
+        finally:
+            conn.close()
+
+    def recover(self):
+        """Re-enqueue persisted jobs that never finished (after pruning old ones). Returns the number recovered."""
+        if not self.persist:
+            return 0
+        pruned = self.prune()
+        if pruned:
+            print(f"🧹 Pruned {pruned} finished jobs")
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                """SELECT id, task, args, user_id, attempts, max_retries, created_at, checkpoint
+                   FROM jobs WHERE status IN (?, ?)""",
+                (QUEUED, RUNNING)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        recovered = 0
+        for job_id, task, args, user_id, attempts, max_retries, created_at, checkpoint in rows:
+            if job_id in self._jobs or task not in TASKS:
+                continue
+            job = Job(job_id, task, json.loads(args), user_id, max_retries, created_at)
+            job.attempts = attempts
+            job.checkpoint = json.loads(checkpoint) if checkpoint else {}
+            self._enqueue(job)
+            recovered += 1
+        return recovered
+
+    # Scheduling
+
+    def _enqueue(self, job):
+        with self._lock:
+            self._jobs[job.id] = job
+        self._save(job)
+        self._pending.put(job.id)
+        self._start_workers()
+
+    def _retry_later(self, job_id, delay):
+        with self._lock:
+            heapq.heappush(self._delayed, (self.clock() + delay, next(self._retry_sequence), job_id))
+
+    def _promote_due(self, force=False):
+        """Move retries whose backoff is over (with force, at least the next one) back to the queue"""
+        with self._lock:
+            now = self.clock()
+            due = []
+            while self._delayed and (self._delayed[0][0] <= now or (force and not due)):
+                due.append(heapq.heappop(self._delayed)[2])
+        for job_id in due:
+            self._pending.put(job_id)
+        return len(due)
+
+    def _next_due_in(self):
+        """Seconds until the next retry is due, or None if none is waiting"""
+        with self._lock:
+            if not self._delayed:
+                return None
+            return max(0.0, self._delayed[0][0] - self.clock())
+
+    def _start_workers(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while not self._stopping and len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._worker, daemon=True, name=f"job-worker-{len(self._threads)}")
+                self._threads.append(thread)
+                thread.start()
+
+    def submit(self, task, *args, user_id=None, max_retries=None):
+        """Enqueue a registered task and return its job id"""
+        import uuid  # imports platform; kept off the import path of modules that only register tasks
+
+        if task not in TASKS:
+            raise ValueError(f"Unknown task '{task}'")
+        retries = self.max_retries if max_retries is None else max_retries
+        job = Job(uuid.uuid4().hex, task, list(args), user_id, retries, self.clock())
+        self._enqueue(job)
+        return job.id
+
+    def _run(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return
+            job.status = RUNNING
+            job.attempts += 1
+        self._save(job)
+
+        try:
+            if job.task in CHECKPOINTED_TASKS:
+                result = TASKS[job.task](*job.args, checkpoint=Checkpoint(self, job))
+            else:
+                result = TASKS[job.task](*job.args)
+        except Exception as e:
+            with self._lock:
+                retry = job.attempts <= job.max_retries and not job.cancel_requested
+                job.error = str(e)
+                job.status = QUEUED if retry else (CANCELLED if job.cancel_requested else FAILED)
+                if not retry:
+                    job.finished_at = self.clock()
+            self._save(job)
+            print(f"❌ Job {job.id[:8]} ({job.task}) attempt {job.attempts} failed: {e}")
+            if retry:
+                self._retry_later(job.id, self.retry_delay * job.attempts)
+            return
+
+        with self._lock:
+            job.result = result
+            job.error = None
+            job.status = SUCCEEDED
+            job.finished_at = self.clock()
+        self._save(job)
+
+    def _worker(self):
+        while True:
+            self._promote_due()
+            try:
+                job_id = self._pending.get(timeout=self._next_due_in())
+            except queue.Empty:
+                continue  # A retry is due
+            if job_id is None:
+                break
+            try:
+                self._run(job_id)
+            finally:
+                self._pending.task_done()
+
+    def run_pending(self):
+        """Run queued jobs (including retries) in the calling thread until none remain"""
+        ran = 0
+        while True:
+            try:
+                job_id = self._pending.get_nowait()
+            except queue.Empty:
+                wait = self._next_due_in()
+                if wait is None:
+                    return ran
+                # Nothing else to run: wait out the next retry's backoff here
+                self.sleep(wait)
+                self._promote_due(force=True)
+                continue
+            try:
+                self._run(job_id)
+                ran += 1
+            finally:
+                self._pending.task_done()
+
+    def join(self):
+        """Block until every queued job (and retry) has finished"""
+        while True:
+            self._pending.join()
+            wait = self._next_due_in()
+            if wait is None:
+                return
+            self.sleep(wait)
+            self._promote_due(force=True)
+
+    def shutdown(self, wait=True):
+        """Stop worker threads after the jobs already queued have run"""
+        with self._lock:
+            self._stopping = True
+            threads = list(self._threads)
+        for _ in threads:
+            self._pending.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    # Inspection
+
+    def cancel(self, job_id):
+        """Cancel a job. Queued jobs never start; a running job won't be retried."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATUSES:
+                return False
+            job.cancel_requested = True
+            if job.status == QUEUED:
+                job.status = CANCELLED
+                job.finished_at = self.clock()
+        self._save(job)
+        return True
+
+    def status(self, job_id):
+        """Current state of a job as a dict, or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def jobs_for_user(self, user_id):
+        """All jobs submitted for a user, oldest first"""
+        with self._lock:
+            return [job.to_dict() for job in self._jobs.values() if job.user_id == user_id]
+
+    def forget(self, job_id):
+        """Drop a finished job (and its persisted row) once its result has been consumed"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in FINISHED_STATUSES:
+                return False
+            del self._jobs[job_id]
+        self._delete(job_id)
+        return True
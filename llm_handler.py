@@ -1,16 +1,23 @@
-import os
-from config import OPENAI_API_KEY
-from project_manager import  create_project_from_prompt, save_project_to_db, get_project_template
-import json
-
-
-
-print("🔧 llm_handler.py is loading...")
-print(f"🔧 OPENAI_API_KEY present: {bool(OPENAI_API_KEY)}")
-
-def is_project_creation_request(message):
-    """Improved project creation detection"""
-    message_lower = message.lower()
+import threading
+from collections import OrderedDict
+from config import BLUEPRINT_CACHE_SIZE, CLASSIFY_WINDOW_CHARS
+from project_manager import create_project_from_prompt, classify_prompt, plan_project
+from task_registry import register_task
+from prompt_text import head_window, preview
+from request_profiler import request_profiler
+
+# Chat history, conversation context and the scheduler (and with them the
+# database) are imported where they are used, so importing this module for
+# the detectors and response generators stays cheap and side-effect free.
+
+def is_project_creation_request(message, message_lower=None):
+    """Improved project creation detection
+
+    Looks only at the start of the message (head_window); pass
+    `message_lower` if the caller already computed it.
+    """
+    if message_lower is None:
+        message_lower = head_window(message)
     
     # Project-related keywords
     create_keywords = ['create', 'build', 'make', 'develop', 'design', 'start', 'begin']
@@ -34,43 +41,11 @@ def is_project_creation_request(message):
 
 def analyze_project_requirements(prompt):
     """Analyze the prompt to extract project requirements"""
-    prompt_lower = prompt.lower()
-    
-    # Domain detection
-    domains = {
-        'web': ['web', 'website', 'frontend', 'backend', 'portfolio', 'e-commerce', 'blog'],
-        'data': ['data', 'analysis', 'analytics', 'chart', 'graph', 'dashboard', 'report'],
-        'chat': ['chat', 'bot', 'conversation', 'assistant', 'support', 'customer service'],
-        'automation': ['automation', 'auto', 'script', 'task', 'schedule', 'reminder'],
-        'mobile': ['mobile', 'app', 'ios', 'android', 'phone', 'tablet'],
-        'game': ['game', 'gaming', '2d', '3d', 'player', 'level']
-    }
-    
-    detected_domains = []
-    for domain, keywords in domains.items():
-        if any(keyword in prompt_lower for keyword in keywords):
-            detected_domains.append(domain)
-    
-    # Complexity estimation
-    complexity_indicators = {
-        'simple': ['simple', 'basic', 'small', 'quick', 'minimal'],
-        'complex': ['complex', 'advanced', 'enterprise', 'large', 'comprehensive', 'sophisticated']
-    }
-    
-    complexity = 'medium'
-    for comp_level, indicators in complexity_indicators.items():
-        if any(indicator in prompt_lower for indicator in indicators):
-            complexity = comp_level
-    
-    return {
-        'domains': detected_domains if detected_domains else ['general'],
-        'complexity': complexity,
-        'has_specific_goal': len(prompt.split()) > 3  # More than 3 words indicates specificity
-    }
+    return classify_prompt(prompt)
 
 def generate_gpt_style_thinking(analysis, prompt):
     """Generate GPT-like thinking process"""
-    domains = analysis['domains']
+    domains = [domain.replace('_', ' ') for domain in analysis['domains']]
     complexity = analysis['complexity']
     
     thinking_lines = []
@@ -95,80 +70,6 @@ def generate_gpt_style_thinking(analysis, prompt):
     
     return "\n".join(thinking_lines)
 
-def create_detailed_project_plan(prompt, analysis):
-    """Create a detailed project plan based on analysis"""
-    domains = analysis['domains']
-    complexity = analysis['complexity']
-    
-    # Base project structure
-    project_data = {
-        "project_type": domains[0] if domains else "custom",
-        "project_name": f"Project: {prompt[:25]}..." if len(prompt) > 25 else f"Project: {prompt}",
-        "description": f"A {complexity} complexity project based on: '{prompt}'",
-        "key_features": [],
-        "estimated_complexity": complexity,
-        "recommended_tech": [],
-        "components": [],
-        "tech_stack": [],
-        "timeline_estimate": "",
-        "potential_challenges": []
-    }
-    
-    # Domain-specific enhancements
-    if 'web' in domains:
-        project_data.update({
-            "key_features": ["Responsive design", "User authentication", "RESTful API", "Database integration"],
-            "recommended_tech": ["React/Vue.js", "Node.js/Python", "MongoDB/PostgreSQL", "Docker"],
-            "components": ["Frontend UI", "Backend API", "Database", "Authentication System"],
-            "timeline_estimate": "2-4 weeks" if complexity == 'simple' else "6-12 weeks"
-        })
-    elif 'data' in domains:
-        project_data.update({
-            "key_features": ["Data visualization", "Real-time analytics", "Export capabilities", "Custom reports"],
-            "recommended_tech": ["Python/Pandas", "React/D3.js", "SQL Database", "Jupyter Notebooks"],
-            "components": ["Data Processing", "Visualization Engine", "Report Generator", "User Dashboard"],
-            "timeline_estimate": "3-5 weeks" if complexity == 'simple' else "8-15 weeks"
-        })
-    elif 'chat' in domains:
-        project_data.update({
-            "key_features": ["Natural language processing", "Multi-platform support", "Context awareness", "Admin dashboard"],
-            "recommended_tech": ["Python/FastAPI", "React Native", "OpenAI API", "Redis"],
-            "components": ["NLU Engine", "Dialog Manager", "API Gateway", "Monitoring System"],
-            "timeline_estimate": "4-6 weeks" if complexity == 'simple' else "10-18 weeks"
-        })
-    else:
-        # General project template
-        project_data.update({
-            "key_features": ["Modular architecture", "Scalable design", "Comprehensive documentation", "Testing suite"],
-            "recommended_tech": ["Python/JavaScript", "Cloud services", "Database", "API framework"],
-            "components": ["Core Module", "User Interface", "Data Layer", "Integration Layer"],
-            "timeline_estimate": "3-6 weeks" if complexity == 'simple' else "8-16 weeks"
-        })
-    
-    # Complexity-based adjustments
-    if complexity == 'complex':
-        project_data["key_features"].extend(["Enterprise scalability", "Advanced security", "Microservices architecture"])
-        project_data["potential_challenges"] = ["Scalability planning", "Security implementation", "Team coordination"]
-    else:
-        project_data["potential_challenges"] = ["Rapid prototyping", "Feature prioritization", "User feedback integration"]
-    
-    return project_data
-
-def create_project_from_prompt(user_prompt, user_id):
-    """Create a project based on user prompt with detailed analysis"""
-    print(f"🚀 Creating project from: {user_prompt}")
-    
-    # Analyze the prompt
-    analysis = analyze_project_requirements(user_prompt)
-    
-    # Create detailed project plan
-    project_data = create_detailed_project_plan(user_prompt, analysis)
-    
-    # Save to database
-    save_project_to_db(user_id, project_data)
-    
-    return project_data, analysis
-
 def generate_comprehensive_response(project_data, analysis, original_prompt):
     """Generate a comprehensive, GPT-style response"""
     
@@ -216,30 +117,275 @@ def generate_comprehensive_response(project_data, analysis, original_prompt):
     
     return response
 
+# Follow-up topics offered at the end of every blueprint ("Would you like me to elaborate...")
+FOLLOW_UP_TOPICS = {
+    'architecture': ['architecture', 'component', 'system design', 'structure', 'schema'],
+    'features': ['feature', 'prioriti', 'mvp', 'scope'],
+    'timeline': ['timeline', 'schedule', 'milestone', 'roadmap', 'sprint', 'how long'],
+    'technology': ['technolog', 'tech stack', 'alternative', 'framework', 'library', 'tools']
+}
+
+# Openings that ask for a new project even while one is active ("build a dashboard with a React framework")
+NEW_PROJECT_OPENERS = (
+    'create a', 'build a', 'make a', 'develop a', 'design a', 'build me a', 'create me a',
+    'i want to create', 'i need to build', 'i need a', 'i want a', 'can you make', 'could you build'
+)
+
+FOLLOW_UP_CUES = [
+    'elaborate', 'more about', 'more detail', 'tell me more', 'explain', 'expand',
+    'details', 'break down', 'breakdown', 'what about', 'go deeper', 'dive into'
+]
+
+# Keyed by the recommended_tech names in project_manager.get_project_template
+TECH_ALTERNATIVES = {
+    # Web application
+    "React/Vue.js": "Angular, Svelte, or server-rendered templates (Django/Jinja)",
+    "Node.js/Python": "Go, Java/Spring Boot, or Ruby on Rails",
+    "MongoDB/PostgreSQL": "MySQL, SQLite for prototypes, or a managed service like Supabase",
+    "Docker": "Podman, or a PaaS such as Heroku/Render to skip containers early on",
+    # Data analysis
+    "Python/Pandas": "Polars, R/tidyverse, or Spark for very large datasets",
+    "React/D3.js": "Plotly Dash, Streamlit, or Apache Superset",
+    "SQL Database": "DuckDB, BigQuery, or ClickHouse for analytics workloads",
+    "Jupyter": "VS Code notebooks, Observable, or plain scripts with a scheduler",
+    # Chatbot
+    "Python/FastAPI": "Flask, Node.js/Express, or a hosted bot framework",
+    "React Native": "Flutter or native iOS/Android",
+    "OpenAI API": "Anthropic, open-source models via Ollama, or Rasa for rule-driven flows",
+    "Redis": "Memcached, or in-database caching for small deployments",
+    # Automation
+    "Python": "Node.js or Go for long-running workers, or low-code tools like n8n",
+    "Celery": "RQ, Dramatiq, or a managed queue such as AWS SQS with Lambda",
+    "FastAPI": "Flask, Django REST Framework, or Express",
+    # Mobile application
+    "React Native/Flutter": "Native Swift/Kotlin, or Kotlin Multiplatform for shared logic",
+    "Firebase": "Supabase, AWS Amplify, or a self-hosted API with PostgreSQL",
+    "REST APIs": "GraphQL or gRPC when clients need flexible or streaming data",
+    "Redux": "Zustand, MobX, or React Context for smaller apps",
+    # Custom
+    "Python/JavaScript": "TypeScript end-to-end, or Go for performance-critical services",
+    "Cloud Services": "Self-hosted VMs or a PaaS to reduce operational overhead",
+    "Database": "PostgreSQL, MySQL, or SQLite depending on scale",
+    "API Framework": "FastAPI, Express, or Spring Boot"
+}
+
+def detect_follow_up_topic(message, message_lower=None):
+    """Return the blueprint topic a follow-up question asks about, or None"""
+    if message_lower is None:
+        message_lower = head_window(message)
+    
+    has_cue = any(cue in message_lower for cue in FOLLOW_UP_CUES)
+    for topic, keywords in FOLLOW_UP_TOPICS.items():
+        if any(keyword in message_lower for keyword in keywords):
+            return topic
+    
+    # A bare "elaborate" / "tell me more" refers to the blueprint as a whole
+    return 'overview' if has_cue else None
+
+def generate_follow_up_response(project_data, topic, recent_messages=()):
+    """Elaborate on one aspect of the user's active project blueprint"""
+    name = project_data.get('project_name', 'your project')
+    complexity = project_data.get('estimated_complexity', 'medium')
+    features = project_data.get('key_features', [])
+    tech = project_data.get('recommended_tech', [])
+    components = project_data.get('components', [])
+    
+    response = f"💭 **Context:** Continuing with your active project **{name}**"
+    if recent_messages:
+        response += f" (last discussed: \"{recent_messages[-1]}\")"
+    response += ".\n\n"
+    
+    if topic == 'architecture':
+        response += "🏗️ **TECHNICAL ARCHITECTURE**\n\n"
+        for i, component in enumerate(components, 1):
+            response += f"  {i}. **{component}**"
+            if i < len(components):
+                response += f" → communicates with {components[i]}"
+            response += "\n"
+        response += f"\n**Suggested stack mapping:** {', '.join(tech)}\n"
+        if complexity == 'complex':
+            response += "**Scaling approach:** Split components into independently deployable services behind an API gateway.\n"
+        else:
+            response += "**Scaling approach:** Start as a modular monolith; extract services only when load demands it.\n"
+    
+    elif topic == 'features':
+        response += "📋 **FEATURE PRIORITIZATION**\n\n"
+        must_have = features[:2]
+        should_have = features[2:4]
+        could_have = features[4:]
+        response += f"**Must have (MVP):** {', '.join(must_have) or 'Core workflow'}\n"
+        response += f"**Should have:** {', '.join(should_have) or 'Usability improvements'}\n"
+        response += f"**Could have:** {', '.join(could_have) or 'Advanced extensions'}\n"
+        response += "\n💡 Ship the must-haves first and validate them with real users before building the rest.\n"
+    
+    elif topic == 'timeline':
+        response += "⏱️ **DEVELOPMENT TIMELINE BREAKDOWN**\n\n"
+        weeks = {'simple': (1, 2, 1, 1), 'complex': (3, 8, 3, 2)}.get(complexity, (2, 4, 2, 1))
+        phases = ["Requirements & design", "Core development", "Testing & hardening", "Deployment & launch"]
+        week = 1
+        for phase, duration in zip(phases, weeks):
+            span = f"Week {week}" if duration == 1 else f"Weeks {week}-{week + duration - 1}"
+            response += f"  • **{span}:** {phase}\n"
+            week += duration
+        if project_data.get('timeline_estimate'):
+            response += f"\n**Overall estimate:** {project_data['timeline_estimate']}\n"
+    
+    elif topic == 'technology':
+        response += "🛠️ **TECHNOLOGY ALTERNATIVES**\n\n"
+        for choice in tech:
+            alternative = TECH_ALTERNATIVES.get(choice, "Evaluate options that match your team's experience")
+            response += f"  • **{choice}** → {alternative}\n"
+    
+    else:
+        response += "🎯 **PROJECT RECAP**\n\n"
+        response += f"**Complexity:** {complexity.title()}\n"
+        response += f"**Core features:** {', '.join(features)}\n"
+        response += f"**Technologies:** {', '.join(tech)}\n"
+        response += f"**Components:** {', '.join(components)}\n"
+    
+    response += "\n🔍 **Ask me about:** technical architecture, feature prioritization, timeline breakdown, or technology alternatives."
+    return response
+
+# Rendered blueprints by prompt digest, least recently used evicted first.
+# Planning and rendering are deterministic, so popular prompts can be
+# pre-rendered at startup (warmup.py) and served without recomputation.
+# Only prompts within the classification window (CLASSIFY_WINDOW_CHARS) are
+# cached, which bounds the memory each entry can hold.
+_blueprint_cache = OrderedDict()
+_blueprint_cache_lock = threading.Lock()
+
+def _render_uncached(prompt):
+    plan = plan_project(prompt)
+    return plan, generate_comprehensive_response(plan.project_data, plan.analysis, prompt)
+
+def render_blueprint(prompt):
+    """(ProjectPlan, blueprint reply) for a project prompt, from the blueprint cache when possible"""
+    if len(prompt) > CLASSIFY_WINDOW_CHARS:
+        # Long prompts may be classified past the window; they are rare enough not to cache
+        return _render_uncached(prompt)
+    
+    import hashlib
+    
+    key = hashlib.blake2b(prompt.encode('utf-8'), digest_size=16).digest()
+    with _blueprint_cache_lock:
+        cached = _blueprint_cache.get(key)
+        if cached is not None:
+            _blueprint_cache.move_to_end(key)
+    
+    if cached is None:
+        cached = _render_uncached(prompt)
+        with _blueprint_cache_lock:
+            _blueprint_cache[key] = cached
+            if len(_blueprint_cache) > BLUEPRINT_CACHE_SIZE:
+                _blueprint_cache.popitem(last=False)
+    
+    # Callers keep the project data (e.g. as the active project), so hand out a copy
+    plan, response = cached
+    project_data = {key: list(value) if isinstance(value, list) else value for key, value in plan.project_data.items()}
+    return plan._replace(project_data=project_data), response
+
+def blueprint_cache_size():
+    """Number of prompts with a cached blueprint"""
+    with _blueprint_cache_lock:
+        return len(_blueprint_cache)
+
+def create_project_response(user_message, user_id=None, checkpoint=None):
+    """Create a project from a message and render the blueprint reply
+
+    From a job, pass its `checkpoint`: the saved project's id is recorded
+    there, and a retried or recovered job only re-renders the reply.
+    """
+    from conversation_context import context_store
+    from fair_scheduler import ProjectQuotaExceeded
+    
+    # Classify, plan and render once (or reuse a cached blueprint), then save the project
+    plan, response = render_blueprint(user_message)
+    if checkpoint is not None and checkpoint.get("project_id") is not None:
+        print(f"♻️ Project {checkpoint.get('project_id')} already saved by an earlier attempt")
+    else:
+        try:
+            _, project_id = create_project_from_prompt(user_message, user_id, plan)
+        except ProjectQuotaExceeded as e:
+            print(f"🚫 Project quota reached for user {user_id}")
+            return f"🚫 **{e}.** You can keep asking about your existing projects."
+        if checkpoint is not None:
+            checkpoint.record(project_id=project_id)
+        print(f"🔧 Created project of type: {plan.project_type}")
+    project_data = plan.project_data
+    
+    # Make this the active project for follow-up questions
+    context_store.remember_project(user_id, project_data)
+    
+    return response
+
+@register_task("create_project", checkpoint=True)
+def create_project_job(user_message, user_id, checkpoint):
+    """Job queue task: create a project and record the chat turn
+
+    Saving the project and the chat turn are checkpointed, so a retry or a
+    recovered job never saves either twice.
+    """
+    from chat_history import save_chat_history
+    from fair_scheduler import chat_scheduler
+    
+    # Background creations share the fair scheduler with interactive chat
+    with chat_scheduler.slot(user_id):
+        response = create_project_response(user_message, user_id, checkpoint)
+    chat_id = checkpoint.get("chat_id")
+    if chat_id is None:
+        chat_id = save_chat_history(user_id, user_message, response)
+        checkpoint.record(chat_id=chat_id)
+    return {"response": response, "chat_id": chat_id}
+
+# Routes chosen by route_message
+FOLLOW_UP = "follow_up"
+CREATE_PROJECT = "create_project"
+CHAT = "chat"
+
+def route_message(user_message, user_id=None, message_lower=None):
+    """Decide how to answer a message: (route, follow-up) with route FOLLOW_UP, CREATE_PROJECT or CHAT
+
+    For FOLLOW_UP, follow-up is (active project, topic, context summary).
+    The UI calls this before queueing a project job, so it routes exactly
+    like advanced_llm_response.
+    """
+    if message_lower is None:
+        message_lower = head_window(user_message)
+    
+    # Follow-up questions resolve against the user's active project. They are
+    # checked first: "tell me more about the system design" also reads as a
+    # creation request. Only a message that opens like a new request skips this.
+    topic = detect_follow_up_topic(user_message, message_lower)
+    if topic and user_id is not None and not message_lower.lstrip().startswith(NEW_PROJECT_OPENERS):
+        from conversation_context import context_store
+        
+        context = context_store.get(user_id)
+        if context and context.project:
+            return FOLLOW_UP, (context.project, topic, list(context.summary))
+    
+    if is_project_creation_request(user_message, message_lower):
+        return CREATE_PROJECT, None
+    return CHAT, None
+
+@request_profiler.sampled()
 def advanced_llm_response(user_message, user_id=None):
     """Enhanced LLM response function with proper project detection"""
-    print(f"📨 Received message: '{user_message}'")
+    print(f"📨 Received message: '{preview(user_message)}'")
+    
+    # Lowercase once, and only the part of the message the detectors read
+    message_lower = head_window(user_message)
     
     try:
-        # Check if this is a project creation request (use your existing detection)
-        if is_project_creation_request(user_message):
+        route, follow_up = route_message(user_message, user_id, message_lower)
+        if route == FOLLOW_UP:
+            project, topic, summary = follow_up
+            print(f"🧠 Follow-up on active project ({topic})")
+            return generate_follow_up_response(project, topic, summary)
+        
+        if route == CREATE_PROJECT:
             print("🎯 Detected project creation request")
             
-            # Create the project with enhanced detection
-            project_data, detected_type = create_project_from_prompt(user_message, user_id)
-            print(f"🔧 Created project of type: {detected_type}")
-            
-            # Generate analysis
-            analysis = {
-                'domains': [detected_type],
-                'complexity': project_data['estimated_complexity'],
-                'has_specific_goal': len(user_message.split()) > 3
-            }
-            
-            # Generate comprehensive response
-            response = generate_comprehensive_response(project_data, analysis, user_message)
-            
-            return response
+            return create_project_response(user_message, user_id)
         
         else:
             # Enhanced conversational responses with GPT-style thinking
@@ -348,8 +494,8 @@ Here's how I can help you:
 **Try me with any project idea!**"""
             }
             
-            lower_msg = user_message.lower().strip()
-            print(f"🔍 Processing message: '{lower_msg}'")
+            lower_msg = message_lower.strip()
+            print(f"🔍 Processing message: '{preview(lower_msg)}'")
             
             # Enhanced keyword matching with context awareness
             matched_response = None
@@ -401,5 +547,3 @@ The system will continue functioning in basic mode."""
         
         print(f"❌ Error in advanced_llm_response: {e}")
         return error_response
-
-print("✅ llm_handler.py loaded successfully with enhanced responses")
\ No newline at end of file
@@ -0,0 +1,140 @@
+from collections import Counter
+
+from database import get_db_connection, get_user_db_connection, iter_shards, query_all_shards
+
+# project_stats holds one counter per (user, day, dimension, value), updated in
+# the same transaction as the project insert. Dashboards read only these rows,
+# so their cost depends on users x days x distinct values, not on project count.
+STAT_DIMENSIONS = ('type', 'complexity', 'technology')
+
+# Pseudo user ids: every shard also keeps shard-wide totals under GLOBAL_USER,
+# and projects saved without a user are counted under ANONYMOUS_USER
+GLOBAL_USER = -1
+ANONYMOUS_USER = 0
+
+UPSERT_SQL = '''INSERT INTO project_stats (user_id, day, dimension, value, count)
+                VALUES (?, date('now'), ?, ?, ?)
+                ON CONFLICT (user_id, day, dimension, value) DO UPDATE SET count = count + excluded.count'''
+
+def _dimension(dimension):
+    if dimension not in STAT_DIMENSIONS:
+        raise ValueError(f"Unknown dimension '{dimension}'. Choose from: {', '.join(STAT_DIMENSIONS)}")
+    return dimension
+
+def record_projects(cursor, projects):
+    """Add (user_id, project_data) pairs being inserted on this cursor's shard to today's counters"""
+    counts = Counter()
+    for user_id, project_data in projects:
+        values = [
+            ('type', project_data.get('project_type', 'custom')),
+            ('complexity', project_data.get('estimated_complexity', 'medium'))
+        ]
+        # Count each technology once per project, as the join table does
+        values.extend(('technology', name) for name in dict.fromkeys(project_data.get('recommended_tech', [])))
+        for dimension, value in values:
+            counts[(ANONYMOUS_USER if user_id is None else user_id, dimension, value)] += 1
+            counts[(GLOBAL_USER, dimension, value)] += 1
+    cursor.executemany(UPSERT_SQL, [(user_id, dimension, value, count) for (user_id, dimension, value), count in counts.items()])
+
+def rebuild_project_stats(since=None):
+    """Recompute project_stats from projects on every shard (only days >= `since`, 'YYYY-MM-DD', if given)
+
+    Use after imports, restores or manual edits; one transaction per shard.
+    """
+    day_filter = "WHERE date(p.created_at) >= :since" if since else ""
+    sources = {
+        'type': f"SELECT p.user_id, date(p.created_at) AS day, p.type AS value FROM projects p {day_filter}",
+        'complexity': f"SELECT p.user_id, date(p.created_at) AS day, COALESCE(p.complexity, 'medium') AS value FROM projects p {day_filter}",
+        'technology': f'''SELECT p.user_id, date(p.created_at) AS day, t.name AS value
+                          FROM projects p
+                          JOIN project_technologies j ON j.project_id = p.id
+                          JOIN technologies t ON t.id = j.technology_id
+                          {day_filter} GROUP BY p.id, t.id'''
+    }
+
+    rows = 0
+    for shard in iter_shards():
+        conn = get_db_connection(shard=shard)
+        try:
+            with conn:
+                if since:
+                    conn.execute("DELETE FROM project_stats WHERE day >= ?", (since,))
+                else:
+                    conn.execute("DELETE FROM project_stats")
+                for dimension, source in sources.items():
+                    for grouping in (f"COALESCE(user_id, {ANONYMOUS_USER})", str(GLOBAL_USER)):
+                        rows += conn.execute(
+                            f'''INSERT INTO project_stats (user_id, day, dimension, value, count)
+                                SELECT {grouping}, day, :dimension, value, COUNT(*)
+                                FROM ({source}) GROUP BY 1, day, value''',
+                            {"since": since, "dimension": dimension}
+                        ).rowcount
+        finally:
+            conn.close()
+
+    print(f"📊 Rebuilt {rows} project_stats rows{f' since {since}' if since else ''}")
+    return rows
+
+def _range_filter(start, end):
+    clauses = []
+    params = []
+    if start:
+        clauses.append("day >= ?")
+        params.append(start)
+    if end:
+        clauses.append("day <= ?")
+        params.append(end)
+    return "".join(f" AND {clause}" for clause in clauses), params
+
+def _query_stats(query, params, user_id):
+    """Run a project_stats query on the user's shard, or on every shard for the GLOBAL_USER rows"""
+    if user_id is None:
+        return query_all_shards(query, [GLOBAL_USER] + params)
+    conn = get_user_db_connection(user_id)
+    try:
+        return conn.execute(query, [user_id] + params).fetchall()
+    finally:
+        conn.close()
+
+def project_counts(dimension, user_id=None, start=None, end=None, limit=None):
+    """(value, projects) pairs for a dimension, most common first; all users when user_id is None"""
+    where, params = _range_filter(start, end)
+    counts = Counter()
+    for value, count in _query_stats(
+        f'''SELECT value, SUM(count) FROM project_stats
+            WHERE user_id = ? AND dimension = ?{where} GROUP BY value''',
+        [_dimension(dimension)] + params, user_id
+    ):
+        counts[value] += count
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+def project_timeseries(dimension='type', user_id=None, start=None, end=None, period='day'):
+    """{period: {value: projects}} for a dimension, oldest period first; period is 'day' or 'month'"""
+    if period not in ('day', 'month'):
+        raise ValueError("period must be 'day' or 'month'")
+    bucket = "day" if period == 'day' else "substr(day, 1, 7)"
+    where, params = _range_filter(start, end)
+    series = {}
+    for bucket_value, value, count in _query_stats(
+        f'''SELECT {bucket}, value, SUM(count) FROM project_stats
+            WHERE user_id = ? AND dimension = ?{where} GROUP BY 1, value''',
+        [_dimension(dimension)] + params, user_id
+    ):
+        bucket_counts = series.setdefault(bucket_value, {})
+        bucket_counts[value] = bucket_counts.get(value, 0) + count
+    return dict(sorted(series.items()))
+
+def total_projects(user_id=None, start=None, end=None):
+    """Projects created in the range (every project has exactly one type)"""
+    return sum(count for _, count in project_counts('type', user_id, start, end))
+
+def top_users(start=None, end=None, limit=10):
+    """(user_id, projects) for the users who created the most projects in the range"""
+    where, params = _range_filter(start, end)
+    rows = query_all_shards(
+        f'''SELECT user_id, SUM(count) AS projects FROM project_stats
+            WHERE dimension = 'type' AND user_id > ?{where}
+            GROUP BY user_id ORDER BY projects DESC LIMIT ?''',
+        [ANONYMOUS_USER] + params + [limit]
+    )
+    return sorted(rows, key=lambda row: (-row[1], row[0]))[:limit]
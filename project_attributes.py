@@ -0,0 +1,212 @@
+import json
+import threading
+
+from database import get_db_connection, get_user_db_connection, iter_shards, query_all_shards
+
+# Each list attribute of a project plan is stored as interned names in a lookup
+# table plus an ordered join table, instead of a JSON blob on every row.
+ATTRIBUTE_KINDS = {
+    'features': {
+        "table": "features",
+        "join_table": "project_features",
+        "fk": "feature_id",
+        "plan_key": "key_features",
+        "json_column": "features"
+    },
+    'technologies': {
+        "table": "technologies",
+        "join_table": "project_technologies",
+        "fk": "technology_id",
+        "plan_key": "recommended_tech",
+        "json_column": "technologies"
+    },
+    'components': {
+        "table": "components",
+        "join_table": "project_components",
+        "fk": "component_id",
+        "plan_key": "components",
+        "json_column": "components"
+    }
+}
+
+# (database file, kind) -> {name: id}. Ids are never reassigned, so entries stay valid.
+_id_cache = {}
+_id_cache_lock = threading.Lock()
+
+def _kind(kind):
+    if kind not in ATTRIBUTE_KINDS:
+        raise ValueError(f"Unknown attribute kind '{kind}'. Choose from: {', '.join(ATTRIBUTE_KINDS)}")
+    return ATTRIBUTE_KINDS[kind]
+
+def _database_key(cursor):
+    return cursor.execute("PRAGMA database_list").fetchone()[2]
+
+def intern_names(cursor, kind, names, database_key=None):
+    """Return lookup ids for names, inserting any that are new"""
+    spec = _kind(kind)
+    key = (database_key or _database_key(cursor), kind)
+
+    with _id_cache_lock:
+        cache = _id_cache.setdefault(key, {})
+        missing = [name for name in set(names) if name not in cache]
+
+    for name in missing:
+        cursor.execute(f"INSERT OR IGNORE INTO {spec['table']} (name) VALUES (?)", (name,))
+        row = cursor.execute(f"SELECT id FROM {spec['table']} WHERE name = ?", (name,)).fetchone()
+        with _id_cache_lock:
+            cache[name] = row[0]
+
+    return [cache[name] for name in names]
+
+def forget_interned_ids():
+    """Clear the id cache, e.g. after a transaction that interned new names rolled back"""
+    with _id_cache_lock:
+        _id_cache.clear()
+
+def attach_project_attributes(cursor, project_id, project_data):
+    """Write a project plan's features, technologies and components to the join tables"""
+    attach_many_project_attributes(cursor, [(project_id, project_data)])
+
+def attach_many_project_attributes(cursor, projects):
+    """attach_project_attributes for a batch of (project_id, project_data) pairs, one executemany per kind"""
+    database_key = _database_key(cursor)
+    for kind, spec in ATTRIBUTE_KINDS.items():
+        rows = []
+        for project_id, project_data in projects:
+            names = project_data.get(spec["plan_key"], [])
+            ids = intern_names(cursor, kind, names, database_key)
+            rows.extend((project_id, attribute_id, position) for position, attribute_id in enumerate(ids))
+        if rows:
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO {spec['join_table']} (project_id, {spec['fk']}, position) VALUES (?, ?, ?)",
+                rows
+            )
+
+def load_project_attributes(cursor, project_ids):
+    """Read attribute lists for projects: {project_id: {plan_key: [names, ...]}}"""
+    project_ids = list(project_ids)
+    result = {project_id: {spec["plan_key"]: [] for spec in ATTRIBUTE_KINDS.values()} for project_id in project_ids}
+
+    for start in range(0, len(project_ids), 500):
+        chunk = project_ids[start:start + 500]
+        placeholders = ", ".join("?" for _ in chunk)
+        for spec in ATTRIBUTE_KINDS.values():
+            cursor.execute(
+                f'''SELECT j.project_id, a.name FROM {spec["join_table"]} j
+                    JOIN {spec["table"]} a ON a.id = j.{spec["fk"]}
+                    WHERE j.project_id IN ({placeholders})
+                    ORDER BY j.project_id, j.position''',
+                chunk
+            )
+            for project_id, name in cursor.fetchall():
+                result[project_id][spec["plan_key"]].append(name)
+    return result
+
+def resolve_project_lists(cursor, rows, id_index, json_indexes):
+    """Fill attribute lists for project rows that may predate the lookup tables
+
+    `json_indexes` maps plan keys to the row positions of the legacy JSON
+    columns. Rows with JSON text are decoded; the rest are read from the
+    join tables in one batch. Returns a list of {plan_key: [...]} per row.
+    """
+    lists = []
+    pending = []
+    for row in rows:
+        if any(row[index] is not None for index in json_indexes.values()):
+            lists.append({key: json.loads(row[index] or "[]") for key, index in json_indexes.items()})
+        else:
+            lists.append(None)
+            pending.append(row[id_index])
+
+    if pending:
+        loaded = load_project_attributes(cursor, pending)
+        lists = [
+            loaded[row[id_index]] if values is None else values
+            for row, values in zip(rows, lists)
+        ]
+    return lists
+
+def find_projects_using(kind, name, user_id=None, exact=True):
+    """Projects that use a feature/technology/component, newest first
+
+    With exact=False the name is matched as a substring (e.g. "Redis" or
+    "Python" inside "Node.js/Python") against the small lookup table only.
+    Without a user_id every shard is searched.
+    """
+    spec = _kind(kind)
+    match = "name = ?" if exact else "name LIKE ?"
+    params = [name if exact else f"%{name}%"]
+    query = f'''SELECT p.id, p.name, p.type, p.created_at FROM projects p
+                WHERE p.id IN (
+                    SELECT j.project_id FROM {spec["join_table"]} j
+                    WHERE j.{spec["fk"]} IN (SELECT id FROM {spec["table"]} WHERE {match})
+                )'''
+    if user_id is None:
+        # Ids are per shard, so order the merged rows by creation time
+        rows = query_all_shards(query, params)
+        return sorted(rows, key=lambda row: (row[3] or '', row[0]), reverse=True)
+
+    query += " AND p.user_id = ? ORDER BY p.id DESC"
+    params.append(user_id)
+    conn = get_user_db_connection(user_id)
+    try:
+        return conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+def count_projects_by(kind):
+    """(name, project count) pairs for a kind across all shards, most used first"""
+    spec = _kind(kind)
+    counts = {}
+    for name, uses in query_all_shards(
+        f'''SELECT a.name, COUNT(DISTINCT j.project_id) AS uses
+            FROM {spec["join_table"]} j JOIN {spec["table"]} a ON a.id = j.{spec["fk"]}
+            GROUP BY j.{spec["fk"]}'''
+    ):
+        counts[name] = counts.get(name, 0) + uses
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+
+def migrate_json_attributes(batch_size=2000):
+    """Move legacy JSON features/technologies/components into the lookup tables
+
+    Processes projects in id order, shard by shard, one transaction per
+    batch, and clears the JSON columns of each migrated row. Safe to
+    interrupt and re-run.
+    """
+    columns = [spec["json_column"] for spec in ATTRIBUTE_KINDS.values()]
+    migrated = 0
+    for shard in iter_shards():
+        conn = get_db_connection(shard=shard)
+        cursor = conn.cursor()
+        last_id = 0
+        try:
+            while True:
+                cursor.execute(
+                    f'''SELECT id, {', '.join(columns)} FROM projects
+                        WHERE id > ? AND ({' OR '.join(f"{c} IS NOT NULL" for c in columns)})
+                        ORDER BY id LIMIT ?''',
+                    (last_id, batch_size)
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+
+                with conn:
+                    attach_many_project_attributes(cursor, [
+                        (row[0], {
+                            spec["plan_key"]: json.loads(value or "[]")
+                            for spec, value in zip(ATTRIBUTE_KINDS.values(), row[1:])
+                        })
+                        for row in rows
+                    ])
+                    cursor.executemany(
+                        f"UPDATE projects SET {', '.join(f'{c} = NULL' for c in columns)} WHERE id = ?",
+                        [(row[0],) for row in rows]
+                    )
+                migrated += len(rows)
+                last_id = rows[-1][0]
+        finally:
+            conn.close()
+
+    print(f"🗂️ Migrated attributes for {migrated} projects")
+    return migrated
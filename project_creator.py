@@ -0,0 +1,364 @@
+"""Command line entry point for AI Project Creator
+
+Usage:
+    python -m project_creator batch prompts.jsonl --output plans.jsonl
+    python -m project_creator batch prompts.jsonl --db --user-id 1
+    python -m project_creator export projects projects.jsonl --format jsonl
+    python -m project_creator import chat_history chat.csv --format csv
+    python -m project_creator backup --every 3600
+    python -m project_creator restore restored.db
+    python -m project_creator reshard 4
+    python -m project_creator profile-report advanced_llm_response
+    python -m project_creator scaffold --user-id 1 --format zip
+    python -m project_creator check-import-time
+    python -m project_creator bench planning
+"""
+import argparse
+import sys
+
+def cmd_batch(args):
+    from batch import run_batch
+
+    run_batch(
+        args.input,
+        output_path=args.output,
+        to_db=args.db,
+        user_id=args.user_id,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        db_batch_size=args.db_batch_size,
+        report_every=args.report_every
+    )
+    return 0
+
+def cmd_export(args):
+    from data_transfer import export_table
+
+    export_table(args.table, args.output, fmt=args.format, fetch_size=args.fetch_size, resume=not args.restart)
+    return 0
+
+def cmd_import(args):
+    from data_transfer import import_table
+
+    import_table(
+        args.table, args.input, fmt=args.format, batch_size=args.batch_size,
+        keep_ids=args.keep_ids, resume=not args.restart
+    )
+    return 0
+
+def cmd_compact_chat(args):
+    from chat_history import compact_chat_history
+
+    compact_chat_history(batch_size=args.batch_size)
+    return 0
+
+def cmd_migrate_attributes(args):
+    from project_attributes import migrate_json_attributes
+
+    migrate_json_attributes(batch_size=args.batch_size)
+    return 0
+
+def cmd_attributes(args):
+    from project_attributes import count_projects_by, find_projects_using
+
+    if args.using:
+        for project_id, name, project_type, created_at in find_projects_using(args.kind, args.using, exact=args.exact):
+            print(f"{project_id}\t{name}\t{project_type}\t{created_at}")
+    else:
+        for name, uses in count_projects_by(args.kind):
+            print(f"{uses}\t{name}")
+    return 0
+
+def cmd_analytics(args):
+    from project_analytics import project_counts, total_projects
+
+    print(f"{total_projects(args.user_id, args.start, args.end)}\tprojects")
+    for value, count in project_counts(args.dimension, args.user_id, args.start, args.end, args.limit):
+        print(f"{count}\t{value}")
+    return 0
+
+def cmd_rebuild_analytics(args):
+    from project_analytics import rebuild_project_stats
+
+    rebuild_project_stats(args.since)
+    return 0
+
+def cmd_train_classifier(args):
+    from config import PROJECT_CLASSIFIER_PATH
+    from tfidf_classifier import train_classifier, training_documents
+
+    documents = training_documents(include_history=not args.no_history)
+    model = train_classifier(documents, threshold=args.threshold)
+    output = args.output or PROJECT_CLASSIFIER_PATH
+    model.save(output)
+    print(f"🧮 Trained on {len(documents)} documents ({len(model.vocabulary)} terms) -> {output}")
+    print("💡 Set PROJECT_CLASSIFIER=tfidf to use it")
+    return 0
+
+def cmd_backup(args):
+    from backup import database_paths, list_snapshots, run_backup_schedule, snapshot_all, snapshot_dir
+    from config import BACKUP_DIR
+
+    backup_dir = args.dir or BACKUP_DIR
+    if args.list:
+        for path in database_paths():
+            directory = snapshot_dir(backup_dir, path)
+            print(f"{path} ({directory})")
+            for snapshot in list_snapshots(directory):
+                print(f"  {snapshot['name']}\t{snapshot['kind']}\t{snapshot['changed_pages']}/{snapshot['pages']} pages\t{snapshot['bytes']} bytes")
+    elif args.every:
+        run_backup_schedule(args.every, backup_dir)
+    else:
+        snapshot_all(backup_dir, full=args.full)
+    return 0
+
+def cmd_restore(args):
+    from backup import restore_snapshot
+    from config import BACKUP_DIR
+
+    restore_snapshot(args.snapshot, args.dest, args.dir or BACKUP_DIR, overwrite=args.overwrite)
+    return 0
+
+def cmd_verify(args):
+    from backup import verify_database
+    from config import DATABASE_NAME
+
+    path = args.path or DATABASE_NAME
+    problems = verify_database(path)
+    if problems:
+        print(f"❌ {path} failed integrity check:")
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+    print(f"✅ {path} passed integrity check")
+    return 0
+
+def cmd_archive_chat(args):
+    from backup import archive_chat_history
+    from config import CHAT_ARCHIVE_DIR, CHAT_RETENTION_DAYS
+
+    days = args.days or CHAT_RETENTION_DAYS or 90
+    archive_chat_history(days, args.dir or CHAT_ARCHIVE_DIR, batch_size=args.batch_size)
+    return 0
+
+def cmd_shards(args):
+    from database import get_db_connection, iter_shards, shard_paths
+
+    totals = [0, 0, 0]
+    for shard in iter_shards():
+        conn = get_db_connection(shard=shard)
+        try:
+            counts = conn.execute(
+                '''SELECT (SELECT COUNT(DISTINCT user_id) FROM chat_history),
+                          (SELECT COUNT(*) FROM chat_history),
+                          (SELECT COUNT(*) FROM projects)'''
+            ).fetchone()
+        finally:
+            conn.close()
+        totals = [total + count for total, count in zip(totals, counts)]
+        print(f"{shard}\t{shard_paths()[shard]}\t{counts[0]} users\t{counts[1]} chat turns\t{counts[2]} projects")
+    print(f"all\t\t{totals[0]} users\t{totals[1]} chat turns\t{totals[2]} projects")
+    return 0
+
+def cmd_reshard(args):
+    from sharding import reshard
+
+    reshard(args.count, batch_size=args.batch_size, backup=not args.no_backup)
+    return 0
+
+def cmd_profile_report(args):
+    from config import PROFILE_DIR
+    from request_profiler import format_top, merge_profiles
+
+    merged = merge_profiles(args.dir or PROFILE_DIR)
+    if not merged:
+        print(f"ℹ️ No profiles in {args.dir or PROFILE_DIR}; set PROFILE_SAMPLE_RATE to collect some")
+        return 1
+    for label in args.labels or sorted(merged):
+        stacks = merged.get(label)
+        if not stacks:
+            print(f"⚠️ No samples for {label}")
+            continue
+        print(format_top(stacks, args.top, f"🔥 {label}: {sum(stacks.values())} samples"))
+    return 0
+
+def cmd_warmup(args):
+    from llm_handler import blueprint_cache_size
+    from warmup import Warmup
+
+    result = Warmup().run()
+    print(f"✅ Warm-up finished in {result.timings['total'] * 1000:.0f} ms; {blueprint_cache_size()} blueprints cached")
+    return 1 if result.errors else 0
+
+def cmd_scaffold(args):
+    from scaffold import load_projects, scaffold_many, slugify
+
+    projects = load_projects(args.user_id, args.project_ids or None)
+    missing = set(args.project_ids) - {project_id for project_id, _ in projects}
+    for project_id in sorted(missing):
+        print(f"❌ User {args.user_id} has no project {project_id}")
+    fmt = None if args.format == "dir" else args.format
+    # Project names repeat, so outputs are named <id>-<slug>
+    named = ((f"{project_id}-{slugify(data['project_name'])}", data) for project_id, data in projects)
+    for name, path, size in scaffold_many(named, args.output, fmt=fmt, workers=args.workers, overwrite=args.overwrite):
+        print(f"📦 {path} ({f'{size} files' if fmt is None else f'{size / 1024:.1f} KB'})")
+    return 1 if missing else 0
+
+def cmd_check_import_time(args):
+    from import_budget import CORE_MODULES, check_import_time
+    from config import IMPORT_TIME_BUDGET_MS
+
+    ok = check_import_time(
+        args.modules or CORE_MODULES,
+        budget_ms=args.budget if args.budget is not None else IMPORT_TIME_BUDGET_MS,
+        runs=args.runs
+    )
+    return 0 if ok else 1
+
+def cmd_bench(args):
+    from benchmarks import BENCHMARKS
+
+    for name in args.names or sorted(BENCHMARKS):
+        print(f"📏 {name}")
+        BENCHMARKS[name]()
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="project_creator", description="AI Project Creator tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    batch_parser = subparsers.add_parser("batch", help="Generate project plans for a file of prompts")
+    batch_parser.add_argument("input", help="Prompts file (JSONL with a 'prompt' key, or one prompt per line)")
+    batch_parser.add_argument("--output", "-o", help="Write plans as JSONL to this path")
+    batch_parser.add_argument("--db", action="store_true", help="Insert plans into the projects table")
+    batch_parser.add_argument("--user-id", type=int, help="Owner for prompts that don't specify a user_id")
+    batch_parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    batch_parser.add_argument("--chunk-size", type=int, default=200, help="Prompts per worker task")
+    batch_parser.add_argument("--db-batch-size", type=int, default=1000, help="Rows per database transaction")
+    batch_parser.add_argument("--report-every", type=int, default=10000, help="Print throughput every N prompts")
+    batch_parser.set_defaults(func=cmd_batch)
+
+    formats = ("jsonl", "csv", "columnar")
+    tables = ("projects", "chat_history")
+
+    export_parser = subparsers.add_parser("export", help="Stream a table out to a file")
+    export_parser.add_argument("table", choices=tables)
+    export_parser.add_argument("output", help="Destination file")
+    export_parser.add_argument("--format", "-f", choices=formats, default="jsonl")
+    export_parser.add_argument("--fetch-size", type=int, default=5000, help="Rows per fetch")
+    export_parser.add_argument("--restart", action="store_true", help="Ignore any checkpoint and start over")
+    export_parser.set_defaults(func=cmd_export)
+
+    import_parser = subparsers.add_parser("import", help="Bulk-load an exported file into a table")
+    import_parser.add_argument("table", choices=tables)
+    import_parser.add_argument("input", help="Exported file")
+    import_parser.add_argument("--format", "-f", choices=formats, default="jsonl")
+    import_parser.add_argument("--batch-size", type=int, default=50000, help="Rows per transaction")
+    import_parser.add_argument("--keep-ids", action="store_true", help="Preserve ids; fails if an id is already taken")
+    import_parser.add_argument("--restart", action="store_true", help="Ignore the import checkpoint and load every row")
+    import_parser.set_defaults(func=cmd_import)
+
+    compact_parser = subparsers.add_parser("compact-chat", help="Move inline chat responses into the compressed responses table")
+    compact_parser.add_argument("--batch-size", type=int, default=5000, help="Rows per transaction")
+    compact_parser.set_defaults(func=cmd_compact_chat)
+
+    migrate_parser = subparsers.add_parser("migrate-attributes", help="Move JSON features/technologies/components into lookup tables")
+    migrate_parser.add_argument("--batch-size", type=int, default=2000, help="Projects per transaction")
+    migrate_parser.set_defaults(func=cmd_migrate_attributes)
+
+    attributes_parser = subparsers.add_parser("attributes", help="Count projects by feature/technology/component, or list projects using one")
+    attributes_parser.add_argument("kind", choices=("features", "technologies", "components"))
+    attributes_parser.add_argument("--using", help="List projects using this name instead of counting")
+    attributes_parser.add_argument("--exact", action="store_true", help="Match --using exactly instead of as a substring")
+    attributes_parser.set_defaults(func=cmd_attributes)
+
+    analytics_parser = subparsers.add_parser("analytics", help="Count projects by type, complexity or technology from the aggregates")
+    analytics_parser.add_argument("dimension", choices=("type", "complexity", "technology"))
+    analytics_parser.add_argument("--user-id", type=int, help="One user's projects (default: everyone)")
+    analytics_parser.add_argument("--start", help="First day, YYYY-MM-DD")
+    analytics_parser.add_argument("--end", help="Last day, YYYY-MM-DD")
+    analytics_parser.add_argument("--limit", type=int, help="Show only the top N values")
+    analytics_parser.set_defaults(func=cmd_analytics)
+
+    rebuild_parser = subparsers.add_parser("rebuild-analytics", help="Recompute the project_stats aggregates from projects")
+    rebuild_parser.add_argument("--since", help="Only rebuild days from this one on, YYYY-MM-DD")
+    rebuild_parser.set_defaults(func=cmd_rebuild_analytics)
+
+    train_parser = subparsers.add_parser("train-classifier", help="Train the TF-IDF project type classifier (needs numpy)")
+    train_parser.add_argument("--output", "-o", help="Model path (default: PROJECT_CLASSIFIER_PATH)")
+    train_parser.add_argument("--threshold", type=float, default=0.08, help="Minimum similarity before falling back to 'custom'")
+    train_parser.add_argument("--no-history", action="store_true", help="Train only on templates, not saved project descriptions")
+    train_parser.set_defaults(func=cmd_train_classifier)
+
+    backup_parser = subparsers.add_parser("backup", help="Take an online snapshot of the database")
+    backup_parser.add_argument("--dir", help="Snapshot directory (default: BACKUP_DIR)")
+    backup_parser.add_argument("--full", action="store_true", help="Take a full snapshot instead of an incremental one")
+    backup_parser.add_argument("--every", type=float, help="Keep running: snapshot, prune and archive chat every N seconds")
+    backup_parser.add_argument("--list", action="store_true", help="List snapshots instead of taking one")
+    backup_parser.set_defaults(func=cmd_backup)
+
+    restore_parser = subparsers.add_parser("restore", help="Rebuild the database from a snapshot")
+    restore_parser.add_argument("dest", help="Path for the restored database")
+    restore_parser.add_argument("--snapshot", help="Snapshot name (default: newest)")
+    restore_parser.add_argument("--dir", help="Snapshot directory (default: BACKUP_DIR; shards use BACKUP_DIR/<shard file name>)")
+    restore_parser.add_argument("--overwrite", action="store_true", help="Replace dest if it exists")
+    restore_parser.set_defaults(func=cmd_restore)
+
+    verify_parser = subparsers.add_parser("verify", help="Run an integrity check on a database file")
+    verify_parser.add_argument("path", nargs="?", help="Database file (default: the app database)")
+    verify_parser.set_defaults(func=cmd_verify)
+
+    archive_parser = subparsers.add_parser("archive-chat", help="Move old chat history into compressed monthly archives")
+    archive_parser.add_argument("--days", type=int, help="Archive rows older than this (default: CHAT_RETENTION_DAYS, or 90)")
+    archive_parser.add_argument("--dir", help="Archive directory (default: CHAT_ARCHIVE_DIR)")
+    archive_parser.add_argument("--batch-size", type=int, default=5000, help="Rows per transaction")
+    archive_parser.set_defaults(func=cmd_archive_chat)
+
+    shards_parser = subparsers.add_parser("shards", help="Show per-shard user, chat and project counts")
+    shards_parser.set_defaults(func=cmd_shards)
+
+    reshard_parser = subparsers.add_parser("reshard", help="Move per-user data to a new number of shard files (stop the app first)")
+    reshard_parser.add_argument("count", type=int, help="New number of shards (1 = single database file)")
+    reshard_parser.add_argument("--batch-size", type=int, default=5000, help="Rows per transaction")
+    reshard_parser.add_argument("--no-backup", action="store_true", help="Skip the full snapshot taken before resharding")
+    reshard_parser.set_defaults(func=cmd_reshard)
+
+    profile_parser = subparsers.add_parser("profile-report", help="Merge sampled request profiles and print hot functions")
+    profile_parser.add_argument("labels", nargs="*", help="Labels to report (default: all), e.g. advanced_llm_response")
+    profile_parser.add_argument("--dir", help="Profile directory (default: PROFILE_DIR)")
+    profile_parser.add_argument("--top", type=int, default=20, help="Functions to list")
+    profile_parser.set_defaults(func=cmd_profile_report)
+
+    warmup_parser = subparsers.add_parser("warmup", help="Run the startup warm-up stages once and report their timings")
+    warmup_parser.set_defaults(func=cmd_warmup)
+
+    scaffold_parser = subparsers.add_parser("scaffold", help="Generate project scaffolds (directories or archives) from saved projects")
+    scaffold_parser.add_argument("project_ids", nargs="*", type=int, help="Project ids (default: all of the user's projects)")
+    scaffold_parser.add_argument("--user-id", type=int, required=True, help="Owner of the projects")
+    scaffold_parser.add_argument("--output", default="scaffolds", help="Output directory")
+    scaffold_parser.add_argument("--format", choices=("dir", "zip", "tar", "tar.gz"), default="dir")
+    scaffold_parser.add_argument("--workers", type=int, default=None, help="Parallel scaffolds (default: SCAFFOLD_WORKERS)")
+    scaffold_parser.add_argument("--overwrite", action="store_true", help="Replace existing outputs")
+    scaffold_parser.set_defaults(func=cmd_scaffold)
+
+    import_time_parser = subparsers.add_parser("check-import-time", help="Fail if cold-importing the classifier modules exceeds the budget")
+    import_time_parser.add_argument("modules", nargs="*", help="Modules to import (default: project_manager llm_handler)")
+    import_time_parser.add_argument("--budget", type=float, default=None, help="Budget in ms (default: IMPORT_TIME_BUDGET_MS)")
+    import_time_parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module; the fastest run counts")
+    import_time_parser.set_defaults(func=cmd_check_import_time)
+
+    bench_parser = subparsers.add_parser("bench", help="Run micro-benchmarks")
+    bench_parser.add_argument("names", nargs="*", help="Benchmarks to run (default: all)")
+    bench_parser.set_defaults(func=cmd_bench)
+
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "batch" and not (args.output or args.db):
+        parser.error("batch needs --output and/or --db")
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,70 +1,136 @@
-import json
-import re
-from database import get_db_connection
+from collections import namedtuple
 
-def detect_project_type(prompt):
-    """Enhanced project type detection with better pattern matching"""
-    prompt_lower = prompt.lower()
+from config import PROJECT_CLASSIFIER, CLASSIFY_WINDOW_CHARS
+from prompt_text import WINDOW_OVERLAP_CHARS, compile_bounded, head_window, iter_windows, preview
+
+# Classification and planning need only the modules above. The database,
+# quota and analytics modules are imported inside the functions that save or
+# load projects, so classifier-only callers never import or initialize them.
+
+# Regex patterns per project type; each match adds to its type's score.
+# Patterns must stay bounded (no *, + or {n,}) so matching is linear-time.
+PROJECT_TYPE_PATTERNS = {
+    'web_app': [
+        r'\b(web|website|frontend|backend|portfolio|e.?commerce|ecommerce|blog|shop|store|portal)\b',
+        r'\b(react|vue|angular|html|css|javascript|node|django|flask)\b',
+        r'create (a |an )?(website|web app|web application|online)',
+        r'build (a |an )?(website|web app|web application|online)'
+    ],
+    'data_analysis': [
+        r'\b(data|analysis|analytics|chart|graph|dashboard|report|visualization|excel|csv)\b',
+        r'\b(pandas|numpy|matplotlib|seaborn|tableau|power.?bi)\b',
+        r'analyze|visualize|dashboard|reporting',
+        r'create (a |an )?(data|analysis|analytics|dashboard)'
+    ],
+    'chatbot': [
+        r'\b(chat|bot|chatbot|conversation|assistant|support|faq|helpdesk)\b',
+        r'\b(ai|artificial intelligence|nlp|natural language)\b',
+        r'customer service|virtual assistant|automated response',
+        r'create (a |an )?(chatbot|bot|assistant)'
+    ],
+    'automation_agent': [
+        r'\b(automation|auto|script|bot|cron|schedule|task|workflow)\b',
+        r'\b(automate|automatic|scheduled|recurring|routine)\b',
+        r'auto.?mat|script|batch|process',
+        r'create (a |an )?(automation|script|bot)'
+    ],
+    'mobile_app': [
+        r'\b(mobile|app|ios|android|phone|tablet|flutter|react native)\b',
+        r'\b(mobile application|phone app|tablet app)\b',
+        r'create (a |an )?(mobile|app|application)'
+    ]
+}
+
+# Plain substring keywords; each one present adds to its type's score
+PROJECT_TYPE_KEYWORDS = {
+    'web_app': ['web', 'site', 'browser', 'online', 'internet'],
+    'data_analysis': ['data', 'analyze', 'chart', 'graph', 'report'],
+    'chatbot': ['chat', 'conversation', 'message', 'reply'],
+    'automation_agent': ['automate', 'script', 'task', 'schedule'],
+    'mobile_app': ['mobile', 'phone', 'app', 'ios', 'android']
+}
+
+def detect_project_type(prompt, prompt_window=None):
+    """Enhanced project type detection with better pattern matching
+
+    Uses the TF-IDF classifier when PROJECT_CLASSIFIER=tfidf and a trained
+    model is available, and the regex scorer otherwise. `prompt_window` is
+    the prompt's head_window() if the caller already computed it.
+    """
+    if PROJECT_CLASSIFIER == 'tfidf':
+        from tfidf_classifier import get_project_classifier
+        
+        classifier = get_project_classifier()
+        if classifier is not None:
+            return classifier.predict([prompt_window or head_window(prompt)])[0]
     
-    # More sophisticated pattern matching
-    patterns = {
-        'web_app': [
-            r'\b(web|website|frontend|backend|portfolio|e.?commerce|ecommerce|blog|shop|store|portal)\b',
-            r'\b(react|vue|angular|html|css|javascript|node|django|flask)\b',
-            r'create (a |an )?(website|web app|web application|online)',
-            r'build (a |an )?(website|web app|web application|online)'
-        ],
-        'data_analysis': [
-            r'\b(data|analysis|analytics|chart|graph|dashboard|report|visualization|excel|csv)\b',
-            r'\b(pandas|numpy|matplotlib|seaborn|tableau|power.?bi)\b',
-            r'analyze|visualize|dashboard|reporting',
-            r'create (a |an )?(data|analysis|analytics|dashboard)'
-        ],
-        'chatbot': [
-            r'\b(chat|bot|chatbot|conversation|assistant|support|faq|helpdesk)\b',
-            r'\b(ai|artificial intelligence|nlp|natural language)\b',
-            r'customer service|virtual assistant|automated response',
-            r'create (a |an )?(chatbot|bot|assistant)'
-        ],
-        'automation_agent': [
-            r'\b(automation|auto|script|bot|cron|schedule|task|workflow)\b',
-            r'\b(automate|automatic|scheduled|recurring|routine)\b',
-            r'auto.?mat|script|batch|process',
-            r'create (a |an )?(automation|script|bot)'
-        ],
-        'mobile_app': [
-            r'\b(mobile|app|ios|android|phone|tablet|flutter|react native)\b',
-            r'\b(mobile application|phone app|tablet app)\b',
-            r'create (a |an )?(mobile|app|application)'
-        ]
-    }
+    return detect_project_type_regex(prompt, prompt_window)
+
+def detect_project_types(prompts):
+    """Classify many prompts at once (a single matrix multiply with the TF-IDF classifier)"""
+    if PROJECT_CLASSIFIER == 'tfidf':
+        from tfidf_classifier import get_project_classifier
+        
+        classifier = get_project_classifier()
+        if classifier is not None:
+            return classifier.predict([head_window(prompt) for prompt in prompts])
     
-    # Score each project type based on pattern matches
-    scores = {}
-    for project_type, regex_patterns in patterns.items():
-        score = 0
+    return [detect_project_type_regex(prompt) for prompt in prompts]
+
+_compiled_type_patterns = None
+
+def _compiled_patterns():
+    """PROJECT_TYPE_PATTERNS compiled once, on first use"""
+    global _compiled_type_patterns
+    if _compiled_type_patterns is None:
+        _compiled_type_patterns = {
+            project_type: [compile_bounded(pattern) for pattern in patterns]
+            for project_type, patterns in PROJECT_TYPE_PATTERNS.items()
+        }
+    return _compiled_type_patterns
+
+def _score_window(window, first, last, scores, keywords_seen):
+    """Add one lowercased window's pattern and keyword matches to the running scores
+
+    Only pattern matches starting in window[first:last] count; the rest of
+    the window is context shared with the neighbouring windows.
+    """
+    for project_type, regex_patterns in _compiled_patterns().items():
         for pattern in regex_patterns:
-            matches = re.findall(pattern, prompt_lower)
-            score += len(matches) * 2  # Weight pattern matches
+            # Weight pattern matches
+            scores[project_type] += 2 * sum(1 for match in pattern.finditer(window) if first <= match.start() < last)
         
         # Additional scoring based on keywords
-        keywords = {
-            'web_app': ['web', 'site', 'browser', 'online', 'internet'],
-            'data_analysis': ['data', 'analyze', 'chart', 'graph', 'report'],
-            'chatbot': ['chat', 'conversation', 'message', 'reply'],
-            'automation_agent': ['automate', 'script', 'task', 'schedule'],
-            'mobile_app': ['mobile', 'phone', 'app', 'ios', 'android']
-        }
-        
-        for keyword in keywords.get(project_type, []):
-            if keyword in prompt_lower:
-                score += 3
-        
-        scores[project_type] = score
+        for keyword in PROJECT_TYPE_KEYWORDS.get(project_type, []):
+            if keyword not in keywords_seen[project_type] and keyword in window:
+                keywords_seen[project_type].add(keyword)
+                scores[project_type] += 3
+
+def detect_project_type_regex(prompt, prompt_window=None):
+    """Score each project type with regex and keyword matches
+
+    Only the first CLASSIFY_WINDOW_CHARS characters are scored unless they
+    are inconclusive; then the rest of a long prompt is streamed window by
+    window until a type clears the threshold or CLASSIFY_STREAM_MAX_CHARS
+    is reached. Work is linear in the characters scanned.
+    """
+    scores = dict.fromkeys(PROJECT_TYPE_PATTERNS, 0)
+    keywords_seen = {project_type: set() for project_type in PROJECT_TYPE_PATTERNS}
     
-    # Get the project type with highest score
+    window = prompt_window if prompt_window is not None else head_window(prompt)
+    # When the prompt goes on, the head's last WINDOW_OVERLAP_CHARS may cut a term: leave them to the stream
+    truncated = len(prompt) > len(window)
+    head_span = len(window) - WINDOW_OVERLAP_CHARS if truncated else len(window)
+    _score_window(window, 0, head_span, scores, keywords_seen)
     best_match = max(scores.items(), key=lambda x: x[1])
     
+    if best_match[1] <= 2 and truncated:
+        for window, first, last in iter_windows(prompt, start=head_span):
+            _score_window(window, first, last, scores, keywords_seen)
+            best_match = max(scores.items(), key=lambda x: x[1])
+            if best_match[1] > 2:
+                break
+    
     # Only return if score is above threshold, otherwise use 'custom'
     if best_match[1] > 2:
         return best_match[0]
@@ -167,43 +233,123 @@ def get_project_template(project_type):
     
     return templates.get(project_type, templates['custom'])
 
-def create_project_from_prompt(user_prompt, user_id):
-    """Create a project with proper type detection and customization"""
-    print(f"🎯 Analyzing prompt: '{user_prompt}'")
-    
-    # Detect project type
-    project_type = detect_project_type(user_prompt)
-    print(f"📊 Detected project type: {project_type}")
-    
-    # Get template for this project type
+# Complexity keywords; later levels win when several match
+COMPLEXITY_INDICATORS = {
+    'simple': ['simple', 'basic', 'small', 'quick', 'minimal'],
+    'complex': ['complex', 'advanced', 'enterprise', 'large', 'comprehensive', 'sophisticated']
+}
+
+# Timeline for simple projects; other levels use the template timeline
+SIMPLE_TIMELINES = {
+    'web_app': "2-4 weeks",
+    'data_analysis': "3-5 weeks",
+    'chatbot': "4-6 weeks",
+    'automation_agent': "2-4 weeks",
+    'mobile_app': "4-8 weeks",
+    'custom': "3-6 weeks"
+}
+
+class ProjectPlan(namedtuple("ProjectPlan", "prompt project_type complexity has_specific_goal project_data")):
+    """Result of the planning pipeline for one prompt"""
+    __slots__ = ()
+
+    @property
+    def analysis(self):
+        """Analysis dict in the shape used by the response generators"""
+        return {
+            'domains': [self.project_type],
+            'complexity': self.complexity,
+            'has_specific_goal': self.has_specific_goal
+        }
+
+def estimate_complexity(prompt_lower):
+    """Estimate project complexity from an already-lowercased prompt"""
+    complexity = 'medium'
+    for comp_level, indicators in COMPLEXITY_INDICATORS.items():
+        if any(indicator in prompt_lower for indicator in indicators):
+            complexity = comp_level
+    return complexity
+
+def classify_prompt(prompt, project_type=None):
+    """Classify a prompt once: returns the analysis dict (project type, complexity, specificity)
+
+    The prompt is lowercased once, and only its first CLASSIFY_WINDOW_CHARS
+    characters, however long it is.
+    """
+    window = head_window(prompt)
+    return {
+        'domains': [project_type or detect_project_type(prompt, window)],
+        'complexity': estimate_complexity(window),
+        'has_specific_goal': len(window.split()) > 3
+    }
+
+def create_detailed_project_plan(prompt, analysis):
+    """Create a detailed project plan from a prompt and its analysis"""
+    project_type = analysis['domains'][0] if analysis['domains'] else 'custom'
+    complexity = analysis['complexity']
     template = get_project_template(project_type)
     
-    # Customize based on prompt
-    project_name = generate_project_name(user_prompt, project_type)
-    description = generate_project_description(user_prompt, template)
-    
-    # Create project data
     project_data = {
         "project_type": project_type,
-        "project_name": project_name,
-        "description": description,
-        "key_features": template["key_features"],
-        "estimated_complexity": template["complexity"],
-        "recommended_tech": template["recommended_tech"],
-        "components": template["components"],
-        "timeline_estimate": template["timeline"],
-        "original_prompt": user_prompt
+        "project_name": generate_project_name(prompt, project_type),
+        "description": generate_project_description(prompt, template),
+        "key_features": list(template["key_features"]),
+        "estimated_complexity": complexity,
+        "recommended_tech": list(template["recommended_tech"]),
+        "components": list(template["components"]),
+        "timeline_estimate": SIMPLE_TIMELINES.get(project_type, template["timeline"]) if complexity == 'simple' else template["timeline"],
+        "potential_challenges": [],
+        "original_prompt": prompt
     }
     
-    # Save to database
-    save_project_to_db(user_id, project_data)
+    # Complexity-based adjustments
+    if complexity == 'complex':
+        project_data["key_features"].extend(["Enterprise scalability", "Advanced security", "Microservices architecture"])
+        project_data["potential_challenges"] = ["Scalability planning", "Security implementation", "Team coordination"]
+    else:
+        project_data["potential_challenges"] = ["Rapid prototyping", "Feature prioritization", "User feedback integration"]
+    
+    return project_data
+
+def plan_project(prompt, project_type=None):
+    """Run the planning pipeline for a prompt without saving anything"""
+    analysis = classify_prompt(prompt, project_type)
+    project_data = create_detailed_project_plan(prompt, analysis)
+    return ProjectPlan(
+        prompt=prompt,
+        project_type=project_data["project_type"],
+        complexity=analysis['complexity'],
+        has_specific_goal=analysis['has_specific_goal'],
+        project_data=project_data
+    )
+
+def plan_projects(prompts):
+    """plan_project for many prompts, classifying them in one batch"""
+    return [
+        plan_project(prompt, project_type)
+        for prompt, project_type in zip(prompts, detect_project_types(prompts))
+    ]
+
+def create_project_from_prompt(user_prompt, user_id, plan=None):
+    """Plan a project from a prompt (unless `plan` is given) and save it; returns (ProjectPlan, project id)"""
+    from fair_scheduler import project_quotas
+    
+    print(f"🎯 Analyzing prompt: '{preview(user_prompt)}'")
+    
+    # Counts against the user's project quota only if the save succeeds
+    with project_quotas.reservation(user_id):
+        plan = plan or plan_project(user_prompt)
+        print(f"📊 Detected project type: {plan.project_type} ({plan.complexity})")
+        
+        # Save to database
+        project_id = save_project_to_db(user_id, plan.project_data)
     
-    return project_data, project_type
+    return plan, project_id
 
 def generate_project_name(prompt, project_type):
     """Generate a meaningful project name"""
     # Extract key words from prompt
-    words = prompt.split()[:5]  # First 5 words
+    words = prompt[:CLASSIFY_WINDOW_CHARS].split()[:5]  # First 5 words
     meaningful_words = [word for word in words if len(word) > 3][:3]  # Meaningful words
     
     if meaningful_words:
@@ -224,41 +370,96 @@ def generate_project_name(prompt, project_type):
 
 def generate_project_description(prompt, template):
     """Generate a customized project description"""
-    return f"{template['description']} based on your request: '{prompt}'"
+    return f"{template['description']} based on your request: '{preview(prompt, CLASSIFY_WINDOW_CHARS)}'"
 
-def save_project_to_db(user_id, project_data):
-    """Save project to database"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        '''INSERT INTO projects 
-           (user_id, name, type, description, features, complexity, technologies, components) 
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
-        (
-            user_id,
-            project_data.get('project_name', 'Unnamed Project'),
-            project_data.get('project_type', 'custom'),
-            project_data.get('description', ''),
-            json.dumps(project_data.get('key_features', [])),
-            project_data.get('estimated_complexity', 'medium'),
-            json.dumps(project_data.get('recommended_tech', [])),
-            json.dumps(project_data.get('components', []))
-        )
+def _project_row(user_id, project_data):
+    """Build the projects table row for a project plan"""
+    return (
+        user_id,
+        project_data.get('project_name', 'Unnamed Project'),
+        project_data.get('project_type', 'custom'),
+        project_data.get('description', ''),
+        project_data.get('estimated_complexity', 'medium')
     )
+
+# Features, technologies and components go to the interned lookup tables (project_attributes)
+PROJECT_INSERT_SQL = '''INSERT INTO projects 
+           (user_id, name, type, description, complexity) 
+           VALUES (?, ?, ?, ?, ?)'''
+
+def _insert_projects(cursor, projects):
+    from project_analytics import record_projects
+    from project_attributes import attach_many_project_attributes
     
-    conn.commit()
-    conn.close()
+    saved = []
+    for user_id, project_data in projects:
+        cursor.execute(PROJECT_INSERT_SQL, _project_row(user_id, project_data))
+        saved.append((cursor.lastrowid, project_data))
+    attach_many_project_attributes(cursor, saved)
+    record_projects(cursor, projects)
+    return [project_id for project_id, _ in saved]
+
+def save_project_to_db(user_id, project_data):
+    """Save project to database; returns the new project's id"""
+    from database import get_user_db_connection
+    
+    conn = get_user_db_connection(user_id)
+    try:
+        project_id = save_shard_projects_in(conn, [(user_id, project_data)])[0]
+    finally:
+        conn.close()
     print(f"💾 Project saved to database: {project_data['project_name']}")
+    return project_id
 
-def get_user_projects(user_id):
-    """Get user projects from database"""
-    conn = get_db_connection()
+def save_projects_to_db(projects):
+    """Save a batch of (user_id, project_data) pairs, one transaction per shard"""
+    from database import get_db_connection, shard_for_user
+    
+    projects = list(projects)
+    if not projects:
+        return 0
+    
+    by_shard = {}
+    for user_id, project_data in projects:
+        by_shard.setdefault(shard_for_user(user_id), []).append((user_id, project_data))
+    
+    for shard, shard_projects in by_shard.items():
+        conn = get_db_connection(shard=shard)
+        try:
+            save_shard_projects_in(conn, shard_projects)
+        finally:
+            conn.close()
+    return len(projects)
+
+def save_shard_projects_in(conn, projects):
+    """Insert (user_id, project_data) pairs that all live on this connection's shard, in one transaction
+
+    Returns the new project ids, in order.
+    """
+    from project_attributes import forget_interned_ids
+    
+    try:
+        with conn:
+            return _insert_projects(conn.cursor(), projects)
+    except Exception:
+        # Ids interned inside the failed transaction were rolled back too
+        forget_interned_ids()
+        raise
+
+def get_user_projects_in(conn, user_id):
     cursor = conn.cursor()
     cursor.execute(
         "SELECT id, name, type, description, created_at FROM projects WHERE user_id = ? ORDER BY created_at DESC",
         (user_id,)
     )
-    projects = cursor.fetchall()
-    conn.close()
-    return projects
\ No newline at end of file
+    return cursor.fetchall()
+
+def get_user_projects(user_id):
+    """Get user projects from database"""
+    from database import get_user_db_connection
+    
+    conn = get_user_db_connection(user_id)
+    try:
+        return get_user_projects_in(conn, user_id)
+    finally:
+        conn.close()
\ No newline at end of file
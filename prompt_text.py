@@ -0,0 +1,54 @@
+import re
+
+from config import CLASSIFY_WINDOW_CHARS, CLASSIFY_STREAM_MAX_CHARS
+
+# Longest phrase any classifier pattern or keyword can match. Streamed windows
+# carry this much context on each side so a match straddling a window boundary
+# is read in full.
+WINDOW_OVERLAP_CHARS = 64
+
+LOG_PREVIEW_CHARS = 80
+
+# Unbounded repetition or backreferences could make a pattern super-linear
+_UNBOUNDED_RE = re.compile(r'(?<!\\)[*+{]|\\[1-9]')
+
+def compile_bounded(pattern):
+    """Compile a classifier pattern, rejecting constructs that allow unbounded matches
+
+    With only literals, alternation and single optional characters, every
+    match attempt examines at most len(pattern) characters, so scanning an
+    input is linear in its length.
+    """
+    if _UNBOUNDED_RE.search(pattern):
+        raise ValueError(f"Classifier pattern must not use unbounded repetition or backreferences: {pattern!r}")
+    return re.compile(pattern)
+
+def head_window(text, size=None):
+    """The lowercased start of a message, at most `size` (CLASSIFY_WINDOW_CHARS) characters"""
+    return text[:size or CLASSIFY_WINDOW_CHARS].lower()
+
+def iter_windows(text, start=0, size=None, max_chars=None):
+    """Yield (window, first, last) triples covering text from `start` in lowercased windows
+
+    Each window is lowercased on its own, so a huge message is never copied
+    in full. window[first:last] is the window's own span of `size`
+    characters; only count matches starting inside it, so each match is
+    counted in exactly one window. Around the span the window carries up to
+    WINDOW_OVERLAP_CHARS of context: before it, so a leading \\b sees the
+    previous character, and after it, so a match starting near the end of
+    the span is read in full instead of being cut mid-term (where a
+    trailing \\b would falsely match). Stops after `max_chars`
+    (CLASSIFY_STREAM_MAX_CHARS) characters.
+    """
+    size = size or CLASSIFY_WINDOW_CHARS
+    limit = min(len(text), max_chars or CLASSIFY_STREAM_MAX_CHARS)
+    for offset in range(start, limit, size):
+        first = min(offset, WINDOW_OVERLAP_CHARS)
+        end = min(offset + size, limit)
+        yield text[offset - first:min(end + WINDOW_OVERLAP_CHARS, len(text))].lower(), first, first + end - offset
+
+def preview(text, limit=LOG_PREVIEW_CHARS):
+    """Shortened text for log lines and descriptions"""
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit - 3]}... ({len(text)} chars)"
@@ -0,0 +1,243 @@
+"""Opt-in statistical profiling of live chat requests
+
+Set PROFILE_SAMPLE_RATE (e.g. 0.05) to profile that fraction of requests.
+While a sampled request runs, a background thread records its Python stack
+every PROFILE_INTERVAL_MS. Stacks are aggregated per label and written to
+PROFILE_DIR as collapsed stacks (flamegraph.pl / speedscope input) and a
+top-N hot function report. With the rate at 0 nothing is wrapped at all.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from config import PROFILE_SAMPLE_RATE, PROFILE_DIR, PROFILE_INTERVAL_MS, PROFILE_FLUSH_EVERY, PROFILE_TOP_N
+
+class _NullProfile:
+    """Context manager used for requests that are not sampled"""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_PROFILE = _NullProfile()
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+class _Profile:
+    """One sampled request; registers its thread with the sampler for the `with` block"""
+    __slots__ = ("profiler", "label", "root", "started_at")
+
+    def __init__(self, profiler, label):
+        self.profiler = profiler
+        self.label = label
+        self.root = None
+        self.started_at = None
+
+    def __enter__(self):
+        # Stacks are cut at the frame running the `with` block
+        self.root = sys._getframe(1)
+        self.started_at = time.perf_counter()
+        self.profiler._begin(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler._end(self, time.perf_counter() - self.started_at)
+        self.root = None
+        return False
+
+class RequestProfiler:
+    """Samples the stacks of a fraction of requests and aggregates them per label"""
+
+    def __init__(self, sample_rate=PROFILE_SAMPLE_RATE, output_dir=PROFILE_DIR,
+                 interval_ms=PROFILE_INTERVAL_MS, flush_every=PROFILE_FLUSH_EVERY, top_n=PROFILE_TOP_N):
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.interval = interval_ms / 1000
+        self.flush_every = flush_every
+        self.top_n = top_n
+
+        self._lock = threading.Lock()
+        self._active = {}  # thread id -> [_Profile, ...] (nested labels)
+        self._stacks = {}  # label -> Counter of collapsed stacks
+        self._requests = Counter()
+        self._seconds = Counter()
+        self._unflushed = 0
+        self._wake = threading.Event()
+        self._thread = None
+        self._random = None  # random.random, imported on the first sampling decision
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0
+
+    def profiled(self, label):
+        """Context manager profiling the block for a sampled fraction of calls"""
+        if self.sample_rate <= 0:
+            return _NULL_PROFILE
+        if self._random is None:
+            import random
+            self._random = random.random
+        if self._random() >= self.sample_rate:
+            return _NULL_PROFILE
+        return _Profile(self, label)
+
+    def sampled(self, label=None):
+        """Decorator form of profiled(); returns the function unchanged when profiling is off"""
+        def decorator(func):
+            if not self.enabled:
+                return func
+            name = label or func.__name__
+
+            def wrapper(*args, **kwargs):
+                with self.profiled(name):
+                    return func(*args, **kwargs)
+            wrapper.__name__ = func.__name__
+            wrapper.__doc__ = func.__doc__
+            wrapper.__wrapped__ = func
+            return wrapper
+        return decorator
+
+    def _begin(self, profile):
+        with self._lock:
+            self._active.setdefault(threading.get_ident(), []).append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample_loop, daemon=True, name="request-profiler")
+                self._thread.start()
+                import atexit
+                atexit.register(self.flush)
+        self._wake.set()
+
+    def _end(self, profile, seconds):
+        flush = False
+        with self._lock:
+            thread_id = threading.get_ident()
+            profiles = self._active.get(thread_id, [])
+            if profile in profiles:
+                profiles.remove(profile)
+            if not profiles:
+                self._active.pop(thread_id, None)
+            self._requests[profile.label] += 1
+            self._seconds[profile.label] += seconds
+            self._unflushed += 1
+            if self.flush_every and self._unflushed >= self.flush_every:
+                self._unflushed = 0
+                flush = True
+        if flush:
+            self.flush()
+
+    def _sample_loop(self):
+        while True:
+            with self._lock:
+                idle = not self._active
+            if idle:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            self.sample_once()
+            time.sleep(self.interval)
+
+    def sample_once(self):
+        """Record one stack for every thread inside a sampled request"""
+        frames = sys._current_frames()
+        with self._lock:
+            for thread_id, profiles in self._active.items():
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                names = []
+                while frame is not None:
+                    names.append((frame, _frame_name(frame)))
+                    frame = frame.f_back
+                for profile in profiles:
+                    stack = []
+                    for frame, name in names:
+                        stack.append(name)
+                        if frame is profile.root:
+                            break
+                    stack.append(profile.label)
+                    self._stacks.setdefault(profile.label, Counter())[";".join(reversed(stack))] += 1
+
+    def stacks(self, label):
+        """Aggregated collapsed stacks for a label"""
+        with self._lock:
+            return Counter(self._stacks.get(label, ()))
+
+    def flush(self):
+        """Write collapsed stacks and top-N reports for every label; returns the paths written"""
+        with self._lock:
+            snapshot = {label: Counter(stacks) for label, stacks in self._stacks.items()}
+            requests = dict(self._requests)
+            seconds = dict(self._seconds)
+        if not snapshot:
+            return []
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        paths = []
+        for label, stacks in snapshot.items():
+            # One file per process; profile-report merges them
+            base = os.path.join(self.output_dir, f"{label}.{os.getpid()}")
+            write_collapsed(f"{base}.collapsed", stacks)
+            header = (f"{label}: {requests.get(label, 0)} sampled requests, "
+                      f"{seconds.get(label, 0.0):.2f}s, {sum(stacks.values())} samples "
+                      f"every {self.interval * 1000:g} ms")
+            with open(f"{base}.top.txt", "w", encoding="utf-8") as f:
+                f.write(format_top(stacks, self.top_n, header))
+            paths.extend([f"{base}.collapsed", f"{base}.top.txt"])
+        return paths
+
+def write_collapsed(path, stacks):
+    """Write 'frame;frame;frame count' lines, heaviest first"""
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+def read_collapsed(path, stacks=None):
+    """Add the stacks in a collapsed file to a Counter"""
+    stacks = Counter() if stacks is None else stacks
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack:
+                stacks[stack] += int(count)
+    return stacks
+
+def top_functions(stacks, top_n=PROFILE_TOP_N):
+    """(function, self samples, total samples) for the hottest functions by self time"""
+    self_counts = Counter()
+    total_counts = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        self_counts[frames[-1]] += count
+        for name in set(frames):
+            total_counts[name] += count
+    return [(name, count, total_counts[name]) for name, count in self_counts.most_common(top_n)]
+
+def format_top(stacks, top_n=PROFILE_TOP_N, header=""):
+    """Text report of the hottest functions, by self and total samples"""
+    samples = sum(stacks.values()) or 1
+    lines = [header] if header else []
+    lines.append(f"{'self%':>7} {'total%':>7}  function")
+    for name, self_count, total_count in top_functions(stacks, top_n):
+        lines.append(f"{self_count * 100 / samples:6.1f}% {total_count * 100 / samples:6.1f}%  {name}")
+    return "\n".join(lines) + "\n"
+
+def merge_profiles(output_dir=PROFILE_DIR):
+    """Merge every process's collapsed files per label into <label>.collapsed; returns {label: Counter}"""
+    import glob
+
+    merged = {}
+    for path in sorted(glob.glob(os.path.join(output_dir, "*.*.collapsed"))):
+        label = os.path.basename(path).split(".")[0]
+        read_collapsed(path, merged.setdefault(label, Counter()))
+    for label, stacks in merged.items():
+        write_collapsed(os.path.join(output_dir, f"{label}.collapsed"), stacks)
+    return merged
+
+# Process-wide profiler configured from the environment
+request_profiler = RequestProfiler()
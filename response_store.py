@@ -0,0 +1,147 @@
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+# Codecs for the responses table. Never change an existing codec's meaning:
+# stored rows must stay decodable, so a new dictionary needs a new codec id.
+CODEC_RAW = 0
+CODEC_ZLIB_V1 = 1
+
+# Preset dictionary for CODEC_ZLIB_V1: the fixed boilerplate of blueprint and
+# follow-up replies. zlib favours matches near the end of the dictionary, so the
+# most common text comes last.
+ZDICT_V1 = (
+    "🛠️ **TECHNICAL ARCHITECTURE**\n\n → communicates with **Suggested stack mapping:** "
+    "**Scaling approach:** Start as a modular monolith; extract services only when load demands it.\n"
+    "📋 **FEATURE PRIORITIZATION**\n\n**Must have (MVP):** **Should have:** **Could have:** "
+    "⏱️ **DEVELOPMENT TIMELINE BREAKDOWN**\n\n  • **Weeks Requirements & design Core development "
+    "Testing & hardening Deployment & launch **Overall estimate:** "
+    "🛠️ **TECHNOLOGY ALTERNATIVES**\n\n🎯 **PROJECT RECAP**\n\n"
+    "\n🔍 **Ask me about:** technical architecture, feature prioritization, timeline breakdown, or technology alternatives."
+    "💭 **Context:** Continuing with your active project "
+    "Enterprise scalability, Advanced security, Microservices architecture"
+    "Responsive design for all devices\nUser authentication and authorization\nRESTful API architecture\n"
+    "Database integration and management\nModern UI/UX design principles\n"
+    "Interactive data visualization\nReal-time analytics dashboard\nData import/export capabilities\n"
+    "Natural language understanding\nMulti-platform integration\nContext-aware conversations\n"
+    "Task scheduling and management\nAPI integration capabilities\nError handling and logging\n"
+    "Cross-platform compatibility\nOffline functionality\nPush notifications\nNative performance\n"
+    "Custom architecture design\nScalable infrastructure\nComprehensive documentation\nTesting and quality assurance\n"
+    "React/Vue.js, Node.js/Python, MongoDB/PostgreSQL, Docker, Python/Pandas, React/D3.js, SQL Database, Jupyter"
+    "Frontend UI, Backend API, Database Layer, Authentication System"
+    "💭 **Analysis:** I'm analyzing your project request...\n"
+    "🔍 **Domain detected:** This appears to be a web app project\n"
+    "📊 **Complexity assessment:** Medium complexity level identified\n"
+    "✅ **Specific requirements:** Clear objectives detected in the prompt\n"
+    "ℹ️ **General request:** Will provide comprehensive starting framework\n\n"
+    "🎯 **PROJECT BLUEPRINT CREATED!**\n\n**Project Title:** **Domain Focus:** **Complexity Level:** "
+    "**Timeline Estimate:** weeks\n\n📋 **CORE FEATURES:**\n  1. \n  2. \n  3. \n  4. \n  5. \n"
+    "\n🛠️ **TECHNOLOGY STACK:**\n**Recommended Technologies:** **Architecture Components:** \n\n"
+    "🚧 **POTENTIAL CHALLENGES & SOLUTIONS:**\n  1. Rapid prototyping\n  2. Feature prioritization\n"
+    "  3. User feedback integration\n"
+    "\n📝 **NEXT STEPS RECOMMENDATION:**\n"
+    "1. **Requirements refinement** - Detailed feature specification\n"
+    "2. **Technology proof-of-concept** - Validate tech stack choices\n"
+    "3. **Architecture design** - System design and database schema\n"
+    "4. **Development roadmap** - Sprint planning and milestones\n"
+    "5. **MVP definition** - Minimum viable product scope\n\n"
+    "💡 **PRO TIPS:**\n"
+    "• Start with a minimum viable product (MVP)\n"
+    "• Use agile methodology for iterative development\n"
+    "• Focus on user experience from day one\n"
+    "• Implement continuous integration/deployment\n\n"
+    "🔍 **Would you like me to elaborate on any specific aspect?**\n"
+    "• Technical architecture details\n"
+    "• Feature prioritization strategy\n"
+    "• Development timeline breakdown\n"
+    "• Technology alternatives\n"
+).encode('utf-8')
+
+# Short replies don't benefit from compression
+MIN_COMPRESS_BYTES = 64
+
+def response_hash(response):
+    """Content address of a response (16-byte BLAKE2b digest)"""
+    return hashlib.blake2b(response.encode('utf-8'), digest_size=16).digest()
+
+def encode_response(response):
+    """Encode a response for storage; returns (codec, body)"""
+    raw = response.encode('utf-8')
+    if len(raw) < MIN_COMPRESS_BYTES:
+        return CODEC_RAW, raw
+    compressor = zlib.compressobj(level=9, zdict=ZDICT_V1)
+    body = compressor.compress(raw) + compressor.flush()
+    if len(body) >= len(raw):
+        return CODEC_RAW, raw
+    return CODEC_ZLIB_V1, body
+
+def decode_response(codec, body):
+    """Decode a stored response body"""
+    if codec == CODEC_RAW:
+        return bytes(body).decode('utf-8')
+    if codec == CODEC_ZLIB_V1:
+        decompressor = zlib.decompressobj(zdict=ZDICT_V1)
+        return (decompressor.decompress(body) + decompressor.flush()).decode('utf-8')
+    raise ValueError(f"Unknown response codec {codec}")
+
+def store_response(cursor, response):
+    """Store a response once in the responses table and return its hash"""
+    digest = response_hash(response)
+    codec, body = encode_response(response)
+    cursor.execute(
+        "INSERT OR IGNORE INTO responses (hash, codec, body) VALUES (?, ?, ?)",
+        (digest, codec, body)
+    )
+    return digest
+
+# Decoded responses by hash, least recently used evicted first
+DECODE_CACHE_SIZE = 1024
+_decode_cache = OrderedDict()
+_decode_cache_lock = threading.Lock()
+
+def _decode_cached(digest, codec, body):
+    with _decode_cache_lock:
+        text = _decode_cache.get(digest)
+        if text is not None:
+            _decode_cache.move_to_end(digest)
+            return text
+    
+    text = decode_response(codec, body)
+    with _decode_cache_lock:
+        _decode_cache[digest] = text
+        if len(_decode_cache) > DECODE_CACHE_SIZE:
+            _decode_cache.popitem(last=False)
+    return text
+
+def fetch_responses(cursor, digests):
+    """Resolve response hashes to text, reading only bodies that aren't cached
+
+    Canned replies repeated across thousands of turns are decompressed once
+    and then served from the in-memory cache without touching the database.
+    """
+    texts = {}
+    missing = []
+    with _decode_cache_lock:
+        for digest in set(digests):
+            text = _decode_cache.get(digest)
+            if text is None:
+                missing.append(digest)
+            else:
+                _decode_cache.move_to_end(digest)
+                texts[digest] = text
+    
+    # Stay well under SQLite's bound-parameter limit
+    for start in range(0, len(missing), 500):
+        chunk = missing[start:start + 500]
+        cursor.execute(
+            f"SELECT hash, codec, body FROM responses WHERE hash IN ({', '.join('?' for _ in chunk)})",
+            chunk
+        )
+        for digest, codec, body in cursor.fetchall():
+            texts[digest] = _decode_cached(digest, codec, body)
+    
+    for digest in digests:
+        if digest not in texts:
+            raise ValueError("chat_history row references a missing response")
+    return texts
@@ -0,0 +1,328 @@
+"""Project scaffolds generated from saved projects
+
+A scaffold is the directory tree for a project's type, rendered from the
+templates in SCAFFOLD_TEMPLATE_DIR: `common/` for every project plus one
+directory per project_type (unknown types use `custom/`). Files ending in
+.tmpl are string.Template files; `__component__` directories are repeated
+once per component of the project. Files are rendered one at a time as a
+stream, so a scaffold can be written to disk or to a zip/tar stream
+without holding the whole tree in memory.
+"""
+import html
+import io
+import json
+import os
+import re
+import tarfile
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from string import Template
+
+from config import SCAFFOLD_TEMPLATE_DIR, SCAFFOLD_WORKERS
+
+COMMON_TEMPLATES = "common"
+DEFAULT_TEMPLATES = "custom"
+COMPONENT_DIR = "__component__"
+TEMPLATE_SUFFIX = ".tmpl"
+
+ARCHIVE_FORMATS = ("zip", "tar", "tar.gz")
+
+# Template values are escaped for the file they land in; *_literal values are already code
+_ESCAPERS = {
+    ".py": lambda value: json.dumps(value)[1:-1],
+    ".js": lambda value: json.dumps(value)[1:-1],
+    ".json": lambda value: json.dumps(value)[1:-1],
+    ".html": html.escape
+}
+
+def slugify(name):
+    """Lowercase, dash-separated file name for a project or component name"""
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "project"
+
+class ScaffoldTemplate:
+    """The compiled template files for one project type
+
+    `files` is a sorted list of (relative path, Template or raw bytes); a
+    path starting with __component__/ is rendered once per component.
+    """
+
+    def __init__(self, type_dir, files):
+        self.type_dir = type_dir
+        self.files = files
+
+    @classmethod
+    def load(cls, template_dir, type_dir):
+        """Read common/ and a type directory; type files replace common files with the same path"""
+        files = {}
+        for source in (COMMON_TEMPLATES, type_dir):
+            root = os.path.join(template_dir, source)
+            for directory, _, names in os.walk(root):
+                for name in names:
+                    path = os.path.join(directory, name)
+                    relative = os.path.relpath(path, root).replace(os.sep, "/")
+                    with open(path, "rb") as f:
+                        data = f.read()
+                    if relative.endswith(TEMPLATE_SUFFIX):
+                        files[relative[:-len(TEMPLATE_SUFFIX)]] = Template(data.decode("utf-8"))
+                    else:
+                        files[relative] = data
+        return cls(type_dir, sorted(files.items()))
+
+class TemplateCache:
+    """Compiled ScaffoldTemplates by project_type for one template directory, each loaded once"""
+
+    def __init__(self, template_dir=SCAFFOLD_TEMPLATE_DIR):
+        self.template_dir = template_dir
+        self._templates = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def get(self, project_type):
+        template = self._templates.get(project_type)
+        if template is None:
+            with self._lock:
+                template = self._templates.get(project_type)
+                if template is None:
+                    exists = os.path.isdir(os.path.join(self.template_dir, project_type))
+                    type_dir = project_type if exists else DEFAULT_TEMPLATES
+                    # Types without their own directory share the compiled default templates
+                    template = self._templates.get(type_dir)
+                    if template is None:
+                        template = self._templates[type_dir] = ScaffoldTemplate.load(self.template_dir, type_dir)
+                        self.loads += 1
+                    self._templates[project_type] = template
+        return template
+
+    def clear(self):
+        """Forget compiled templates, e.g. after editing the template directory"""
+        with self._lock:
+            self._templates.clear()
+
+# Process-wide template cache
+template_cache = TemplateCache()
+
+def _markdown_list(items):
+    return "\n".join(f"- {item}" for item in items) or "- (none yet)"
+
+def scaffold_context(project_data):
+    """Template values for a project plan (the dict shape saved by project_manager)"""
+    name = project_data.get('project_name') or 'Unnamed Project'
+    project_type = project_data.get('project_type') or 'custom'
+    features = project_data.get('key_features', [])
+    return {
+        "project_name": name,
+        "project_slug": slugify(name),
+        "project_type": project_type,
+        "project_type_title": project_type.replace('_', ' ').title(),
+        "description": project_data.get('description', ''),
+        "complexity": project_data.get('estimated_complexity', 'medium'),
+        "features_list": _markdown_list(features),
+        "tech_list": _markdown_list(project_data.get('recommended_tech', [])),
+        "components_list": _markdown_list(
+            f"`{slugify(component)}/` - {component}" for component in project_data.get('components', [])
+        ),
+        "features_literal": json.dumps(features, ensure_ascii=False)
+    }
+
+def _render(template, context, path):
+    if isinstance(template, bytes):
+        return template
+    escape = _ESCAPERS.get(os.path.splitext(path)[1])
+    if escape:
+        context = {key: value if key.endswith("_literal") else escape(value) for key, value in context.items()}
+    return template.safe_substitute(context).encode("utf-8")
+
+def iter_scaffold_files(project_data, cache=None):
+    """Yield (relative path, bytes) for every file of the project's scaffold, rendering each on demand"""
+    cache = cache or template_cache
+    template = cache.get(project_data.get('project_type') or 'custom')
+    context = scaffold_context(project_data)
+    # Components with the same directory name share one directory
+    components = {slugify(component): component for component in reversed(project_data.get('components', []))}
+
+    for path, source in template.files:
+        if path.startswith(COMPONENT_DIR + "/"):
+            for slug, component in sorted(components.items()):
+                component_path = slug + path[len(COMPONENT_DIR):]
+                yield component_path, _render(source, {**context, "component_name": component}, component_path)
+        else:
+            yield path, _render(source, context, path)
+
+def _output_path(output_dir, project_data, name, suffix=""):
+    return os.path.join(output_dir, (name or slugify(project_data.get('project_name') or 'project')) + suffix)
+
+def write_scaffold(project_data, output_dir, name=None, overwrite=False, cache=None):
+    """Write the scaffold to output_dir/<name or project slug>/; returns (root directory, files written)"""
+    root = _output_path(output_dir, project_data, name)
+    if os.path.exists(root) and not overwrite:
+        raise FileExistsError(f"{root} already exists (pass overwrite=True to replace its files)")
+
+    written = 0
+    for path, data in iter_scaffold_files(project_data, cache):
+        target = os.path.join(root, *path.split("/"))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+        written += 1
+    return root, written
+
+class _ChunkSink:
+    """Write-only file object that collects what an archive writer produces until drained"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def iter_archive(project_data, fmt="zip", cache=None):
+    """Yield a zip or tar(.gz) of the scaffold as byte chunks, one file at a time
+
+    The archive is written as a stream (zip data descriptors, tar stream
+    mode): file contents are never held beyond the one being written. Zip
+    still keeps one small entry per file for its central directory.
+    """
+    if fmt not in ARCHIVE_FORMATS:
+        raise ValueError(f"Unknown archive format '{fmt}'. Choose from: {', '.join(ARCHIVE_FORMATS)}")
+    root = slugify(project_data.get('project_name') or 'project')
+    files = iter_scaffold_files(project_data, cache)
+    sink = _ChunkSink()
+    modified = time.time()
+
+    if fmt == "zip":
+        date_time = time.localtime(modified)[:6]
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for path, data in files:
+                info = zipfile.ZipInfo(f"{root}/{path}", date_time=date_time)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = 0o644 << 16
+                archive.writestr(info, data)
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+    else:
+        with tarfile.open(fileobj=sink, mode="w|gz" if fmt == "tar.gz" else "w|") as archive:
+            for path, data in files:
+                info = tarfile.TarInfo(f"{root}/{path}")
+                info.size = len(data)
+                info.mtime = modified
+                info.mode = 0o644
+                archive.addfile(info, io.BytesIO(data))
+                # A stream never seeks back, so the member list tarfile keeps is dead weight
+                archive.members.clear()
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+    # The zip central directory / the end of the tar stream
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
+
+def archive_name(project_data, fmt="zip"):
+    """Download file name for a project's scaffold archive"""
+    return f"{slugify(project_data.get('project_name') or 'project')}.{fmt}"
+
+def write_archive(project_data, output_dir, fmt="zip", name=None, overwrite=False, cache=None):
+    """Stream the scaffold archive to output_dir/<name or project slug>.<fmt>; returns (archive path, bytes written)"""
+    path = _output_path(output_dir, project_data, name, f".{fmt}")
+    if os.path.exists(path) and not overwrite:
+        raise FileExistsError(f"{path} already exists (pass overwrite=True to replace it)")
+    size = 0
+    with open(path, "wb") as f:
+        for chunk in iter_archive(project_data, fmt, cache):
+            f.write(chunk)
+            size += len(chunk)
+    return path, size
+
+def archive_bytes(project_data, fmt="zip"):
+    """The whole scaffold archive as bytes, for download buttons that need the data up front"""
+    return b"".join(iter_archive(project_data, fmt))
+
+PROJECT_QUERY = '''SELECT id, name, type, description, features, complexity, technologies, components
+                   FROM projects WHERE user_id IS ?'''
+
+def load_projects(user_id, project_ids=None):
+    """A user's saved projects as (project_id, plan dict) pairs, oldest first; all of them when project_ids is None
+
+    Ids the user does not own are skipped.
+    """
+    from database import get_user_db_connection
+    from project_attributes import resolve_project_lists
+
+    conn = get_user_db_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        if project_ids is None:
+            rows = cursor.execute(PROJECT_QUERY + " ORDER BY id", (user_id,)).fetchall()
+        else:
+            project_ids = list(project_ids)
+            rows = []
+            for start in range(0, len(project_ids), 500):
+                chunk = project_ids[start:start + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                rows.extend(cursor.execute(f"{PROJECT_QUERY} AND id IN ({placeholders})", [user_id] + chunk).fetchall())
+            rows.sort()
+        lists = resolve_project_lists(
+            cursor, rows, 0, {"key_features": 4, "recommended_tech": 6, "components": 7}
+        )
+    finally:
+        conn.close()
+    return [
+        (row[0], {
+            "project_name": row[1],
+            "project_type": row[2],
+            "description": row[3] or '',
+            "estimated_complexity": row[5] or 'medium',
+            **row_lists
+        })
+        for row, row_lists in zip(rows, lists)
+    ]
+
+def load_project(user_id, project_id):
+    """A saved project as a plan dict (project_name, project_type, ...), or None if the user has no such project"""
+    projects = load_projects(user_id, [project_id])
+    return projects[0][1] if projects else None
+
+def scaffold_one(project_data, output_dir, fmt=None, name=None, overwrite=False):
+    """Write one scaffold as a directory (fmt=None) or an archive; returns (path, files or bytes written)"""
+    if fmt:
+        return write_archive(project_data, output_dir, fmt, name=name, overwrite=overwrite)
+    return write_scaffold(project_data, output_dir, name=name, overwrite=overwrite)
+
+def scaffold_many(projects, output_dir, fmt=None, workers=None, overwrite=False):
+    """Scaffold (name, project_data) pairs in parallel, yielding (name, path, files or bytes) in input order
+
+    Names must be unique within a batch (project names often are not; the
+    CLI prefixes the project id). `workers` defaults to SCAFFOLD_WORKERS.
+    Threads share the template cache, and
+    compression and file writes release the GIL. At most two projects per
+    worker are in flight, so memory stays flat for any batch size.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or SCAFFOLD_WORKERS
+    max_pending = 2 * workers
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scaffold") as executor:
+        pending = deque()
+
+        for name, project_data in projects:
+            pending.append((name, executor.submit(scaffold_one, project_data, output_dir, fmt, name, overwrite)))
+            if len(pending) >= max_pending:
+                name, future = pending.popleft()
+                yield (name, *future.result())
+
+        while pending:
+            name, future = pending.popleft()
+            yield (name, *future.result())
@@ -0,0 +1,11 @@
+// Lists the features served by the backend API
+fetch("/api/features")
+  .then((response) => response.json())
+  .then((data) => {
+    const list = document.getElementById("features");
+    for (const feature of data.features) {
+      const item = document.createElement("li");
+      item.textContent = feature;
+      list.appendChild(item);
+    }
+  });
@@ -0,0 +1,158 @@
+import itertools
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+
+from config import SESSION_MESSAGE_TURNS, SESSION_MEMORY_BUDGET_BYTES
+from chat_history import get_chat_page
+
+# Turns every session keeps even when the process is over its memory budget
+MIN_TURNS_UNDER_PRESSURE = 2
+
+class Turn:
+    """One user message and the assistant's reply"""
+    __slots__ = ("chat_id", "message", "response", "size")
+
+    def __init__(self, chat_id, message, response):
+        self.chat_id = chat_id
+        self.message = message
+        self.response = response
+        self.size = sys.getsizeof(self) + sys.getsizeof(message) + sys.getsizeof(response)
+
+class SessionMemoryRegistry:
+    """Tracks every live SessionMessages in the process and enforces a shared byte budget
+
+    Sessions are held through weak references, so a Streamlit session that
+    goes away releases its messages without having to unregister. When the
+    total exceeds the budget, the least recently used sessions spill their
+    oldest turns first.
+    """
+
+    def __init__(self, budget_bytes=SESSION_MEMORY_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.lock = threading.RLock()
+        self._sessions = weakref.WeakValueDictionary()
+        self._keys = itertools.count(1)
+
+    def register(self, session):
+        with self.lock:
+            key = next(self._keys)
+            self._sessions[key] = session
+            return key
+
+    def total_bytes(self):
+        with self.lock:
+            return sum(session.size for session in list(self._sessions.values()))
+
+    def enforce_budget(self):
+        """Spill turns from idle sessions until the process is back under budget"""
+        with self.lock:
+            sessions = sorted(self._sessions.values(), key=lambda session: session.last_used)
+            excess = sum(session.size for session in sessions) - self.budget_bytes
+            for session in sessions:
+                if excess <= 0:
+                    break
+                excess -= session.spill(MIN_TURNS_UNDER_PRESSURE, excess)
+
+    def report(self):
+        """Bytes and turns held per session, largest first"""
+        with self.lock:
+            rows = [
+                {"session": key, "user_id": session.user_id, "turns": len(session), "bytes": session.size}
+                for key, session in list(self._sessions.items())
+            ]
+        rows.sort(key=lambda row: row["bytes"], reverse=True)
+        return {
+            "sessions": rows,
+            "bytes": sum(row["bytes"] for row in rows),
+            "budget_bytes": self.budget_bytes
+        }
+
+# Process-wide registry shared by all Streamlit sessions
+session_registry = SessionMemoryRegistry()
+
+class SessionMessages:
+    """The most recent chat turns of one session, bounded in memory
+
+    Every turn is already saved in chat_history, so spilling a turn just
+    drops it from memory; `older()` pages spilled turns back from the
+    database on demand.
+    """
+
+    def __init__(self, user_id, max_turns=SESSION_MESSAGE_TURNS, registry=session_registry):
+        self.user_id = user_id
+        self.max_turns = max_turns
+        self.registry = registry
+        self.size = 0
+        self.last_used = time.monotonic()
+        self._turns = deque()
+        # chat_history id just past the newest spilled turn, used to page back
+        self._spilled_before = None
+        self.has_older = False
+        self.key = registry.register(self)
+
+    @classmethod
+    def load(cls, user_id, max_turns=SESSION_MESSAGE_TURNS, registry=session_registry):
+        """Start a session with the user's latest turns from chat_history"""
+        session = cls(user_id, max_turns, registry)
+        rows = get_chat_page(user_id, max_turns + 1)
+        if len(rows) > max_turns:
+            session.has_older = True
+            session._spilled_before = rows[1][0]
+            rows = rows[1:]
+        with registry.lock:
+            for chat_id, message, response in rows:
+                session._append(Turn(chat_id, message, response))
+        registry.enforce_budget()
+        return session
+
+    def __len__(self):
+        return len(self._turns)
+
+    def __iter__(self):
+        with self.registry.lock:
+            turns = list(self._turns)
+        self.last_used = time.monotonic()
+        return iter(turns)
+
+    def _append(self, turn):
+        self._turns.append(turn)
+        self.size += turn.size
+
+    def add_turn(self, message, response, chat_id=None):
+        """Add a turn saved as chat_history row `chat_id` (None for turns that weren't saved)"""
+        with self.registry.lock:
+            self._append(Turn(chat_id, message, response))
+            self.last_used = time.monotonic()
+            if len(self._turns) > self.max_turns:
+                self.spill(self.max_turns)
+        self.registry.enforce_budget()
+
+    def spill(self, keep_turns, bytes_wanted=None):
+        """Drop the oldest turns down to `keep_turns` (or until `bytes_wanted` are freed); returns bytes freed"""
+        freed = 0
+        with self.registry.lock:
+            while len(self._turns) > keep_turns and (bytes_wanted is None or freed < bytes_wanted):
+                turn = self._turns.popleft()
+                self.size -= turn.size
+                freed += turn.size
+                if turn.chat_id is not None:
+                    self._spilled_before = turn.chat_id + 1
+                    self.has_older = True
+        return freed
+
+    def _page_cursor(self):
+        for turn in self._turns:
+            if turn.chat_id is not None:
+                return turn.chat_id
+        return self._spilled_before
+
+    def older(self, limit):
+        """Up to `limit` turns before the ones in memory, oldest first, read from chat_history"""
+        with self.registry.lock:
+            if not self.has_older:
+                return []
+            before_id = self._page_cursor()
+        return [Turn(chat_id, message, response) for chat_id, message, response in get_chat_page(self.user_id, limit, before_id)]
@@ -0,0 +1,180 @@
+"""Resharding: move per-user data to a different number of shard files
+
+Run with the app stopped: python -m project_creator reshard N
+"""
+import os
+import sqlite3
+
+import database
+from config import DATABASE_NAME
+from database import USER_TABLES, init_shard, shard_for_user, shard_paths
+from project_analytics import rebuild_project_stats
+from project_attributes import attach_many_project_attributes, forget_interned_ids, load_project_attributes
+
+CHAT_COLUMNS = ["user_id", "message", "response", "timestamp", "response_hash"]
+PROJECT_COLUMNS = ["user_id", "name", "type", "description", "features", "complexity",
+                   "technologies", "components", "created_at"]
+
+def _copy_chat_history(source, destinations, new_count, batch_size):
+    cursor = source.cursor()
+    copied = 0
+    last_id = 0
+    while True:
+        cursor.execute(
+            f"SELECT id, {', '.join(CHAT_COLUMNS)} FROM chat_history WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+
+        by_shard = {}
+        for row in rows:
+            by_shard.setdefault(shard_for_user(row[1], new_count), []).append(row[1:])
+
+        for shard, shard_rows in by_shard.items():
+            digests = list({row[-1] for row in shard_rows if row[-1] is not None})
+            bodies = []
+            for start in range(0, len(digests), 500):
+                chunk = digests[start:start + 500]
+                cursor.execute(
+                    f"SELECT hash, codec, body FROM responses WHERE hash IN ({', '.join('?' for _ in chunk)})",
+                    chunk
+                )
+                bodies.extend(cursor.fetchall())
+
+            # Rows are copied in id order, so each user's turns keep their order
+            with destinations[shard] as conn:
+                conn.executemany("INSERT OR IGNORE INTO responses (hash, codec, body) VALUES (?, ?, ?)", bodies)
+                conn.executemany(
+                    f"INSERT INTO chat_history ({', '.join(CHAT_COLUMNS)}) VALUES ({', '.join('?' for _ in CHAT_COLUMNS)})",
+                    shard_rows
+                )
+        copied += len(rows)
+        last_id = rows[-1][0]
+    return copied
+
+def _copy_projects(source, destinations, new_count, batch_size):
+    cursor = source.cursor()
+    copied = 0
+    last_id = 0
+    while True:
+        cursor.execute(
+            f"SELECT id, {', '.join(PROJECT_COLUMNS)} FROM projects WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+
+        attributes = load_project_attributes(cursor, [row[0] for row in rows])
+        by_shard = {}
+        for row in rows:
+            by_shard.setdefault(shard_for_user(row[1], new_count), []).append(row)
+
+        for shard, shard_rows in by_shard.items():
+            with destinations[shard] as conn:
+                dest_cursor = conn.cursor()
+                saved = []
+                for row in shard_rows:
+                    dest_cursor.execute(
+                        f"INSERT INTO projects ({', '.join(PROJECT_COLUMNS)}) VALUES ({', '.join('?' for _ in PROJECT_COLUMNS)})",
+                        row[1:]
+                    )
+                    saved.append((dest_cursor.lastrowid, attributes[row[0]]))
+                attach_many_project_attributes(dest_cursor, saved)
+        copied += len(rows)
+        last_id = rows[-1][0]
+    return copied
+
+def _clear_user_tables(path):
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            for table in USER_TABLES:
+                conn.execute(f"DELETE FROM {table}")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+def _has_user_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return any(conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() for table in ('chat_history', 'projects'))
+    finally:
+        conn.close()
+
+def reshard(new_count, batch_size=5000, backup=True):
+    """Copy every user's chat history and projects into a layout of `new_count` shards
+
+    The old layout stays authoritative until everything is copied; only then
+    is the new shard count recorded. Old shard files are kept with a
+    .pre-reshard suffix, and when leaving the single-file layout the per-user
+    tables in the global database are emptied. Row ids are reassigned, so
+    run this with the app stopped.
+    """
+    database.ensure_db()
+    old_count = database.shard_count
+    if new_count < 1:
+        raise ValueError("Shard count must be at least 1")
+    if new_count == old_count:
+        print(f"ℹ️ Already using {old_count} shards")
+        return 0
+
+    if backup:
+        from backup import snapshot_all
+
+        snapshot_all(full=True)
+
+    old_paths = shard_paths(old_count)
+    new_paths = shard_paths(new_count)
+    if new_count == 1 and _has_user_rows(DATABASE_NAME):
+        raise RuntimeError(f"{DATABASE_NAME} already holds per-user rows; cannot merge shards into it")
+
+    for path in new_paths:
+        if path != DATABASE_NAME and os.path.exists(path):
+            os.remove(path)  # Left over from an interrupted reshard
+        init_shard(path)
+    forget_interned_ids()
+
+    destinations = [sqlite3.connect(path) for path in new_paths]
+    chat_rows = project_rows = 0
+    try:
+        for path in old_paths:
+            source = sqlite3.connect(path)
+            try:
+                chat_rows += _copy_chat_history(source, destinations, new_count, batch_size)
+                project_rows += _copy_projects(source, destinations, new_count, batch_size)
+            finally:
+                source.close()
+            print(f"🔀 Copied {path}")
+    except Exception:
+        forget_interned_ids()
+        if new_count == 1:
+            for conn in destinations:
+                conn.close()
+            _clear_user_tables(DATABASE_NAME)
+        raise
+    finally:
+        for conn in destinations:
+            conn.close()
+
+    conn = sqlite3.connect(DATABASE_NAME)
+    try:
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO db_meta (key, value) VALUES ('shard_count', ?)", (str(new_count),))
+    finally:
+        conn.close()
+    database.shard_count = new_count
+    forget_interned_ids()
+    # project_stats is not copied; recompute it from the copied projects
+    rebuild_project_stats()
+
+    if old_count == 1:
+        _clear_user_tables(DATABASE_NAME)
+    else:
+        for path in old_paths:
+            os.replace(path, f"{path}.pre-reshard")
+
+    print(f"✅ Resharded {chat_rows} chat turns and {project_rows} projects from {old_count} to {new_count} shards")
+    return chat_rows + project_rows
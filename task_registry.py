@@ -0,0 +1,25 @@
+"""Names of the functions the job queue can run
+
+Has no imports, so a module can register its tasks without importing the
+queue (and its dependencies) when it is only used for something else.
+"""
+
+# Task name -> callable. Jobs refer to tasks by name so persisted jobs can be recovered after a restart.
+TASKS = {}
+
+# Tasks that take a `checkpoint` keyword argument (job_queue.Checkpoint)
+CHECKPOINTED_TASKS = set()
+
+def register_task(name, checkpoint=False):
+    """Decorator registering a function as a job queue task
+
+    With checkpoint=True the task is called with a `checkpoint` keyword
+    argument, where it records the steps that must not run twice (e.g. the
+    id of a saved row) when the job is retried or recovered.
+    """
+    def decorator(func):
+        TASKS[name] = func
+        if checkpoint:
+            CHECKPOINTED_TASKS.add(name)
+        return func
+    return decorator
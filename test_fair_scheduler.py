@@ -0,0 +1,193 @@
+"""Deterministic tests for the fair scheduler and the project quota cache
+
+The scheduler reads time only from its injected clock, so submit, dispatch
+and release are driven by a simulated clock with no threads or sleeps.
+
+Run with: python -m unittest test_fair_scheduler (or python -m pytest)
+"""
+import threading
+import unittest
+
+from fair_scheduler import FairScheduler, ProjectQuotaCache, ProjectQuotaExceeded, RateLimited, TokenBucket
+
+class SimulatedClock:
+    def __init__(self, now=0.0, step=0.0):
+        self.now = now
+        self.step = step  # Advance this much on every read, for code that loops until a deadline
+
+    def __call__(self):
+        now = self.now
+        self.now += self.step
+        return now
+
+def make_scheduler(clock, **options):
+    settings = dict(max_concurrent=1, rate=100.0, burst=100.0, max_queued=100, max_wait=30.0)
+    settings.update(options)
+    return FairScheduler(clock=clock, **settings)
+
+def run_all(scheduler):
+    """Grant and finish one ticket at a time; returns the user ids in the order they ran"""
+    order = []
+    while True:
+        granted = scheduler.dispatch()
+        if not granted:
+            return order
+        for ticket in granted:
+            order.append(ticket.user_id)
+            scheduler.release(ticket)
+
+class FairSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = SimulatedClock()
+
+    def test_heavy_user_does_not_starve_light_users(self):
+        scheduler = make_scheduler(self.clock)
+        for _ in range(20):
+            scheduler.submit("heavy")
+        scheduler.submit("light-1")
+        scheduler.submit("light-2")
+
+        order = run_all(scheduler)
+        self.assertEqual(len(order), 22)
+        # Both light users run right after the heavy user's first request, not after all 20
+        self.assertEqual(order[:3], ["heavy", "light-1", "light-2"])
+
+    def test_weights_share_slots_in_proportion(self):
+        scheduler = make_scheduler(self.clock)
+        scheduler.set_weight("paid", 2.0)
+        for _ in range(6):
+            scheduler.submit("paid")
+            scheduler.submit("free")
+
+        order = run_all(scheduler)
+        self.assertEqual(order[:6].count("paid"), 4)
+
+    def test_token_bucket_refills_up_to_its_burst(self):
+        bucket = TokenBucket(rate=0.5, burst=2, now=0.0)
+        self.assertTrue(bucket.try_take(0.0))
+        self.assertTrue(bucket.try_take(0.0))
+        self.assertFalse(bucket.try_take(0.0))
+        self.assertEqual(bucket.wait_time(0.0), 2.0)
+        self.assertTrue(bucket.try_take(2.0))
+
+        bucket.refill(1000.0)
+        self.assertEqual(bucket.tokens, 2)
+
+    def test_rate_limited_user_waits_for_refill_without_blocking_others(self):
+        scheduler = make_scheduler(self.clock, max_concurrent=10, rate=1.0, burst=2.0)
+        for _ in range(3):
+            scheduler.submit("bursty")
+
+        self.assertEqual([ticket.user_id for ticket in scheduler.dispatch()], ["bursty", "bursty"])
+        self.assertEqual(scheduler.next_wakeup(), 1.0)
+        scheduler.submit("other")
+        self.assertEqual([ticket.user_id for ticket in scheduler.dispatch()], ["other"])
+
+        self.clock.now += 1.0
+        self.assertEqual([ticket.user_id for ticket in scheduler.dispatch()], ["bursty"])
+        self.assertIsNone(scheduler.next_wakeup())
+
+    def test_too_many_queued_requests_are_rejected(self):
+        scheduler = make_scheduler(self.clock, max_queued=2)
+        first = scheduler.submit("user")
+        scheduler.submit("user")
+        with self.assertRaises(RateLimited):
+            scheduler.submit("user")
+        scheduler.submit("other")
+
+        # Withdrawing a waiting request frees its place
+        scheduler.release(first)
+        scheduler.submit("user")
+        self.assertEqual(scheduler.stats()["waiting"], {"user": 2, "other": 1})
+
+    def test_slot_times_out_and_withdraws_its_ticket(self):
+        clock = SimulatedClock(step=0.01)
+        scheduler = make_scheduler(clock, max_wait=0.05)
+        busy = scheduler.submit("busy")
+        scheduler.dispatch()
+
+        with self.assertRaises(RateLimited):
+            with scheduler.slot("waiting"):
+                self.fail("no slot should be granted")
+        self.assertEqual(scheduler.stats()["waiting"], {})
+
+        scheduler.release(busy)
+        with scheduler.slot("waiting") as ticket:
+            self.assertTrue(ticket.granted)
+        self.assertEqual(scheduler.stats()["active"], 0)
+
+class ProjectQuotaCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = SimulatedClock()
+        self.saved = {}
+
+    def count(self, user_id):
+        return self.saved.get(user_id, 0)
+
+    def test_reservations_count_against_the_limit(self):
+        quotas = ProjectQuotaCache(limit=2, refresh_seconds=60, clock=self.clock, count_projects=self.count)
+        self.saved[1] = 1
+        with quotas.reservation(1):
+            self.assertEqual(quotas.remaining(1), 0)
+            with self.assertRaises(ProjectQuotaExceeded):
+                quotas.reserve(1)
+        self.assertEqual(quotas.remaining(1), 0)
+
+        with self.assertRaises(RuntimeError):
+            with quotas.reservation(2):
+                raise RuntimeError("save failed")
+        self.assertEqual(quotas.remaining(2), 2)
+
+    def test_counts_are_read_without_holding_the_cache_lock(self):
+        quotas = ProjectQuotaCache(limit=5, refresh_seconds=60, clock=self.clock, count_projects=None)
+        slow_user_counting = threading.Event()
+        finish_slow_count = threading.Event()
+        locked_while_counting = []
+        finished = []
+
+        def count(user_id):
+            locked_while_counting.append(quotas._lock.locked())
+            if user_id == "slow":
+                slow_user_counting.set()
+                finish_slow_count.wait(1)
+                finished.append("slow")
+            return 1
+
+        quotas.count_projects = count
+        slow = threading.Thread(target=quotas.remaining, args=("slow",))
+        slow.start()
+        self.assertTrue(slow_user_counting.wait(5))
+        # Another user is served while the slow count is still running
+        self.assertEqual(quotas.remaining("fast"), 4)
+        finished.append("fast")
+        finish_slow_count.set()
+        slow.join(5)
+
+        self.assertEqual(finished, ["fast", "slow"])
+        self.assertEqual(locked_while_counting, [False, False])
+        self.assertEqual(quotas.remaining("slow"), 4)
+
+    def test_save_during_a_count_is_not_lost(self):
+        quotas = ProjectQuotaCache(limit=5, refresh_seconds=60, clock=self.clock, count_projects=None)
+        counts = []
+
+        def count(user_id):
+            counts.append(user_id)
+            if len(counts) == 2:
+                # A creation commits (in another thread) while this stale count is being read
+                commit = threading.Thread(target=quotas.commit, args=(user_id,))
+                commit.start()
+                commit.join(1)
+                self.saved[user_id] = 2
+                return 1
+            return self.saved.get(user_id, 0)
+
+        quotas.count_projects = count
+        self.saved["user"] = 1
+        quotas.reserve("user")
+        quotas.invalidate("user")
+        self.assertEqual(quotas.remaining("user"), 3)
+        self.assertEqual(len(counts), 3)
+
+if __name__ == "__main__":
+    unittest.main()
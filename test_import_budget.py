@@ -0,0 +1,37 @@
+"""Regression test for the cold import of the classifier modules
+
+Importing project_manager or llm_handler in a fresh interpreter must not
+load any of import_budget.FORBIDDEN_MODULES, and the fastest of a few
+runs must stay within IMPORT_TIME_BUDGET_MS (recorded timings, well under
+it, are in import_budget.BASELINE_IMPORT_MS). Both use the measurement
+behind `python -m project_creator check-import-time`.
+
+Run with: python -m unittest test_import_budget (or python -m pytest)
+"""
+import unittest
+
+from config import IMPORT_TIME_BUDGET_MS
+from import_budget import CORE_MODULES, best_import, measure_import
+
+RUNS = 5
+
+class ColdImportTest(unittest.TestCase):
+    def test_classifier_modules_skip_heavy_imports(self):
+        for module in CORE_MODULES:
+            with self.subTest(module=module):
+                _, entries, loaded = measure_import(module)
+                self.assertEqual(loaded, [], f"importing {module} loads {', '.join(loaded)}")
+                self.assertTrue(entries)
+
+    def test_classifier_modules_import_within_budget(self):
+        for module in CORE_MODULES:
+            with self.subTest(module=module):
+                cumulative, _, _ = best_import(module, RUNS)
+                self.assertLess(
+                    cumulative / 1000, IMPORT_TIME_BUDGET_MS,
+                    f"importing {module} took {cumulative / 1000:.1f} ms (best of {RUNS}), "
+                    f"budget {IMPORT_TIME_BUDGET_MS:g} ms; run check-import-time for the slowest imports"
+                )
+
+if __name__ == "__main__":
+    unittest.main()
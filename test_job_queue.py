@@ -0,0 +1,230 @@
+"""Deterministic tests for the job queue
+
+Every queue runs with max_workers=0 (jobs only run inside run_pending) and
+a simulated clock that the injected sleep advances, so retries and their
+backoff run without waiting. Persistent queues use a temporary database.
+
+Run with: python -m unittest test_job_queue (or python -m pytest)
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from config import JOB_QUEUE_RETENTION_DAYS
+from job_queue import CANCELLED, FAILED, QUEUED, SUCCEEDED, JobQueue
+from task_registry import register_task
+
+calls = []
+failures = {}
+saves = []
+
+@register_task("test_echo")
+def echo_task(name):
+    calls.append(name)
+    if failures.get(name, 0) > 0:
+        failures[name] -= 1
+        raise RuntimeError(f"{name} failed")
+    return name
+
+@register_task("test_save_then_crash", checkpoint=True)
+def save_then_crash_task(name, checkpoint):
+    if checkpoint.get("saved") is None:
+        saves.append(name)
+        checkpoint.record(saved=len(saves))
+    if failures.get(name, 0) > 0:
+        failures[name] -= 1
+        raise KeyboardInterrupt  # The process dies; nothing records the job as finished
+    return checkpoint.get("saved")
+
+class SimulatedClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+class TempDbQueue(JobQueue):
+    """A persistent queue backed by its own database file"""
+
+    def __init__(self, path, **options):
+        self.path = path
+        super().__init__(persist=True, **options)
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+class JobQueueTest(unittest.TestCase):
+    def setUp(self):
+        calls.clear()
+        failures.clear()
+        saves.clear()
+        self.clock = SimulatedClock()
+
+    def make_queue(self, **options):
+        options.setdefault("max_workers", 0)
+        options.setdefault("retry_delay", 0.5)
+        return JobQueue(clock=self.clock, sleep=self.clock.sleep, **options)
+
+    def test_retry_waits_for_its_backoff_behind_other_jobs(self):
+        queue = self.make_queue()
+        failures["a"] = 1
+        first = queue.submit("test_echo", "a")
+        second = queue.submit("test_echo", "b")
+
+        self.assertEqual(queue.run_pending(), 3)
+        self.assertEqual(calls, ["a", "b", "a"])
+        self.assertEqual(self.clock.slept, [0.5])
+        self.assertEqual(queue.status(first)["status"], SUCCEEDED)
+        self.assertEqual(queue.status(first)["attempts"], 2)
+        self.assertEqual(queue.status(second)["attempts"], 1)
+
+    def test_retries_run_in_due_order(self):
+        queue = self.make_queue()
+        failures["a"] = 2
+        failures["b"] = failures["c"] = 1
+        for name in "abc":
+            queue.submit("test_echo", name)
+
+        # a's second backoff (1.0) ends after b's and c's first (0.5); b and c failed in that order
+        queue.run_pending()
+        self.assertEqual(calls, ["a", "b", "c", "a", "b", "c", "a"])
+
+    def test_job_fails_after_max_retries(self):
+        queue = self.make_queue(max_retries=2)
+        failures["a"] = 5
+        job_id = queue.submit("test_echo", "a")
+
+        queue.run_pending()
+        job = queue.status(job_id)
+        self.assertEqual(job["status"], FAILED)
+        self.assertEqual(job["attempts"], 3)
+        self.assertEqual(job["error"], "a failed")
+        self.assertEqual(job["finished_at"], self.clock.now)
+        # Backoff grows with the attempt number
+        self.assertEqual(self.clock.slept, [0.5, 1.0])
+
+    def test_cancelled_jobs_do_not_run(self):
+        queue = self.make_queue()
+        job_id = queue.submit("test_echo", "a")
+
+        self.assertTrue(queue.cancel(job_id))
+        queue.run_pending()
+        self.assertEqual(calls, [])
+        self.assertEqual(queue.status(job_id)["status"], CANCELLED)
+        self.assertFalse(queue.cancel(job_id))
+
+    def test_cancelled_retry_is_not_run_again(self):
+        queue = self.make_queue()
+        failures["a"] = 1
+        job_id = queue.submit("test_echo", "a")
+        queue._run(queue._pending.get_nowait())
+        queue._pending.task_done()
+        self.assertEqual(queue.status(job_id)["status"], QUEUED)
+
+        queue.cancel(job_id)
+        queue.run_pending()
+        self.assertEqual(calls, ["a"])
+        self.assertEqual(queue.status(job_id)["status"], CANCELLED)
+
+    def test_forget_only_drops_finished_jobs(self):
+        queue = self.make_queue()
+        job_id = queue.submit("test_echo", "a")
+
+        self.assertFalse(queue.forget(job_id))
+        queue.run_pending()
+        self.assertTrue(queue.forget(job_id))
+        self.assertIsNone(queue.status(job_id))
+
+    def test_unknown_task_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.make_queue().submit("test_missing")
+
+class PersistentJobQueueTest(JobQueueTest):
+    def setUp(self):
+        super().setUp()
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def make_queue(self, **options):
+        options.setdefault("max_workers", 0)
+        options.setdefault("retry_delay", 0.5)
+        return TempDbQueue(self.path, clock=self.clock, sleep=self.clock.sleep, **options)
+
+    def rows(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            return dict(conn.execute("SELECT id, status FROM jobs").fetchall())
+        finally:
+            conn.close()
+
+    def test_recover_runs_unfinished_jobs(self):
+        queue = self.make_queue()
+        done = queue.submit("test_echo", "a")
+        queue.run_pending()
+        pending = queue.submit("test_echo", "b")
+
+        # A new process finds the job that never ran
+        restarted = self.make_queue()
+        self.assertEqual(restarted.recover(), 1)
+        restarted.run_pending()
+        self.assertEqual(calls, ["a", "b"])
+        self.assertEqual(restarted.status(pending)["status"], SUCCEEDED)
+        self.assertIsNone(restarted.status(done))
+        self.assertEqual(self.rows(), {done: SUCCEEDED, pending: SUCCEEDED})
+
+    def test_checkpoint_survives_a_crash(self):
+        queue = self.make_queue()
+        failures["a"] = 1
+        job_id = queue.submit("test_save_then_crash", "a")
+        with self.assertRaises(KeyboardInterrupt):
+            queue.run_pending()
+        self.assertEqual(self.rows(), {job_id: "running"})
+
+        restarted = self.make_queue()
+        self.assertEqual(restarted.recover(), 1)
+        restarted.run_pending()
+        job = restarted.status(job_id)
+        self.assertEqual(job["status"], SUCCEEDED)
+        self.assertEqual(job["result"], 1)
+        self.assertEqual(job["attempts"], 2)
+        # The step recorded before the crash did not run again
+        self.assertEqual(saves, ["a"])
+
+    def test_forget_deletes_the_persisted_row(self):
+        queue = self.make_queue()
+        job_id = queue.submit("test_echo", "a")
+        queue.run_pending()
+
+        self.assertTrue(queue.forget(job_id))
+        self.assertEqual(self.rows(), {})
+
+    def test_prune_deletes_finished_jobs_past_retention(self):
+        retention = JOB_QUEUE_RETENTION_DAYS * 24 * 3600
+        queue = self.make_queue(retention=retention)
+        old = queue.submit("test_echo", "a")
+        queue.run_pending()
+        self.clock.now += retention / 2
+        recent = queue.submit("test_echo", "b")
+        queue.run_pending()
+        unfinished = queue.submit("test_echo", "c")
+
+        self.clock.now += retention / 2 + 1
+        self.assertEqual(queue.prune(), 1)
+        self.assertEqual(self.rows(), {recent: SUCCEEDED, unfinished: QUEUED})
+
+        # recover() prunes before re-enqueueing
+        self.clock.now += retention
+        restarted = self.make_queue(retention=retention)
+        self.assertEqual(restarted.recover(), 1)
+        self.assertEqual(self.rows(), {unfinished: QUEUED})
+        self.assertNotIn(old, self.rows())
+
+if __name__ == "__main__":
+    unittest.main()
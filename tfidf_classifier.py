@@ -0,0 +1,228 @@
+"""Optional TF-IDF project-type classifier
+
+Prompts are turned into sparse L2-normalized TF-IDF vectors (unigrams +
+bigrams) and scored against one centroid per project type, so a whole
+batch of prompts is classified with a single sparse matrix product.
+Requires numpy; when numpy or the trained model file is missing,
+detect_project_type keeps using the regex scorer.
+
+Train with: python -m project_creator train-classifier
+"""
+import os
+import re
+import threading
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional
+    np = None
+
+from config import PROJECT_CLASSIFIER_PATH
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset([
+    'a', 'an', 'the', 'for', 'to', 'of', 'with', 'and', 'or', 'in', 'on', 'me', 'my',
+    'i', 'we', 'our', 'that', 'this', 'is', 'it', 'be', 'can', 'you', 'your', 'please',
+    # Request verbs appear in prompts of every type
+    'create', 'build', 'make', 'develop', 'design', 'need', 'want', 'like'
+])
+
+# Below this cosine similarity to every centroid a prompt is 'custom'
+DEFAULT_THRESHOLD = 0.08
+
+# Old rows in projects used short domain names
+LEGACY_TYPE_NAMES = {
+    'web': 'web_app',
+    'data': 'data_analysis',
+    'chat': 'chatbot',
+    'automation': 'automation_agent',
+    'mobile': 'mobile_app'
+}
+
+def _normalize_token(token):
+    # Crude plural folding so "phones" and "phone" share a term
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+def tokenize(text):
+    """Lowercased word tokens (minus stopwords, plurals folded) followed by their bigrams"""
+    tokens = [_normalize_token(token) for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+    return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+def _pattern_phrases(pattern):
+    """Literal alternatives of a detect_project_type regex, e.g. 'e.?commerce' -> 'ecommerce'"""
+    literal = pattern.replace(r'\b', '').replace('.?', '').replace('?', '')
+    literal = literal.replace('(', '|').replace(')', '|')
+    return [phrase.strip() for phrase in literal.split('|') if phrase.strip()]
+
+def training_documents(include_history=True):
+    """(project_type, text) training pairs from templates, keywords and saved projects"""
+    from project_manager import PROJECT_TYPE_KEYWORDS, PROJECT_TYPE_PATTERNS, get_project_template
+
+    documents = []
+    for project_type, patterns in PROJECT_TYPE_PATTERNS.items():
+        for pattern in patterns:
+            documents.extend((project_type, phrase) for phrase in _pattern_phrases(pattern))
+        documents.extend((project_type, keyword) for keyword in PROJECT_TYPE_KEYWORDS[project_type])
+
+        template = get_project_template(project_type)
+        documents.append((project_type, f"{template['name']} {template['description']}"))
+        documents.extend((project_type, text) for text in template['key_features'])
+        documents.extend((project_type, text) for text in template['recommended_tech'])
+        documents.extend((project_type, text) for text in template['components'])
+
+    if include_history:
+        from database import query_all_shards
+
+        for project_type, description in query_all_shards("SELECT type, description FROM projects WHERE description IS NOT NULL"):
+            project_type = LEGACY_TYPE_NAMES.get(project_type, project_type)
+            if project_type in PROJECT_TYPE_PATTERNS:
+                documents.append((project_type, description))
+
+    return documents
+
+class TfidfClassifier:
+    """TF-IDF vectorizer plus nearest-centroid scoring"""
+
+    def __init__(self, vocabulary, idf, centroids, labels, threshold=DEFAULT_THRESHOLD):
+        if np is None:
+            raise RuntimeError("numpy is required for the TF-IDF classifier")
+        self.vocabulary = list(vocabulary)
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.labels = list(labels)
+        self.threshold = float(threshold)
+        self._index = {term: i for i, term in enumerate(self.vocabulary)}
+
+    def vectorize(self, texts):
+        """Sparse TF-IDF rows as (rows, cols, values) arrays in COO form, each row L2-normalized"""
+        rows, cols, counts = [], [], []
+        for row, text in enumerate(texts):
+            for term, count in Counter(tokenize(text)).items():
+                col = self._index.get(term)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+                    counts.append(count)
+
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        # Sublinear term frequency, so one repeated word can't dominate
+        values = (1.0 + np.log(np.asarray(counts, dtype=np.float32))) * self.idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=len(texts)))
+        if len(values):
+            values = values / norms[rows]
+        return rows, cols, values.astype(np.float32)
+
+    def scores(self, texts):
+        """Cosine similarity of every text to every project type centroid
+
+        Equivalent to X @ centroids.T for the sparse TF-IDF matrix X: each
+        nonzero entry contributes its weight times the centroid column, summed
+        per row, so memory stays proportional to the number of tokens.
+        """
+        rows, cols, values = self.vectorize(texts)
+        contributions = self.centroids[:, cols] * values
+        return np.stack(
+            [np.bincount(rows, weights=label_row, minlength=len(texts)) for label_row in contributions],
+            axis=1
+        )
+
+    def predict(self, texts, chunk_size=50000):
+        """Project type for each text ('custom' when nothing scores above the threshold)"""
+        texts = list(texts)
+        predictions = []
+        for start in range(0, len(texts), chunk_size):
+            scores = self.scores(texts[start:start + chunk_size])
+            best = scores.argmax(axis=1)
+            best_scores = scores[np.arange(len(best)), best]
+            predictions.extend(
+                self.labels[index] if score >= self.threshold else 'custom'
+                for index, score in zip(best.tolist(), best_scores.tolist())
+            )
+        return predictions
+
+    def save(self, path):
+        """Write the model to a compressed .npz file"""
+        np.savez_compressed(
+            path,
+            vocabulary=np.array(self.vocabulary),
+            idf=self.idf,
+            centroids=self.centroids,
+            labels=np.array(self.labels),
+            threshold=np.array(self.threshold, dtype=np.float32)
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Load a model written by save()"""
+        if np is None:
+            raise RuntimeError("numpy is required for the TF-IDF classifier")
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["vocabulary"].tolist(),
+                data["idf"],
+                data["centroids"],
+                data["labels"].tolist(),
+                float(data["threshold"])
+            )
+
+def train_classifier(documents=None, threshold=DEFAULT_THRESHOLD):
+    """Fit vocabulary, IDF weights and per-type centroids from (project_type, text) pairs"""
+    if np is None:
+        raise RuntimeError("numpy is required for the TF-IDF classifier")
+    if documents is None:
+        documents = training_documents()
+
+    labels = sorted({label for label, _ in documents})
+    tokenized = [(label, tokenize(text)) for label, text in documents]
+
+    document_frequency = Counter()
+    for _, terms in tokenized:
+        document_frequency.update(set(terms))
+    vocabulary = sorted(document_frequency)
+
+    total = len(tokenized)
+    idf = np.array(
+        [np.log((1 + total) / (1 + document_frequency[term])) + 1.0 for term in vocabulary],
+        dtype=np.float32
+    )
+
+    # Centroids start at zero; vectorize() only needs the vocabulary and IDF weights
+    model = TfidfClassifier(vocabulary, idf, np.zeros((len(labels), len(vocabulary))), labels, threshold)
+    rows, cols, values = model.vectorize([text for _, text in documents])
+
+    label_index = {label: i for i, label in enumerate(labels)}
+    document_labels = np.array([label_index[label] for label, _ in documents], dtype=np.int64)
+    centroids = np.zeros((len(labels), len(vocabulary)), dtype=np.float32)
+    np.add.at(centroids, (document_labels[rows], cols), values)
+    norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+    np.divide(centroids, norms, out=centroids, where=norms > 0)
+
+    model.centroids = centroids
+    return model
+
+_classifier = None
+_classifier_loaded = False
+_classifier_lock = threading.Lock()
+
+def get_project_classifier():
+    """The trained classifier, loaded once per process, or None if unavailable"""
+    global _classifier, _classifier_loaded
+    if _classifier_loaded:
+        return _classifier
+
+    with _classifier_lock:
+        if not _classifier_loaded:
+            if np is None:
+                print("⚠️ PROJECT_CLASSIFIER=tfidf but numpy is not installed; using regex classifier")
+            elif not os.path.exists(PROJECT_CLASSIFIER_PATH):
+                print(f"⚠️ No classifier model at {PROJECT_CLASSIFIER_PATH}; using regex classifier")
+            else:
+                _classifier = TfidfClassifier.load(PROJECT_CLASSIFIER_PATH)
+                print(f"🧮 Loaded TF-IDF classifier ({len(_classifier.vocabulary)} terms)")
+            _classifier_loaded = True
+    return _classifier
@@ -0,0 +1,149 @@
+"""Background warm-up at process start
+
+Pays the cold costs a fresh deploy would otherwise put on its first users:
+compiling the project type patterns (and loading the TF-IDF model), pulling
+hot tables and indexes into the OS page cache, and pre-rendering the most
+frequent project prompts from chat_history into the blueprint cache.
+"""
+import threading
+import time
+from collections import Counter
+
+from config import (
+    PROJECT_CLASSIFIER, WARMUP_ENABLED, WARMUP_PRERENDER_PROMPTS, WARMUP_SCAN_ROWS, WARMUP_MAX_WAIT_SECONDS
+)
+from database import get_db_connection, iter_shards
+
+# Reads that touch every page of the tables and indexes the first requests hit
+GLOBAL_PRIME_QUERIES = [
+    "SELECT COUNT(*), MAX(LENGTH(hashed_password)) FROM users",
+    "SELECT COUNT(username) FROM users WHERE username > ''",
+    "SELECT COUNT(email) FROM users WHERE email > ''"
+]
+SHARD_PRIME_QUERIES = [
+    "SELECT COUNT(user_id) FROM chat_history INDEXED BY idx_chat_history_user",
+    "SELECT COUNT(*), MAX(user_id), MAX(LENGTH(description)) FROM projects",
+    "SELECT COUNT(name) FROM features",
+    "SELECT COUNT(name) FROM technologies",
+    "SELECT COUNT(name) FROM components",
+    "SELECT COUNT(*) FROM project_features",
+    "SELECT COUNT(*) FROM project_technologies",
+    "SELECT COUNT(*) FROM project_components"
+]
+
+def compile_classifiers():
+    """Compile the project type patterns and load the TF-IDF model if it is enabled"""
+    from llm_handler import detect_follow_up_topic, is_project_creation_request
+    from project_manager import _compiled_patterns, classify_prompt
+
+    _compiled_patterns()
+    if PROJECT_CLASSIFIER == 'tfidf':
+        from tfidf_classifier import get_project_classifier
+
+        get_project_classifier()
+    # One pass through the detectors so their first real call is not the slowest
+    classify_prompt("Create a web application for task management")
+    is_project_creation_request("Create a web application for task management")
+    detect_follow_up_topic("Tell me more about the architecture")
+
+def prime_database():
+    """Read hot tables and indexes once so their pages are in the OS cache; returns queries run"""
+    ran = 0
+    targets = [(None, GLOBAL_PRIME_QUERIES)] + [(shard, SHARD_PRIME_QUERIES) for shard in iter_shards()]
+    for shard, queries in targets:
+        conn = get_db_connection(shard=shard)
+        try:
+            for query in queries:
+                conn.execute(query).fetchall()
+                ran += 1
+        finally:
+            conn.close()
+    return ran
+
+def frequent_project_prompts(limit=WARMUP_PRERENDER_PROMPTS, scan_rows=WARMUP_SCAN_ROWS):
+    """The most repeated project creation prompts among the latest `scan_rows` turns of each shard"""
+    from llm_handler import is_project_creation_request
+
+    counts = Counter()
+    for shard in iter_shards():
+        conn = get_db_connection(shard=shard)
+        try:
+            rows = conn.execute(
+                '''SELECT message, COUNT(*) AS uses FROM (
+                       SELECT message FROM chat_history ORDER BY id DESC LIMIT ?
+                   ) GROUP BY message HAVING uses > 1 ORDER BY uses DESC LIMIT ?''',
+                (scan_rows, limit * 4)
+            ).fetchall()
+        finally:
+            conn.close()
+        for message, uses in rows:
+            counts[message] += uses
+    return [message for message, _ in counts.most_common() if is_project_creation_request(message)][:limit]
+
+def prerender_prompts(prompts):
+    """Plan and render blueprints for prompts into the blueprint cache"""
+    from llm_handler import render_blueprint
+
+    for prompt in prompts:
+        render_blueprint(prompt)
+    return len(prompts)
+
+class Warmup:
+    """Runs the warm-up stages once, in a background thread, and exposes a readiness flag"""
+
+    STAGES = (
+        ("classifiers", compile_classifiers),
+        ("database", prime_database),
+        ("blueprints", lambda: prerender_prompts(frequent_project_prompts()))
+    )
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.timings = {}
+        self.errors = {}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def run(self):
+        """Run every stage in the calling thread; a failing stage is logged and skipped"""
+        started = time.perf_counter()
+        for name, stage in self.STAGES:
+            stage_started = time.perf_counter()
+            try:
+                result = stage()
+            except Exception as e:
+                self.errors[name] = str(e)
+                print(f"⚠️ Warm-up stage '{name}' failed: {e}")
+                continue
+            self.timings[name] = time.perf_counter() - stage_started
+            detail = f" ({result})" if isinstance(result, int) else ""
+            print(f"🔥 Warm-up {name}{detail} in {self.timings[name] * 1000:.0f} ms")
+        self.timings["total"] = time.perf_counter() - started
+        self.ready.set()
+        return self
+
+    def start(self):
+        """Start the background warm-up once; later calls are no-ops"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, daemon=True, name="warmup")
+                self._thread.start()
+        return self
+
+    def wait(self, timeout=WARMUP_MAX_WAIT_SECONDS):
+        """Block until warm-up finished or `timeout` passed; returns whether it is ready"""
+        return self.ready.wait(timeout)
+
+    @property
+    def is_ready(self):
+        return self.ready.is_set()
+
+# Process-wide warm-up, started by the app bootstrap
+warmup = Warmup()
+
+def start_warmup():
+    """Start the process-wide warm-up in the background (marked ready at once when disabled)"""
+    if not WARMUP_ENABLED:
+        warmup.ready.set()
+        return warmup
+    return warmup.start()